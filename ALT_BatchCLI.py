@@ -0,0 +1,222 @@
+# AssetLibraryTools command line batch import
+# Runs the PBR material and model importers without a UI, split over several background Blender processes:
+#   blender -b --factory-startup -P ALT_BatchCLI.py -- --materials <dir> --models <dir> --output <dir> [--shards N] [--set import_disp=False ...] [--merge]
+# The coordinator scans the import directories, splits the texture sets and model files into N shards of about equal size (in bytes),
+# and starts one background Blender per shard. Every worker imports its shard and saves it as <output>/<name>_<shard>.blend with the imported
+# materials and objects marked as assets, so the output directory can be added as an asset library straight away.
+# Finally library.json catalogs what ended up in which .blend, with --merge everything is also appended into <output>/<name>.blend.
+# --set takes any AssetLibraryTools setting, e.g. --set use_proxy_textures=True --set proxy_resolution=1024 --set import_fbx=False
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+import bpy
+
+
+addonDir = os.path.dirname(os.path.abspath(__file__))
+
+
+# Load the addon from the folder of this script (the addon isnt enabled in a --factory-startup session) and register it
+def loadAddon():
+    if "AssetLibraryTools" in sys.modules:
+        return sys.modules["AssetLibraryTools"]
+    spec = importlib.util.spec_from_file_location("AssetLibraryTools", os.path.join(addonDir, "__init__.py"), submodule_search_locations=[addonDir])
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules["AssetLibraryTools"] = addon
+    spec.loader.exec_module(addon)
+    addon.register()
+    return addon
+
+
+# Apply "name=value" strings to the AssetLibraryTools settings of the scene, values are converted to the type of the setting
+def applySettings(tool, settings):
+    for setting in settings:
+        name, sep, value = setting.partition("=")
+        name = name.strip()
+        if sep == "" or name not in tool.bl_rna.properties:
+            raise ValueError("Unknown setting: {0}".format(setting))
+        current = getattr(tool, name)
+        if isinstance(current, bool):
+            value = value.strip().lower() in ("1", "true", "yes", "on")
+        elif isinstance(current, int):
+            value = int(value)
+        elif isinstance(current, float):
+            value = float(value)
+        setattr(tool, name, value)
+
+
+# Split the work into n shards with about the same number of bytes each (largest items first, each to the currently smallest shard)
+def splitShards(texSets, models, n):
+    items = [(sum(f.size for f in s.files.values()), "set", s) for s in texSets]
+    items += [(m.size, "model", list(m)) for m in models]
+    items.sort(key=lambda item: item[0], reverse=True)
+    shards = [{"bytes": 0, "textureSets": [], "models": []} for i in range(n)]
+    for size, kind, item in items:
+        shard = min(shards, key=lambda s: s["bytes"])
+        shard["bytes"] += size
+        if kind == "set":
+            shard["textureSets"].append(item)
+        else:
+            shard["models"].append(item)
+    for shard in shards: # Keep the import order of a shard the same as in a single import
+        shard["textureSets"].sort(key=lambda s: s.name)
+        shard["models"].sort()
+    return [s for s in shards if len(s["textureSets"]) > 0 or len(s["models"]) > 0]
+
+
+# Import one shard (written by runCoordinator) and save it as its own .blend
+def runWorker(shardPath):
+    addon = loadAddon()
+    with open(shardPath, "r", encoding="utf-8") as f:
+        shard = json.load(f)
+    tool = bpy.context.scene.assetlibrarytools
+    applySettings(tool, shard["settings"])
+    addon.textureWorkerPool.defaultWorkers = shard["textureWorkers"]
+    oldMaterials = set(bpy.data.materials)
+    oldObjects = set(bpy.data.objects)
+    if len(shard["textureSets"]) > 0:
+        tool.mat_import_path = shard["materialsRoot"]
+        bpy.ops.alt.batchimportpbr(manifest_path=shardPath, manifest_fragment_path=shard["manifestFragment"])
+    if len(shard["models"]) > 0:
+        tool.model_import_path = shard["modelsRoot"]
+        bpy.ops.alt.importmodels(manifest_path=shardPath)
+    materials = [m for m in bpy.data.materials if m not in oldMaterials]
+    objects = [o for o in bpy.data.objects if o not in oldObjects]
+    if shard["markAssets"]:
+        for asset in materials + objects:
+            asset.asset_mark()
+    bpy.ops.wm.save_as_mainfile(filepath=shard["output"])
+    result = {"blend": os.path.basename(shard["output"]), "materials": sorted(m.name for m in materials), "objects": sorted(o.name for o in objects)}
+    with open(shard["result"] + ".part", "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    os.replace(shard["result"] + ".part", shard["result"])
+
+
+# Start a background Blender for every shard and wait for all of them, returns the exit code of each
+# Without a Blender executable to start (bpy as a python module) the shards run one after another in this process
+def runShards(shardPaths):
+    if bpy.app.binary_path == "":
+        codes = []
+        for shardPath in shardPaths:
+            bpy.ops.wm.read_homefile(use_empty=True)
+            try:
+                runWorker(shardPath)
+                codes.append(0)
+            except Exception as e:
+                print("Shard {0} failed: {1}".format(shardPath, e))
+                codes.append(1)
+        return codes
+    processes = []
+    for shardPath in shardPaths:
+        log = open(os.path.splitext(shardPath)[0] + ".log", "w", encoding="utf-8")
+        cmd = [bpy.app.binary_path, "-b", "--factory-startup", "-noaudio", "--python-exit-code", "1", "-P", os.path.abspath(__file__), "--", "--worker", shardPath]
+        processes.append((subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT), log))
+    codes = []
+    for process, log in processes:
+        codes.append(process.wait())
+        log.close()
+    return codes
+
+
+# Append the assets of all shard .blends into one file
+def mergeShards(outputDir, results, path):
+    bpy.ops.wm.read_homefile(use_empty=True)
+    for result in results:
+        with bpy.data.libraries.load(os.path.join(outputDir, result["blend"]), link=False) as (data_from, data_to):
+            data_to.materials = [m for m in data_from.materials if m in result["materials"]]
+            data_to.objects = [o for o in data_from.objects if o in result["objects"]]
+        for obj in data_to.objects:
+            if obj != None:
+                bpy.context.scene.collection.objects.link(obj)
+    bpy.ops.wm.save_as_mainfile(filepath=path)
+
+
+def runCoordinator(args):
+    addon = loadAddon()
+    tool = bpy.context.scene.assetlibrarytools
+    applySettings(tool, args.set)
+    outputDir = os.path.realpath(args.output)
+    os.makedirs(outputDir, exist_ok=True)
+    startTime = time.perf_counter()
+    texSets = []
+    models = []
+    if args.materials != None:
+        tool.mat_import_path = os.path.realpath(args.materials)
+        texSets = addon.scanTextureSets(tool.mat_import_path, addon.CompileIgnoreFilter(tool.tex_ignore_filter))
+    if args.models != None:
+        tool.model_import_path = os.path.realpath(args.models)
+        models = addon.OT_ImportModels.findModels(tool)
+    shards = splitShards(texSets, models, max(1, args.shards))
+    print("{0} texture sets, models: {1}, {2} shards".format(len(texSets), addon.modelFilesSummary(models), len(shards)))
+    shardPaths = []
+    for i, shard in enumerate(shards):
+        shardPath = os.path.join(outputDir, "{0}_{1:03d}.json".format(args.name, i))
+        data = {
+            "settings": args.set,
+            "materialsRoot": tool.mat_import_path,
+            "modelsRoot": tool.model_import_path,
+            "textureSets": addon.textureSetsToJson(shard["textureSets"]),
+            "models": shard["models"],
+            "markAssets": not args.no_mark_assets,
+            "textureWorkers": max(1, (os.cpu_count() or 1) // len(shards)), # Shards share the cores for texture processing
+            "output": os.path.join(outputDir, "{0}_{1:03d}.blend".format(args.name, i)),
+            "result": os.path.join(outputDir, "{0}_{1:03d}.result.json".format(args.name, i)),
+            "manifestFragment": os.path.join(outputDir, "{0}_{1:03d}.manifest.json".format(args.name, i)), # Sets this shard imported (incremental import)
+            }
+        with open(shardPath, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        shardPaths.append(shardPath)
+    incremental = tool.incremental_import and args.materials != None
+    materialsRoot = tool.mat_import_path
+    codes = runShards(shardPaths) # Without a Blender executable this loads new files, tool is gone afterwards
+    if incremental: # Every shard recorded its own sets, add them all to the import manifest
+        addon.importManifest.merge(materialsRoot, [os.path.splitext(p)[0] + ".manifest.json" for p in shardPaths])
+    results = []
+    failed = []
+    for shardPath, code in zip(shardPaths, codes):
+        resultPath = os.path.splitext(shardPath)[0] + ".result.json"
+        if code != 0 or not os.path.exists(resultPath):
+            failed.append(os.path.basename(shardPath))
+            continue
+        with open(resultPath, "r", encoding="utf-8") as f:
+            results.append(json.load(f))
+    catalog = {
+        "shards": results,
+        "failed": failed,
+        "materials": sum(len(r["materials"]) for r in results),
+        "objects": sum(len(r["objects"]) for r in results),
+        }
+    with open(os.path.join(outputDir, "library.json"), "w", encoding="utf-8") as f:
+        json.dump(catalog, f, indent=1)
+    if args.merge and len(results) > 0:
+        mergeShards(outputDir, results, os.path.join(outputDir, args.name + ".blend"))
+    print("Complete in {0}, {1} materials and {2} objects in {3} .blend files, {4} shards failed (logs in {5})".format(
+        addon.formatDuration(time.perf_counter() - startTime), catalog["materials"], catalog["objects"], len(results), len(failed), outputDir))
+    return 1 if len(failed) > 0 else 0
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="blender -b --factory-startup -P ALT_BatchCLI.py --", description="Batch import PBR materials and models into asset library .blend files")
+    parser.add_argument("--materials", help="Directory of texture sets (one subdirectory per material)")
+    parser.add_argument("--models", help="Directory to search for model files")
+    parser.add_argument("--output", help="Directory to write the .blend files to")
+    parser.add_argument("--name", default="library", help="Name of the output files")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="Number of background Blender processes")
+    parser.add_argument("--set", action="append", default=[], metavar="SETTING=VALUE", help="AssetLibraryTools setting, can be repeated")
+    parser.add_argument("--merge", action="store_true", help="Also append all shards into <output>/<name>.blend")
+    parser.add_argument("--no-mark-assets", action="store_true", help="Dont mark the imported materials and objects as assets")
+    parser.add_argument("--worker", help=argparse.SUPPRESS) # Shard to import, used by the coordinator
+    args = parser.parse_args(argv)
+    if args.worker != None:
+        runWorker(args.worker)
+        return 0
+    if args.output == None or (args.materials == None and args.models == None):
+        parser.error("--output and at least one of --materials and --models are required")
+    return runCoordinator(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []))
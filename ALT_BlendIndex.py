@@ -0,0 +1,357 @@
+# AssetLibraryTools .blend index
+# Reads which IDs (objects, materials, node groups ...) a .blend file holds, and the type of every object, straight from the file block headers
+# and the SDNA (the struct layout every .blend carries), without bpy or loading the file into Blender. gzip and zstd compressed files are read too
+# (zstd needs the zstandard module, which Blender ships with). The results are kept in an SQLite index that only re-reads files whose size or
+# mtime changed, so the append operator can ask for just the IDs it wants and a library can be searched without opening anything:
+#   python ALT_BlendIndex.py index <dir> [--db <file>]
+#   python ALT_BlendIndex.py find <name> [--type objects] [--db <file>]
+# blendIndex.update() reads the files in a pool of plain python processes running this script ("read", paths on stdin, results on stdout).
+import concurrent.futures
+import functools
+import gzip
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import subprocess
+import sys
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# ID codes (the code of an ID's file block) -> the bpy.data collection holding that type
+idTypes = {
+    b"OB": "objects", b"ME": "meshes", b"MA": "materials", b"TE": "textures", b"IM": "images", b"NT": "node_groups",
+    b"GR": "collections", b"WO": "worlds", b"SC": "scenes", b"CA": "cameras", b"LA": "lights", b"CU": "curves",
+    b"CV": "hair_curves", b"PT": "pointclouds", b"VO": "volumes", b"GP": "grease_pencils", b"GD": "grease_pencils",
+    b"AC": "actions", b"AR": "armatures", b"LT": "lattices", b"MB": "metaballs", b"SO": "sounds", b"SK": "speakers",
+    b"LP": "lightprobes", b"BR": "brushes", b"PA": "particles", b"PL": "palettes", b"MC": "movieclips", b"MS": "masks",
+    b"LS": "linestyles", b"VF": "fonts", b"TX": "texts", b"CF": "cache_files", b"WS": "workspaces", b"LI": "libraries",
+}
+
+# Object.type values
+objectTypes = {
+    0: "EMPTY", 1: "MESH", 2: "CURVE", 3: "SURFACE", 4: "FONT", 5: "META", 10: "LIGHT", 11: "CAMERA", 12: "SPEAKER",
+    13: "LIGHT_PROBE", 22: "LATTICE", 25: "ARMATURE", 26: "GPENCIL", 27: "CURVES", 28: "POINTCLOUD", 29: "VOLUME", 30: "GREASEPENCIL",
+}
+
+class blendFileError(Exception):
+    pass
+
+
+# The contents of a .blend: uncompressed files are memory mapped (reading the headers only touches the pages they are on),
+# gzip and zstd compressed ones are decompressed into memory in one go
+def loadBlend(path):
+    with open(path, "rb") as f:
+        magic = f.read(4)
+        f.seek(0)
+        if magic[:2] == b"\x1f\x8b":
+            return gzip.GzipFile(fileobj=f).read()
+        if magic == b"\x28\xb5\x2f\xfd":
+            if zstandard == None:
+                raise blendFileError("zstd compressed, the zstandard module isnt installed")
+            return zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True).readall()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# Parse the SDNA block: the names, types and type sizes, and for every struct its fields as (type index, name index)
+def parseSDNA(data, endian):
+    pos = 0
+
+    def tag(expected):
+        nonlocal pos
+        pos = (pos + 3) & ~3
+        if data[pos:pos + 4] != expected:
+            raise blendFileError("bad SDNA, expected {0}".format(expected))
+        pos += 4
+
+    def strings():
+        nonlocal pos
+        n = struct.unpack_from(endian + "i", data, pos)[0]
+        pos += 4
+        out = []
+        for i in range(n):
+            end = data.index(b"\0", pos)
+            out.append(data[pos:end].decode("utf-8", "replace"))
+            pos = end + 1
+        return out
+
+    tag(b"SDNA")
+    tag(b"NAME")
+    names = strings()
+    tag(b"TYPE")
+    types = strings()
+    tag(b"TLEN")
+    lengths = struct.unpack_from(endian + "{0}h".format(len(types)), data, pos)
+    pos += 2 * len(types)
+    tag(b"STRC")
+    nStructs = struct.unpack_from(endian + "i", data, pos)[0]
+    pos += 4
+    structs = []
+    for i in range(nStructs):
+        typeIndex, nFields = struct.unpack_from(endian + "hh", data, pos)
+        fields = struct.unpack_from(endian + "{0}h".format(2 * nFields), data, pos + 4)
+        structs.append((typeIndex, list(zip(fields[0::2], fields[1::2]))))
+        pos += 4 + 4 * nFields
+    return names, types, lengths, structs
+
+
+# Offsets of the fields of a struct: {field name without * and [..]: (offset, type name, full field name)}
+def structFields(sdna, structIndex, pointerSize):
+    names, types, lengths, structs = sdna
+    fields = {}
+    offset = 0
+    for typeIndex, nameIndex in structs[structIndex][1]:
+        name = names[nameIndex]
+        count = 1
+        for dim in name.split("[")[1:]:
+            count *= int(dim.rstrip("]"))
+        isPointer = name.startswith("*") or name.startswith("(*")
+        base = name.split("[")[0].strip("*()")
+        fields[base] = (offset, types[typeIndex], name)
+        offset += (pointerSize if isPointer else lengths[typeIndex]) * count
+    return fields
+
+
+# Read the IDs a .blend holds, returns {"version": "5.0", "ids": [(bpy.data collection, name, object type or None, is asset), ...]}
+# IDs linked from other files arent listed, they are only placeholders in this one
+def readBlend(path):
+    data = loadBlend(path)
+    try:
+        return parseBlend(data)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def parseBlend(data):
+    header = bytes(data[:17])
+    if header[:7] != b"BLENDER":
+        raise blendFileError("not a .blend file")
+    if header[7:9].isdigit(): # Blender 5.0+ header: BLENDER, header size, pointer size, file format version, endianness, version
+        headerSize = int(header[7:9])
+        pointerSize = 8 if header[9:10] == b"-" else 4
+        formatVersion = int(header[10:12])
+        endian = "<" if header[12:13] == b"v" else ">"
+        version = header[13:headerSize].decode("ascii")
+    else:
+        headerSize = 12
+        pointerSize = 8 if header[7:8] == b"-" else 4
+        formatVersion = 0
+        endian = "<" if header[8:9] == b"v" else ">"
+        version = header[9:12].decode("ascii")
+    if formatVersion >= 1: # Large file blocks: code, SDNA index, old pointer, 64 bit length and count
+        bhead = struct.Struct(endian + "4siQqq")
+        lengthField = 3
+    else: # code, length, old pointer, SDNA index, count
+        bhead = struct.Struct(endian + ("4siQii" if pointerSize == 8 else "4siIii"))
+        lengthField = 1
+    unpack = bhead.unpack_from
+    bheadSize = bhead.size
+    blocks = [] # (id code, start and length of the data)
+    sdna = None
+    pos = headerSize
+    end = len(data)
+    while pos + bheadSize <= end: # Walk the file block headers, jumping over the data in between
+        b = unpack(data, pos)
+        code = b[0]
+        length = b[lengthField]
+        pos += bheadSize
+        if code == b"DATA": # Most blocks by far
+            pass
+        elif code == b"ENDB":
+            break
+        elif code == b"DNA1":
+            sdna = bytes(data[pos:pos + length])
+        elif code[2:] == b"\0\0" and code[:2] != b"ID": # ID blocks have a two letter code, ID is a placeholder of a linked ID
+            blocks.append((code[:2], pos, length))
+        pos += length
+    if sdna == None:
+        raise blendFileError("no SDNA")
+    nameOffset, nameLength, assetOffset, typeOffset = idLayout(sdna, endian, pointerSize)
+    pointerFormat = endian + ("Q" if pointerSize == 8 else "I")
+    ids = []
+    for code, start, length in blocks:
+        name = bytes(data[start + nameOffset + 2:start + nameOffset + nameLength]).split(b"\0", 1)[0].decode("utf-8", "replace") # The first two chars of the name are the ID code
+        objectType = None
+        if code == b"OB" and length >= typeOffset + 2:
+            value = struct.unpack_from(endian + "h", data, start + typeOffset)[0]
+            objectType = objectTypes.get(value, str(value))
+        isAsset = assetOffset != None and struct.unpack_from(pointerFormat, data, start + assetOffset)[0] != 0
+        ids.append((idTypes.get(code, code.decode("ascii", "replace")), name, objectType, isAsset))
+    return {"version": "{0}.{1}".format(int(version[:-2]), int(version[-2:])), "ids": ids}
+
+
+# Where the fields readBlend needs are: offset and length of ID.name, offset of ID.asset_data (None before 3.0) and of Object.type
+# Files written by the same Blender version have the same SDNA, so it is only parsed once per version
+@functools.lru_cache(maxsize=16)
+def idLayout(sdnaData, endian, pointerSize):
+    sdna = parseSDNA(sdnaData, endian)
+    structIndex = {sdna[1][typeIndex]: i for i, (typeIndex, fields) in enumerate(sdna[3])}
+    idFields = structFields(sdna, structIndex["ID"], pointerSize)
+    nameOffset, nameType, nameField = idFields["name"]
+    nameLength = int(nameField.split("[")[1].rstrip("]"))
+    assetOffset = idFields["asset_data"][0] if "asset_data" in idFields else None
+    typeOffset = structFields(sdna, structIndex["Object"], pointerSize)["type"][0]
+    return nameOffset, nameLength, assetOffset, typeOffset
+
+
+# readBlend for a list of paths, errors are returned instead of raised: [(path, result or None, error or None), ...]
+# Anything a broken file raises (truncated gzip EOFError, zstandard.ZstdError, bad struct data ...) is recorded as its error, one file never stops the rest
+def readBlends(paths):
+    results = []
+    for path in paths:
+        try:
+            results.append((path, readBlend(path), None))
+        except Exception as e:
+            results.append((path, None, "{0}: {1}".format(type(e).__name__, e)))
+    return results
+
+
+# Read the paths in worker processes running this script, chunkSize files per process launch.
+# Small jobs (or a failed worker) are read in this process
+def readBlendsParallel(paths, workers=None, chunkSize=64):
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    if len(paths) <= chunkSize or workers == 1:
+        return readBlends(paths)
+
+    def runChunk(chunk):
+        try:
+            p = subprocess.run([sys.executable, os.path.abspath(__file__), "read"], input=json.dumps(chunk), capture_output=True, text=True, encoding="utf-8")
+            if p.returncode == 0:
+                return [tuple(r) for r in json.loads(p.stdout)]
+        except (OSError, ValueError):
+            pass
+        return readBlends(chunk)
+
+    chunks = [paths[i:i + chunkSize] for i in range(0, len(paths), chunkSize)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return [r for results in executor.map(runChunk, chunks) for r in results]
+
+
+# Persistent index of the IDs in .blend files, files are only read again once their size or mtime changed
+class blendIndex():
+    schemaVersion = 1
+
+    def __init__(self, dbPath):
+        os.makedirs(os.path.dirname(os.path.abspath(dbPath)), exist_ok=True)
+        self.db = sqlite3.connect(dbPath)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != blendIndex.schemaVersion:
+            self.db.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS ids;")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, version TEXT, error TEXT);
+            CREATE TABLE IF NOT EXISTS ids (path TEXT, type TEXT, name TEXT, object_type TEXT, asset INTEGER);
+            CREATE INDEX IF NOT EXISTS ids_path ON ids (path);
+            CREATE INDEX IF NOT EXISTS ids_name ON ids (name);
+            PRAGMA user_version = {0};
+            """.format(blendIndex.schemaVersion))
+
+    # Bring the index up to date for paths, returns the number of files (re)read
+    def update(self, paths, workers=None):
+        known = {row[0]: (row[1], row[2]) for row in self.db.execute("SELECT path, size, mtime FROM files")}
+        stale = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (stat.st_size, stat.st_mtime_ns):
+                stale[path] = (stat.st_size, stat.st_mtime_ns)
+        if len(stale) == 0:
+            return 0
+        results = readBlendsParallel(list(stale), workers)
+        with self.db:
+            self.db.executemany("DELETE FROM ids WHERE path = ?", [(path,) for path in stale])
+            for path, result, error in results:
+                size, mtime = stale[path]
+                self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", (path, size, mtime, result["version"] if result != None else None, error))
+                if result != None:
+                    self.db.executemany("INSERT INTO ids VALUES (?, ?, ?, ?, ?)", [(path, t, name, objectType, int(isAsset)) for t, name, objectType, isAsset in result["ids"]])
+        return len(stale)
+
+    # Names of the IDs of one type (a bpy.data collection name) in a file, objects of the types in skipObjectTypes are left out
+    # None if the file isnt indexed or couldnt be read
+    def names(self, path, idType, skipObjectTypes=()):
+        row = self.db.execute("SELECT error FROM files WHERE path = ?", (path,)).fetchone()
+        if row == None or row[0] != None:
+            return None
+        rows = self.db.execute("SELECT name, object_type FROM ids WHERE path = ? AND type = ?", (path, idType))
+        return [name for name, objectType in rows if objectType not in skipObjectTypes]
+
+    # Files holding IDs whose name contains text: [(path, type, name), ...]
+    def find(self, text, idType=None):
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        if idType == None:
+            rows = self.db.execute("SELECT path, type, name FROM ids WHERE name LIKE ? ESCAPE '\\' ORDER BY path, type, name", (pattern,))
+        else:
+            rows = self.db.execute("SELECT path, type, name FROM ids WHERE name LIKE ? ESCAPE '\\' AND type = ? ORDER BY path, name", (pattern, idType))
+        return rows.fetchall()
+
+    # Files that couldnt be read: [(path, error), ...]
+    def errors(self):
+        return self.db.execute("SELECT path, error FROM files WHERE error IS NOT NULL ORDER BY path").fetchall()
+
+    # Drop files which arent in paths any more
+    def prune(self, paths):
+        gone = [(path,) for path, in self.db.execute("SELECT path FROM files") if path not in set(paths)]
+        with self.db:
+            self.db.executemany("DELETE FROM files WHERE path = ?", gone)
+            self.db.executemany("DELETE FROM ids WHERE path = ?", gone)
+
+    def close(self):
+        self.db.close()
+
+
+# .blend files under root, hidden directories (like the addon's .alt_cache) are skipped
+def findBlends(root, recursive=True):
+    found = []
+    stack = [root]
+    while len(stack) > 0:
+        with os.scandir(stack.pop()) as entries:
+            for e in entries:
+                if e.is_dir(follow_symlinks=False):
+                    if recursive and not e.name.startswith("."):
+                        stack.append(e.path)
+                elif e.name.lower().endswith(".blend"):
+                    found.append(e.path)
+    return sorted(found)
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog="ALT_BlendIndex.py", description="Index the IDs in .blend files without opening them in Blender")
+    sub = parser.add_subparsers(dest="command", required=True)
+    indexCmd = sub.add_parser("index", help="Index all .blend files in a directory (recursively)")
+    indexCmd.add_argument("dir")
+    indexCmd.add_argument("--db", help="Index file, default <dir>/.alt_cache/blend_index.sqlite")
+    indexCmd.add_argument("--workers", type=int)
+    findCmd = sub.add_parser("find", help="List the files holding IDs whose name contains a text")
+    findCmd.add_argument("name")
+    findCmd.add_argument("--type", help="bpy.data collection, e.g. objects or materials")
+    findCmd.add_argument("--db", required=True)
+    sub.add_parser("read", help=argparse.SUPPRESS) # Worker of readBlendsParallel
+    args = parser.parse_args(argv)
+    if args.command == "read":
+        json.dump(readBlends(json.load(sys.stdin)), sys.stdout)
+    elif args.command == "index":
+        root = os.path.realpath(args.dir)
+        index = blendIndex(args.db or os.path.join(root, ".alt_cache", "blend_index.sqlite"))
+        paths = findBlends(root)
+        index.prune(paths)
+        print("{0} .blend files, {1} read".format(len(paths), index.update(paths, args.workers)))
+        for path, error in index.errors():
+            print("{0}: {1}".format(path, error))
+        index.close()
+    elif args.command == "find":
+        index = blendIndex(args.db)
+        for path, idType, name in index.find(args.name, args.type):
+            print("{0}\t{1}\t{2}".format(path, idType, name))
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
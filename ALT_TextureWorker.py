@@ -0,0 +1,171 @@
+# AssetLibraryTools texture worker
+# Writes derived textures (converted maps, packed maps, low resolution proxies) into the texture cache for the PBR importer.
+# The addon runs it in background Blender processes, several at once:
+#   blender -b --factory-startup -P ALT_TextureWorker.py -- tasks.json results.json
+# or imports it and calls runTasks() directly when there is no Blender executable to start (bpy as a python module).
+# A task is the list of steps for one texture set, steps run in order and each one writes a single file ("dst") into the cache.
+import json
+import os
+import shutil
+import sys
+import bpy
+import numpy as np
+
+
+fileFormats = {".png": 'PNG', ".jpg": 'JPEG', ".jpeg": 'JPEG', ".exr": 'OPEN_EXR', ".tif": 'TIFF', ".tiff": 'TIFF', ".tga": 'TARGA', ".bmp": 'BMP', ".hdr": 'HDR'}
+
+
+# Temporary file to write path through, named after the process so workers making the same texture (e.g. one shared by the sets of two shards) dont collide
+def partPath(path):
+    return "{0}.{1}.part".format(path, os.getpid())
+
+
+# Save img to path via a temporary file, so other processes (and later runs) never see a half written texture
+def saveImage(img, path):
+    tmpPath = partPath(path)
+    img.filepath_raw = tmpPath
+    img.file_format = fileFormats.get(os.path.splitext(path)[1].lower(), 'PNG')
+    img.save()
+    os.replace(tmpPath, path)
+
+
+# Downscale src so its longest side is at most step["size"] pixels, smaller textures are copied as they are
+def proxyStep(step):
+    img = bpy.data.images.load(step["src"])
+    try:
+        w, h = img.size
+        if w == 0 or h == 0:
+            raise RuntimeError("could not load image")
+        scale = step["size"] / max(w, h, 1)
+        if scale >= 1:
+            tmpPath = partPath(step["dst"])
+            shutil.copyfile(step["src"], tmpPath)
+            os.replace(tmpPath, step["dst"])
+        else:
+            img.scale(max(1, round(w * scale)), max(1, round(h * scale)))
+            saveImage(img, step["dst"])
+    finally:
+        bpy.data.images.remove(img)
+
+
+# Load an image for reading its pixels as data, the colorspace is set straight away as changing it later reloads the image (and drops any scale())
+def loadData(path):
+    img = bpy.data.images.load(path)
+    img.colorspace_settings.name = 'Non-Color'
+    return img
+
+
+# Read all pixels of an image into a flat float32 RGBA array in one call
+def readPixels(img):
+    buf = np.empty(img.size[0] * img.size[1] * 4, dtype=np.float32)
+    img.pixels.foreach_get(buf)
+    return buf
+
+
+# Bytes an image takes in memory once loaded (byte images are RGBA 8 bit, float images RGBA 32 bit)
+def imageMemory(w, h, isFloat):
+    return w * h * 4 * (4 if isFloat else 1)
+
+
+# Pack the first channel of up to 4 grayscale textures (step["srcs"], None for unused channels) into the R, G, B and A channels of one image
+# Textures with a different size are scaled to the size of the largest one. A .json next to dst records the memory saved
+def packStep(step):
+    sources = []
+    try:
+        for src in step["srcs"]:
+            sources.append(loadData(src) if src != None else None)
+        loaded = [img for img in sources if img != None]
+        w = max(img.size[0] for img in loaded)
+        h = max(img.size[1] for img in loaded)
+        if w == 0 or h == 0:
+            raise RuntimeError("could not load images")
+        before = sum(imageMemory(img.size[0], img.size[1], img.is_float) for img in loaded)
+        isFloat = os.path.splitext(step["dst"])[1].lower() == ".exr"
+        out = np.ones(w * h * 4, dtype=np.float32)
+        for channel, img in enumerate(sources):
+            if img == None:
+                continue
+            if tuple(img.size) != (w, h):
+                img.scale(w, h)
+            out[channel::4] = readPixels(img)[0::4]
+        packed = bpy.data.images.new("packed", w, h, alpha=True, float_buffer=isFloat)
+        packed.colorspace_settings.name = 'Non-Color'
+        packed.alpha_mode = 'CHANNEL_PACKED' # Alpha is data, dont premultiply it
+        packed.pixels.foreach_set(out)
+        try:
+            with open(step["dst"] + ".json", "w", encoding="utf-8") as f:
+                json.dump({"saved": before - imageMemory(w, h, isFloat), "size": [w, h]}, f)
+            saveImage(packed, step["dst"])
+        finally:
+            bpy.data.images.remove(packed)
+    finally:
+        for img in sources:
+            if img != None:
+                bpy.data.images.remove(img)
+
+
+# Pixel conversions, each works in place on an (n, 4) float32 RGBA array
+conversions = {
+    "invert": lambda px: np.subtract(1.0, np.clip(px[:, :3], 0.0, 1.0), out=px[:, :3]), # Gloss -> roughness
+    "flip_green": lambda px: np.subtract(1.0, px[:, 1], out=px[:, 1]), # DirectX (Y-) -> OpenGL (Y+) normal map
+}
+
+
+# Apply the conversions in step["ops"] to all pixels of src at once and save the result as dst
+def convertStep(step):
+    img = loadData(step["src"])
+    try:
+        w, h = img.size
+        if w == 0 or h == 0:
+            raise RuntimeError("could not load image")
+        px = readPixels(img).reshape(-1, 4)
+        for op in step["ops"]:
+            conversions[op](px)
+        out = bpy.data.images.new("converted", w, h, alpha=True, float_buffer=img.is_float)
+        out.colorspace_settings.name = 'Non-Color'
+        out.pixels.foreach_set(px.ravel())
+        try:
+            saveImage(out, step["dst"])
+        finally:
+            bpy.data.images.remove(out)
+    finally:
+        bpy.data.images.remove(img)
+
+
+steps = {
+    "convert": convertStep,
+    "proxy": proxyStep,
+    "pack": packStep,
+}
+
+
+# Run a single task, returns a list of error messages (empty if everything worked)
+# Steps reading the output of a failed step are skipped
+def runTask(task):
+    errors = []
+    failed = set()
+    for step in task:
+        if os.path.exists(step["dst"]): # Written by an earlier run (or an earlier step of another task)
+            continue
+        if failed.intersection(step.get("srcs", [step.get("src")])):
+            failed.add(step["dst"])
+            continue
+        try:
+            steps[step["op"]](step)
+        except Exception as e:
+            errors.append("{0} {1}: {2}".format(step["op"], step.get("src", step["dst"]), e))
+            failed.add(step["dst"])
+    return errors
+
+
+def runTasks(tasks):
+    return [runTask(task) for task in tasks]
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:]
+    with open(argv[0], "r", encoding="utf-8") as f:
+        tasks = json.load(f)
+    results = runTasks(tasks)
+    with open(argv[1], "w", encoding="utf-8") as f:
+        json.dump(results, f)
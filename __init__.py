@@ -30,13 +30,21 @@ import re
 import os
 import time
 import random
+import functools
+import collections
+import concurrent.futures
+import hashlib
+import json
+import subprocess
+import tempfile
+import numpy as np
 
 
 # ------------------------------------------------------------------------
 #    Stuff
 # ------------------------------------------------------------------------ 
 
-diffNames = ["diffuse", "diff", "albedo", "base", "col", "color"]
+diffNames = ["diffuse", "diff", "albedo", "base", "basecolor", "col", "color"]
 sssNames = ["sss", "subsurface"]
 metNames = ["metallic", "metalness", "metal", "mtl", "met"]
 specNames = ["specularity", "specular", "spec", "spc"]
@@ -46,39 +54,612 @@ dispNames = ["displacement", "displace", "disp", "dsp", "height", "heightmap", "
 alphaNames = ["alpha", "opacity"]
 emissiveNames = ["emissive", "emission"]
 
+# Aliases of maps which are stored differently than blender expects, they are converted on import (see FindTextureConversion)
+glossNames = ["gloss", "glossy", "glossiness"]
+directxNames = ["dx", "directx"]
+
 nameLists = [diffNames, sssNames, metNames, specNames, roughNames, normNames, dispNames, alphaNames, emissiveNames]
 texTypes = ["diff", "sss", "met", "spec", "rough", "norm", "disp", "alpha", "emission"]
 
+# Compiled once from the alias lists above: exact token -> texture type, plus prefix/suffix regexes for compound tokens such as "basecolor" or "normalgl"
+texTokenMap = {}
+for nameList, texType in zip(nameLists, texTypes):
+    for name in nameList:
+        texTokenMap[name] = texType
+compoundAliases = sorted((name for name in texTokenMap if len(name) >= 4), key=len, reverse=True)
+compoundPrefixRe = re.compile("^(?:{0})".format("|".join(compoundAliases)))
+compoundSuffixRe = re.compile("(?:{0})$".format("|".join(compoundAliases)))
+# Digits and separators split tokens, as do CamelCase boundaries
+texTokenSplitRe = re.compile("[^A-Za-z]+|(?<=[a-z])(?=[A-Z])")
+
+# Split a file name (without extension) into lower case tokens
+def TextureNameTokens(fname):
+    stem = os.path.splitext(fname)[0]
+    return [t.lower() for t in texTokenSplitRe.split(stem) if t != '']
+
 # Find the type of PBR texture a file is based on its name
+# Whole tokens are matched against texTokenMap and the rightmost match wins (type suffixes come after the material name, e.g. Metal032_2K_Color).
+# Only if no token matches exactly are compound tokens (starting or ending with an alias of 4+ characters) considered, again rightmost first.
+@functools.lru_cache(maxsize=131072)
 def FindPBRTextureType(fname):
-    PBRTT = None
-    # Remove digits
-    fname = ''.join(i for i in fname if not i.isdigit())
-    # Separate CamelCase by space
-    fname = re.sub("([a-z])([A-Z])","\g<1> \g<2>",fname)
-    # Replace common separators with SPACE
-    seperators = ['_', '.', '-', '__', '--', '#']
-    for sep in seperators:
-        fname = fname.replace(sep, ' ')
-    # Set entire string to lower case
-    fname = fname.lower()
-    # Find PBRTT
-    i = 0
-    for nameList in nameLists:
-        for name in nameList:
-            if name in fname:
-                PBRTT = texTypes[i]
-        i+=1
-    return PBRTT
+    tokens = TextureNameTokens(fname)
+    for token in reversed(tokens):
+        PBRTT = texTokenMap.get(token)
+        if PBRTT != None:
+            return PBRTT
+    for token in reversed(tokens):
+        m = compoundSuffixRe.search(token) or compoundPrefixRe.match(token)
+        if m:
+            return texTokenMap[m.group(0)]
+    return None
+
+
+# Find the conversion a texture of type texType needs before blender can use it, "invert" for gloss maps and "flip_green" for DirectX normal maps
+# Decided by the same token that gave the type (Metal_Gloss is a gloss map, Gloss_Roughness isnt), DirectX normals are marked by a separate token (Normal_DX, NormalDX) or a compound token (normaldx)
+@functools.lru_cache(maxsize=131072)
+def FindTextureConversion(fname, texType):
+    tokens = TextureNameTokens(fname)
+    if texType == "rough":
+        for token in reversed(tokens):
+            if token in texTokenMap:
+                return "invert" if token in glossNames else None
+        for token in reversed(tokens):
+            m = compoundSuffixRe.search(token) or compoundPrefixRe.match(token)
+            if m:
+                return "invert" if m.group(0) in glossNames else None
+    elif texType == "norm":
+        for token in tokens:
+            if token in directxNames:
+                return "flip_green"
+            m = compoundPrefixRe.match(token)
+            if m and texTokenMap[m.group(0)] == "norm" and token[len(m.group(0)):] in directxNames:
+                return "flip_green"
+    return None
+
+
+# Compile the comma separated tex_ignore_filter into a single regex, returns None if the filter is empty
+def CompileIgnoreFilter(filterString):
+    patterns = [re.escape(f.strip()) for f in filterString.split(',') if f.strip() != '']
+    if len(patterns) == 0:
+        return None
+    return re.compile("|".join(patterns))
 
 
 # Display a message in the blender UI
 def DisplayMessageBox(message = "", title = "Info", icon = 'INFO'):
+    if bpy.app.background: # No window to show a popup in (command line imports, see ALT_BatchCLI.py)
+        print("{0}: {1}".format(title, message))
+        return
     def draw(self, context):
         self.layout.label(text=message)
     bpy.context.window_manager.popup_menu(draw, title = title, icon = icon)
 
 
+# A texture file found by scanTextureSets, size and mtime (in ns) come from the directory scan
+# source is set for derived files (e.g. proxies) and holds the full resolution texture the file was made from
+textureFile = collections.namedtuple("textureFile", ["path", "size", "mtime", "source"], defaults=[None])
+
+
+# One texture set (a subdirectory of the import directory) in the manifest produced by scanTextureSets
+class textureSet():
+    
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.files = {} # {texType: textureFile}
+
+
+# Convert texture sets to and from JSON, used to hand a share of an import to a background Blender process (see ALT_BatchCLI.py)
+def textureSetsToJson(texSets):
+    return [{"name": s.name, "path": s.path, "files": {t: list(f) for t, f in s.files.items()}} for s in texSets]
+
+def textureSetsFromJson(data):
+    texSets = []
+    for d in data:
+        texSet = textureSet(d["name"], d["path"])
+        texSet.files = {t: textureFile(*f) for t, f in d["files"].items()}
+        texSets.append(texSet)
+    return texSets
+
+
+# Classify the files of a single set directory while listing it, the DirEntry type info from os.scandir saves an is_file() stat per entry
+# Paths are resolved (symlinked set dirs and textures), so they match the keys imageCache makes for images already in the file
+def scanTextureSet(name, path, ignoreFilter=None):
+    path = os.path.realpath(path)
+    texSet = textureSet(name, path)
+    try:
+        with os.scandir(path) as it:
+            entries = sorted((e for e in it if e.is_file()), key=lambda e: e.name) # Sorted so the last file of a type wins deterministically
+    except OSError as e:
+        print("Failed to scan {0}: {1}".format(path, e))
+        return texSet
+    for e in entries:
+        if ignoreFilter != None and ignoreFilter.search(e.name): # Skip textures which contain a filtered string
+            continue
+        t = FindPBRTextureType(e.name)
+        if t != None:
+            if t in texSet.files and FindTextureConversion(e.name, t) != None and FindTextureConversion(os.path.basename(texSet.files[t].path), t) == None:
+                continue # Prefer maps which need no conversion (a set with both Roughness and Gloss, or both GL and DX normals)
+            stat = e.stat()
+            texSet.files[t] = textureFile(os.path.realpath(e.path) if e.is_symlink() else e.path, stat.st_size, stat.st_mtime_ns)
+    return texSet
+
+
+# Scan the import directory and return a manifest (list of textureSet, sorted by name) of all texture sets in it
+# Subdirectories are listed concurrently, which hides most of the latency of network drives
+def scanTextureSets(root, ignoreFilter=None, workers=None):
+    root = os.path.realpath(root)
+    with os.scandir(root) as it:
+        subdirs = sorted((e.name, e.path) for e in it if e.is_dir() and not e.name.startswith('.')) # Hidden dirs (such as the .alt_cache texture cache) are not sets
+    if workers == None:
+        workers = min(32, (os.cpu_count() or 1) * 4)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda sd: scanTextureSet(sd[0], sd[1], ignoreFilter), subdirs))
+
+
+# Model file types the model importer knows: file type -> ("import_x" toggle property, importer operators (the first one this version of blender has is used), extensions,
+# toggle description). The toggle properties and their rows in the panel are made from this, supporting another format only takes an entry here
+modelFileTypes = {
+    "FBX": ("import_fbx", ["import_scene.fbx"], [".fbx"], ""),
+    "GLTF": ("import_gltf", ["import_scene.gltf"], [".gltf", ".glb"], "Both .gltf and .glb"),
+    "OBJ": ("import_obj", ["wm.obj_import", "import_scene.obj"], [".obj"], ""),
+    "X3D": ("import_x3d", ["import_scene.x3d"], [".x3d"], ""),
+    "STL": ("import_stl", ["wm.stl_import", "import_mesh.stl"], [".stl"], ""),
+    "PLY": ("import_ply", ["wm.ply_import", "import_mesh.ply"], [".ply"], ""),
+    "DAE": ("import_dae", ["wm.collada_import"], [".dae"], "Collada, needs a version of Blender which still has the Collada importer"),
+    "USD": ("import_usd", ["wm.usd_import"], [".usd", ".usda", ".usdc", ".usdz"], ""),
+}
+modelExtensions = {ext: fileType for fileType, (prop, operators, exts, description) in modelFileTypes.items() for ext in exts}
+
+# A model file found by scanModelFiles
+modelFile = collections.namedtuple("modelFile", ["fileType", "path", "size"])
+
+
+# Return the first of the given operators ("module.name") which is registered, as a bpy.ops function, None if none of them is
+def findOperator(idnames):
+    for idname in idnames:
+        module, name = idname.split(".")
+        op = getattr(getattr(bpy.ops, module), name)
+        try:
+            op.get_rna_type()
+        except KeyError:
+            continue
+        return op
+    return None
+
+
+# Walk root once and bucket the files by extension, returns {file type: [modelFile, ...]} for the given {extension: file type}
+# Hidden directories (such as texture caches) are skipped and symlinked directories arent followed
+def scanModelFiles(root, extensions):
+    found = collections.defaultdict(list)
+    stack = [root]
+    while len(stack) > 0:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False):
+                        if not e.name.startswith('.'):
+                            stack.append(e.path)
+                        continue
+                    fileType = extensions.get(os.path.splitext(e.name)[1].lower())
+                    if fileType != None and e.is_file():
+                        found[fileType].append(modelFile(fileType, e.path, e.stat().st_size))
+        except OSError as err:
+            print("Failed to scan {0}: {1}".format(path, err))
+    for files in found.values():
+        files.sort()
+    return found
+
+
+# e.g. "14 files, 120.5 MB (12 FBX, 2 GLTF)"
+def modelFilesSummary(files):
+    counts = collections.Counter(f.fileType for f in files)
+    summary = "{0} files, {1:.1f} MB".format(len(files), sum(f.size for f in files) / 1e6)
+    if len(counts) > 0:
+        summary += " ({0})".format(", ".join("{0} {1}".format(counts[t], t) for t in modelFileTypes if t in counts))
+    return summary
+
+
+# Fingerprint of a texture set: hash of its file names, sizes and mtimes, changes whenever a texture is added, removed, renamed or modified
+def textureSetFingerprint(texSet):
+    h = hashlib.sha1()
+    for t in sorted(texSet.files):
+        f = texSet.files[t]
+        h.update("{0}|{1}|{2}|{3}\n".format(t, os.path.basename(f.path), f.size, f.mtime).encode("utf-8"))
+    return h.hexdigest()
+
+
+# Persistent record of what was imported from a directory ({set name: {"fingerprint": ..., "material": ...}}), stored as JSON next to the imported sets
+# With fragmentPath (several imports of one directory running side by side, see ALT_BatchCLI.py) save() only writes the sets recorded by this
+# import to that file, merge() then adds the fragments of all of them to the manifest. Otherwise the last import to finish would drop the sets of the others
+class importManifest():
+    fileName = ".alt_import_manifest.json"
+    
+    def __init__(self, root, fragmentPath=None):
+        self.path = os.path.join(root, importManifest.fileName)
+        self.fragmentPath = fragmentPath
+        self.recorded = {} # Sets recorded by this import
+        self.sets = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.sets = json.load(f).get("sets", {})
+        except (OSError, ValueError):
+            pass # No manifest yet (or an unreadable one), everything counts as new
+    
+    def get(self, name):
+        return self.sets.get(name)
+    
+    def record(self, name, fingerprint, materialName):
+        self.sets[name] = {"fingerprint": fingerprint, "material": materialName}
+        self.recorded[name] = self.sets[name]
+    
+    # Write the manifest (or the fragment) atomically, so an interrupted import never leaves a half written file behind
+    def save(self):
+        if self.fragmentPath != None:
+            importManifest.write(self.fragmentPath, self.recorded)
+        else:
+            importManifest.write(self.path, self.sets)
+    
+    def write(path, sets):
+        tmpPath = path + ".tmp"
+        try:
+            with open(tmpPath, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "sets": sets}, f, indent=1, sort_keys=True)
+            os.replace(tmpPath, path)
+        except OSError as e:
+            print("Failed to save import manifest {0}: {1}".format(path, e))
+    
+    # Add the sets of the fragments written by imports of root to its manifest and delete the fragments, missing fragments are skipped
+    def merge(root, fragmentPaths):
+        manifest = importManifest(root)
+        for path in fragmentPaths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    manifest.sets.update(json.load(f).get("sets", {}))
+            except (OSError, ValueError):
+                continue
+            os.remove(path)
+        manifest.save()
+
+
+# Key used by imageCache: resolved absolute path plus mtime and size, None if the file cant be stat'ed
+# Paths coming from the texture set manifest are already resolved and carry their size/mtime, so they dont touch the filesystem again
+def imageCacheKey(path, size=None, mtime=None):
+    if size == None or mtime == None:
+        try:
+            path = os.path.realpath(path)
+            stat = os.stat(path)
+        except OSError:
+            return None
+        size = stat.st_size
+        mtime = stat.st_mtime_ns
+    return (os.path.normcase(str(path)), mtime, size)
+
+
+# Custom property set on datablocks created by AssetLibraryTools imports
+altImportedProp = "alt_imported"
+
+
+# Import session cache of loaded images, so a texture shared by many sets (or already in the file) is only loaded once
+# Images are cached by file and requested colorspace: a map used both as color and as data (Non-Color) gets one image for each.
+# Requests without a colorspace (color maps) take whatever Blender picks and match any image which isnt in a data colorspace
+class imageCache():
+    
+    def __init__(self, matchExisting=False):
+        self.images = {}
+        self.hits = 0
+        self.misses = 0
+        self.preexisting = set() # Pointers of images which were already in the file before this session
+        # Index images which are already in the file so they can be reused
+        if matchExisting:
+            for img in bpy.data.images:
+                if img.source == 'FILE' and img.library == None and img.packed_file == None and img.filepath != '':
+                    key = imageCacheKey(bpy.path.abspath(img.filepath))
+                    if key != None:
+                        keys = [(key, img.colorspace_settings.name)]
+                        if not img.colorspace_settings.is_data:
+                            keys.append((key, None))
+                        for k in keys:
+                            if k not in self.images:
+                                self.images[k] = img
+                        self.preexisting.add(img.as_pointer())
+    
+    # Return the cached image for path in colorspace, or load it (setting its colorspace) if it is not cached yet
+    # Only images loaded here are marked as imported, images of the file which are reused stay the users own
+    def load(self, path, colorspace=None, size=None, mtime=None):
+        key = imageCacheKey(path, size, mtime)
+        if key != None:
+            key = (key, colorspace)
+        img = self.images.get(key)
+        if img != None:
+            try:
+                img.name # Raises ReferenceError if the image was deleted since it was cached
+                self.hits += 1
+                return img
+            except ReferenceError:
+                pass
+        img = bpy.data.images.load(str(path))
+        img[altImportedProp] = True
+        if colorspace != None:
+            img.colorspace_settings.name = colorspace
+        if key != None:
+            self.images[key] = img
+        self.misses += 1
+        return img
+    
+    # True if img was already in the file before this session, its pixels may be older than the file on disk
+    def isPreexisting(self, img):
+        return img.as_pointer() in self.preexisting
+
+
+# Directory derived textures (proxies etc.) are written to, a hidden folder in the import directory unless one is chosen
+def textureCacheDir(tool):
+    if tool.texture_cache_path != "":
+        return os.path.realpath(bpy.path.abspath(tool.texture_cache_path))
+    return os.path.join(os.path.realpath(tool.mat_import_path), ".alt_cache")
+
+
+# Cache path of a file derived from one or more textures, the name contains a hash of the source paths, sizes and mtimes plus the derivation ("tag"),
+# so a changed source gets a new cache file and unchanged sources are never processed again
+def derivedTexturePath(cacheDir, sources, tag, ext=None):
+    if isinstance(sources, textureFile):
+        sources = [sources]
+    stem, srcExt = os.path.splitext(os.path.basename(sources[0].path))
+    h = hashlib.sha1(tag.encode("utf-8"))
+    for f in sources:
+        h.update("|{0}|{1}|{2}".format(f.path, f.size, f.mtime).encode("utf-8"))
+    return os.path.join(cacheDir, "{0}_{1}_{2}{3}".format(stem, tag, h.hexdigest()[:16], ext or srcExt.lower()))
+
+
+# SHA-1 of a file's contents, memoized for the session by path, size and mtime so unchanged files are only read once
+@functools.lru_cache(maxsize=65536)
+def hashFile(path, size=None, mtime=None):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# Path in the cache dir of a converted (see FindTextureConversion) copy of f, keyed by the hash of the source contents
+# A converted map is found again even after the source is moved, renamed or copied to another library
+def convertedTexturePath(cacheDir, f, op):
+    stem, ext = os.path.splitext(os.path.basename(f.path))
+    ext = ".exr" if ext.lower() in floatExtensions else ".png"
+    return os.path.join(cacheDir, "{0}_{1}_{2}{3}".format(stem, op, hashFile(f.path, f.size, f.mtime)[:16], ext))
+
+
+# Runs ALT_TextureWorker tasks in a pool of background Blender processes (chunks of tasks per process)
+# If there is no Blender executable to start (bpy running as a python module) the chunks are run in this process when they are waited for
+class textureWorkerPool():
+    defaultWorkers = None # Overrides the number of worker processes, e.g. when several imports run side by side (ALT_BatchCLI.py)
+    
+    def __init__(self, workers=None):
+        self.workers = workers or textureWorkerPool.defaultWorkers or max(1, (os.cpu_count() or 2) - 1)
+        self.inProcess = bpy.app.binary_path == ""
+        self.executor = None if self.inProcess else concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        self.processes = set()
+        self.cancelled = False
+    
+    # Start working on a chunk of tasks, returns a handle for wait()
+    def submit(self, tasks):
+        if self.inProcess:
+            return {"tasks": tasks}
+        return self.executor.submit(self.runChunk, tasks)
+    
+    # Whether wait() would return without blocking. Chunks run in this process only run once they are waited for
+    def done(self, handle):
+        if self.inProcess:
+            return True
+        return handle.done()
+    
+    # Wait for a chunk to be done, returns one list of errors per task
+    def wait(self, handle):
+        if self.inProcess:
+            if "results" not in handle:
+                from . import ALT_TextureWorker
+                handle["results"] = ALT_TextureWorker.runTasks(handle["tasks"])
+            return handle["results"]
+        return handle.result()
+    
+    def runChunk(self, tasks):
+        if self.cancelled:
+            return [["cancelled"]] * len(tasks)
+        try:
+            return self.runWorker(tasks)
+        except Exception as e:
+            return [["texture worker failed: {0}".format(e)]] * len(tasks)
+    
+    def runWorker(self, tasks):
+        fd, tasksPath = tempfile.mkstemp(suffix=".json", prefix="alt_tasks_")
+        resultsPath = tasksPath[:-len(".json")] + "_results.json"
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(tasks, f)
+            script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ALT_TextureWorker.py")
+            p = subprocess.Popen([bpy.app.binary_path, "-b", "--factory-startup", "-noaudio", "-P", script, "--", tasksPath, resultsPath], stdout=subprocess.DEVNULL)
+            self.processes.add(p)
+            p.wait()
+            self.processes.discard(p)
+            with open(resultsPath, "r", encoding="utf-8") as f:
+                return json.load(f)
+        finally:
+            for path in (tasksPath, resultsPath):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    # Stop all work, running worker processes are killed (their partial outputs are .part files which are never used)
+    def shutdown(self):
+        self.cancelled = True
+        if self.executor != None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        for p in list(self.processes):
+            p.terminate()
+
+
+# Grayscale texture types which can be packed into the channels of one image, in the order they are given channels (R, G, B, A)
+# Displacement is left out, it is usually 16 bit or float and is sampled with cubic interpolation on its own
+packableTypes = ["rough", "met", "spec", "sss", "alpha"]
+floatExtensions = [".exr", ".hdr", ".tif", ".tiff"]
+
+
+# Plans the derived textures (packed grayscale maps, proxies) each set of a manifest needs, generates the missing ones in a textureWorkerPool while
+# materials are being built (in set order, so the first sets are ready first), and hands out the files each material should use
+class texturePipeline():
+    chunkSize = 16 # Sets per worker process launch
+    
+    def __init__(self, tool):
+        self.tool = tool
+        self.cacheDir = textureCacheDir(tool)
+        self.proxySize = int(tool.proxy_resolution) if tool.use_proxy_textures else 0
+        self.pack = tool.pack_grayscale_maps
+        self.convert = tool.convert_textures
+        self.pool = None
+        self.handles = {} # {set name: (chunk handle, task index)}
+        self.outputs = {} # {set name: (candidates, packed layout, pack fallback)}, see planSet
+        self.generated = 0
+        self.failed = 0
+        self.memorySaved = 0 # Bytes saved by packing, for the sets imported this session
+        self.cacheError = None # Set if the cache dir cant be created (read only library), materials then use the source maps
+    
+    def enabled(self):
+        return self.proxySize > 0 or self.pack or self.convert
+    
+    def plan(self, texSets):
+        if not self.enabled():
+            return
+        try:
+            cached = set(os.listdir(self.cacheDir)) # One listing instead of an exists() check per texture
+        except OSError: # Not made yet, submit creates it once there is something to write
+            cached = set()
+        if self.convert: # Hash the maps which need converting in parallel, planSet then gets the hashes from hashFile's cache
+            sources = [f for texSet in texSets for t, f in texSet.files.items() if FindTextureConversion(os.path.basename(f.path), t) != None]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+                list(pool.map(lambda f: hashFile(f.path, f.size, f.mtime), sources))
+        chunk = []
+        chunkSets = []
+        for texSet in texSets:
+            task = self.planSet(texSet, cached)
+            if len(task) > 0:
+                chunk.append(task)
+                chunkSets.append(texSet.name)
+            if len(chunk) >= texturePipeline.chunkSize:
+                self.submit(chunk, chunkSets)
+                chunk, chunkSets = [], []
+        if len(chunk) > 0:
+            self.submit(chunk, chunkSets)
+    
+    # Returns the worker steps texSet still needs, and records for each texture type the files to use (best first, the last one is the fallback)
+    def planSet(self, texSet, cached):
+        task = []
+        candidates = {}
+        for t, f in texSet.files.items():
+            if getattr(self.tool, texImportProps[t]): # Types which are not imported need no derived files
+                candidates[t] = [f]
+                op = FindTextureConversion(os.path.basename(f.path), t) if self.convert else None
+                if op != None: # Converted first, packing and proxies then read the converted map
+                    dst = convertedTexturePath(self.cacheDir, f, op)
+                    if os.path.basename(dst) not in cached:
+                        task.append({"op": "convert", "src": f.path, "dst": dst, "ops": [op]})
+                    candidates[t].insert(0, textureFile(dst, f.size, f.mtime))
+        packed = None
+        packFallback = {}
+        if self.pack:
+            packTypes = [t for t in packableTypes if t in candidates][:4]
+            if len(packTypes) >= 2:
+                sources = [candidates[t][0] for t in packTypes]
+                ext = ".exr" if any(os.path.splitext(f.path)[1].lower() in floatExtensions for f in sources) else ".png"
+                dst = derivedTexturePath(self.cacheDir, sources, "pack", ext)
+                if os.path.basename(dst) not in cached:
+                    task.append({"op": "pack", "srcs": [f.path for f in sources] + [None] * (4 - len(sources)), "dst": dst})
+                packed = tuple(packTypes + [None] * (4 - len(packTypes)))
+                packFallback = {t: candidates.pop(t) for t in packTypes} # Used if packing fails
+                candidates["packed"] = [textureFile(dst, sum(f.size for f in sources), max(f.mtime for f in sources))]
+        if self.proxySize > 0:
+            for t, files in candidates.items():
+                f = files[0]
+                dst = derivedTexturePath(self.cacheDir, f, "proxy{0}".format(self.proxySize))
+                if os.path.basename(dst) not in cached:
+                    task.append({"op": "proxy", "src": f.path, "dst": dst, "size": self.proxySize})
+                files.insert(0, textureFile(dst, f.size, f.mtime, f.path)) # Keyed by the source size/mtime, the path already tells proxies apart
+        self.outputs[texSet.name] = (candidates, packed, packFallback)
+        return task
+    
+    def submit(self, chunk, chunkSets):
+        if self.cacheError != None:
+            return
+        if self.pool == None:
+            try:
+                os.makedirs(self.cacheDir, exist_ok=True)
+            except OSError as e:
+                self.cacheError = e
+                print("Texture cache: cant create {0} ({1}), the source maps are used instead".format(self.cacheDir, e))
+                return
+            self.pool = textureWorkerPool()
+        handle = self.pool.submit(chunk)
+        for i, name in enumerate(chunkSets):
+            self.handles[name] = (handle, i)
+    
+    # Whether files() can return for texSet without waiting for the worker processes
+    def ready(self, texSet):
+        if texSet.name not in self.handles:
+            return True
+        return self.pool.done(self.handles[texSet.name][0])
+    
+    # The ({texType: textureFile}, packed layout) a material for texSet should use, waits for the set's derived textures if they are still being made
+    # The packed layout gives the texture type in each channel of files["packed"], it is None if the set isnt packed
+    # Textures whose derived file couldnt be made fall back to the source file
+    def files(self, texSet):
+        if not self.enabled():
+            return texSet.files, None
+        if texSet.name in self.handles:
+            handle, i = self.handles.pop(texSet.name)
+            errors = self.pool.wait(handle)[i]
+            for e in errors:
+                print("Texture cache: " + e)
+            self.failed += len(errors)
+            self.generated += 1
+        candidates, packed, packFallback = self.outputs[texSet.name]
+        files = {}
+        for t, options in candidates.items():
+            for f in options:
+                if os.path.exists(f.path) or (f is options[-1] and t != "packed"): # Source files exist, they come from the scan
+                    files[t] = f
+                    break
+        if packed != None:
+            if "packed" in files:
+                self.reportPacked(texSet, candidates["packed"][-1].path, packed)
+            else:
+                packed = None
+                for t, options in packFallback.items():
+                    files[t] = next((f for f in options if os.path.exists(f.path)), options[-1])
+        return files, packed
+    
+    # Print the memory packing saved for a set (recorded by the worker next to the packed image)
+    def reportPacked(self, texSet, path, packed):
+        try:
+            with open(path + ".json", "r", encoding="utf-8") as f:
+                saved = json.load(f)["saved"]
+        except (OSError, ValueError, KeyError):
+            return
+        self.memorySaved += saved
+        print("Packed {0} of {1} into one image, {2:.1f} MB saved".format(", ".join(t for t in packed if t != None), texSet.name, saved / 1e6))
+    
+    def shutdown(self):
+        if self.pool != None:
+            self.pool.shutdown()
+
+
+# Name of the image texture node created for each texture type, and the "import_x" property which turns that type on/off
+texNodeNames = {"diff": "node_imTexDiffuse", "sss": "node_imTexSSS", "met": "node_imTexMetallic", "spec": "node_imTexSpecular", "rough": "node_imTexRoughness",
+                "emission": "node_imTexEmission", "alpha": "node_imTexAlpha", "norm": "node_imTexNormal", "disp": "node_imTexDisplacement", "packed": "node_imTexPacked"}
+texImportProps = {"diff": "import_diff", "sss": "import_sss", "met": "import_met", "spec": "import_spec", "rough": "import_rough",
+                  "emission": "import_emission", "alpha": "import_alpha", "norm": "import_norm", "disp": "import_disp"}
+controlsGroupName = "ALT_Controls" # Node group shared by all imported materials when use_shared_controls is on
+texColorspaces = {"sss": 'Non-Color', "met": 'Non-Color', "spec": 'Non-Color', "rough": 'Non-Color', "alpha": 'Non-Color', "norm": 'Non-Color', "disp": 'Non-Color', "packed": 'Non-Color'}
+
+
 # Class with functions for setting up shaders
 class shaderSetup():
     
@@ -95,53 +676,92 @@ class shaderSetup():
                 node.projection = 'BOX'
                 node.projection_blend = 1
     
-    def simplePrincipledSetup(name, files):
+    # Load the textures of a set ({texType: textureFile}, see scanTextureSets and texturePipeline.files) through the image cache, returns {texType: image}
+    # Texture types which are turned off in the import options are not loaded at all
+    def loadTextures(files, images):
+        tool = bpy.context.scene.assetlibrarytools
+        textures = {}
+        for t, f in files.items():
+            if t == "packed" or getattr(tool, texImportProps[t]):
+                img = images.load(f.path, texColorspaces.get(t), f.size, f.mtime)
+                if t == "packed":
+                    img.alpha_mode = 'CHANNEL_PACKED' # The alpha channel holds a grayscale map
+                if f.source != None: # Remember both paths of proxies, so OT_SwapProxyTextures can switch between them
+                    if img.get("alt_fullres_path") == None:
+                        img.name = os.path.basename(f.source) # Named after the source texture, not the cache file
+                    img["alt_fullres_path"] = f.source
+                    img["alt_proxy_path"] = f.path
+                textures[t] = img
+        return textures
+    
+    # Point the image texture nodes of a material at the given {texType: image} textures
+    def assignImages(mat, textures):
+        nodes = mat.node_tree.nodes
+        for t, img in textures.items():
+            nodes[texNodeNames[t]].image = img
+    
+    # The node group with the controls all imported materials share (texture scale, displacement scale, roughness ramp), created on first use.
+    # Changing a value inside it changes every material using it at once. Its outputs are Scale, Displacement Scale and Roughness (the Roughness input through the ramp)
+    def controlsGroup():
+        group = shaderSetup.findControlsGroup()
+        if group != None:
+            return group
+        group = bpy.data.node_groups.new(controlsGroupName, "ShaderNodeTree")
+        group[altImportedProp] = True
+        group.use_fake_user = True # Kept even while no material uses it, so the controls arent lost
+        sockets = [('INPUT', "Roughness"), ('OUTPUT', "Scale"), ('OUTPUT', "Displacement Scale"), ('OUTPUT', "Roughness")]
+        for inOut, name in sockets:
+            if hasattr(group, "interface"):
+                group.interface.new_socket(name, in_out=inOut, socket_type='NodeSocketFloat')
+            else: # Before blender 4.0
+                (group.inputs if inOut == 'INPUT' else group.outputs).new('NodeSocketFloat', name)
+        nodes = group.nodes
+        links = group.links
+        node_input = nodes.new("NodeGroupInput")
+        node_input.location = (-600, -300)
+        node_output = nodes.new("NodeGroupOutput")
+        node_output.location = (300, 0)
+        node_scaleValue = nodes.new("ShaderNodeValue")
+        node_scaleValue.name = node_scaleValue.label = "node_scaleValue"
+        node_scaleValue.location = (0, 200)
+        node_scaleValue.outputs['Value'].default_value = 1
+        node_dispScale = nodes.new("ShaderNodeValue")
+        node_dispScale.name = node_dispScale.label = "node_displacementScale"
+        node_dispScale.location = (0, 0)
+        node_dispScale.outputs['Value'].default_value = 1
+        node_ramp = nodes.new("ShaderNodeValToRGB")
+        node_ramp.name = "node_imTexRoughnessColourRamp"
+        node_ramp.location = (-300, -300)
+        links.new(node_scaleValue.outputs['Value'], node_output.inputs['Scale'])
+        links.new(node_dispScale.outputs['Value'], node_output.inputs['Displacement Scale'])
+        links.new(node_input.outputs['Roughness'], node_ramp.inputs['Fac'])
+        links.new(node_ramp.outputs['Color'], node_output.inputs['Roughness'])
+        return group
+    
+    # The shared controls group made by controlsGroup, None if there is none (or its nodes were deleted)
+    def findControlsGroup():
+        for group in bpy.data.node_groups:
+            if group.get(altImportedProp) and group.name.startswith(controlsGroupName) and group.library == None:
+                if all(name in group.nodes for name in ("node_scaleValue", "node_displacementScale", "node_imTexRoughnessColourRamp")):
+                    return group
+        return None
+    
+    # Create an image texture node mapped by node_mapping
+    def createTexNode(mat, name, node_mapping, location):
+        node = shaderSetup.createNode(mat, "ShaderNodeTexImage", name, location)
+        mat.node_tree.links.new(node_mapping.outputs['Vector'], node.inputs['Vector'])
+        shaderSetup.setMapping(node)
+        return node
+    
+    # Create the node layout for a material using the given texture types, image texture nodes are left empty
+    # packed gives the texture type read from each channel (R, G, B, A) of the packed image, those types get no image node of their own
+    def buildPrincipledNodes(mat, types, packed=None):
         tool = bpy.context.scene.assetlibrarytools
-        # Create a new empty material
-        mat = bpy.data.materials.new(name)
         mat.use_nodes = True
         nodes = mat.node_tree.nodes
         links = mat.node_tree.links 
         nodes.clear() # Delete all nodes
         
-        # Load textures
-        diffuseTexture = None
-        sssTexture = None
-        metallicTexture = None
-        specularTexture = None
-        roughnessTexture = None
-        emissionTexture = None
-        alphaTexture = None
-        normalTexture = None
-        displacementTexture = None
-        for i in files:
-            t = FindPBRTextureType(i.name)
-            if t == "diff":
-                diffuseTexture = bpy.data.images.load(str(i))
-            elif t == "sss":
-                sssTexture = bpy.data.images.load(str(i))
-                sssTexture.colorspace_settings.name = 'Non-Color'
-            elif t == "met":
-                metallicTexture = bpy.data.images.load(str(i))
-                metallicTexture.colorspace_settings.name = 'Non-Color'
-            elif t == "spec":
-                specularTexture = bpy.data.images.load(str(i))
-                specularTexture.colorspace_settings.name = 'Non-Color'
-            elif t == "rough":
-                roughnessTexture = bpy.data.images.load(str(i))
-                roughnessTexture.colorspace_settings.name = 'Non-Color'
-            elif t == "emission":
-                emissionTexture = bpy.data.images.load(str(i))  
-            elif t == "alpha":
-                alphaTexture = bpy.data.images.load(str(i))
-                alphaTexture.colorspace_settings.name = 'Non-Color'
-            elif t == "norm":
-                normalTexture = bpy.data.images.load(str(i))
-                normalTexture.colorspace_settings.name = 'Non-Color'
-            elif t == "disp":
-                displacementTexture = bpy.data.images.load(str(i))
-                displacementTexture.colorspace_settings.name = 'Non-Color'
-        
         # Create base nodes
         node_output = shaderSetup.createNode(mat, "ShaderNodeOutputMaterial", "node_output", (250,0))
         node_principled = shaderSetup.createNode(mat, "ShaderNodeBsdfPrincipled", "node_principled", (-300,0))
@@ -149,96 +769,1215 @@ class shaderSetup():
         node_mapping = shaderSetup.createNode(mat, "ShaderNodeMapping", "node_mapping", (-1300,0))
         node_texCoord = shaderSetup.createNode(mat, "ShaderNodeTexCoord", "node_texCoord", (-1500,0))
         links.new(node_texCoord.outputs[tool.texture_mapping], node_mapping.inputs['Vector'])
-        if tool.add_extranodes:
+        node_controls = None
+        if tool.use_shared_controls:
+            node_controls = shaderSetup.createNode(mat, "ShaderNodeGroup", "node_controls", (-1500, -300))
+            node_controls.node_tree = shaderSetup.controlsGroup()
+            links.new(node_controls.outputs['Scale'], node_mapping.inputs['Scale'])
+        elif tool.add_extranodes:
             node_scaleValue = shaderSetup.createNode(mat, "ShaderNodeValue", "node_scaleValue", (-1500, -300))
             node_scaleValue.outputs['Value'].default_value = 1
             links.new(node_scaleValue.outputs['Value'], node_mapping.inputs['Scale'])
         
-        # Create, fill, and link texture nodes
+        # Output socket each texture type is read from
+        texOutputs = {}
         imported_tex_nodes = 0
-        if diffuseTexture != None and tool.import_diff != False:
-            node_imTexDiffuse = shaderSetup.createNode(mat, "ShaderNodeTexImage", "node_imTexDiffuse", (-800,300-(300*imported_tex_nodes)))
-            node_imTexDiffuse.image = diffuseTexture
-            links.new(node_imTexDiffuse.outputs['Color'], node_principled.inputs['Base Color'])
-            links.new(node_mapping.outputs['Vector'], node_imTexDiffuse.inputs['Vector'])
-            shaderSetup.setMapping(node_imTexDiffuse)
-            imported_tex_nodes += 1
-            
-        if sssTexture != None and tool.import_sss != False:
-            node_imTexSSS = shaderSetup.createNode(mat, "ShaderNodeTexImage", "node_imTexSSS", (-800,300-(300*imported_tex_nodes)))
-            node_imTexSSS.image = sssTexture
-            links.new(node_imTexSSS.outputs['Color'], node_principled.inputs['Subsurface'])
-            links.new(node_mapping.outputs['Vector'], node_imTexSSS.inputs['Vector'])
-            shaderSetup.setMapping(node_imTexSSS)
-            imported_tex_nodes += 1
-            
-        if metallicTexture != None and tool.import_met != False:
-            node_imTexMetallic = shaderSetup.createNode(mat, "ShaderNodeTexImage", "node_imTexMetallic", (-800,300-(300*imported_tex_nodes)))
-            node_imTexMetallic.image = metallicTexture
-            links.new(node_imTexMetallic.outputs['Color'], node_principled.inputs['Metallic'])
-            links.new(node_mapping.outputs['Vector'], node_imTexMetallic.inputs['Vector'])
-            shaderSetup.setMapping(node_imTexMetallic)
-            imported_tex_nodes += 1
-            
-        if specularTexture != None and tool.import_spec != False:
-            node_imTexSpecular = shaderSetup.createNode(mat, "ShaderNodeTexImage", "node_imTexSpecular", (-800,300-(300*imported_tex_nodes)))
-            node_imTexSpecular.image = specularTexture
-            links.new(node_imTexSpecular.outputs['Color'], node_principled.inputs['Specular'])
-            links.new(node_mapping.outputs['Vector'], node_imTexSpecular.inputs['Vector'])
-            shaderSetup.setMapping(node_imTexSpecular)
+        
+        # Packed grayscale maps: one image, split into its channels
+        if packed != None:
+            node_imTexPacked = shaderSetup.createTexNode(mat, "node_imTexPacked", node_mapping, (-1050,300-(300*imported_tex_nodes)))
+            try:
+                node_separatePacked = shaderSetup.createNode(mat, "ShaderNodeSeparateRGB", "node_separatePacked", (-800,300-(300*imported_tex_nodes)))
+            except RuntimeError: # Replaced by Separate Color in newer versions of blender
+                node_separatePacked = shaderSetup.createNode(mat, "ShaderNodeSeparateColor", "node_separatePacked", (-800,300-(300*imported_tex_nodes)))
+            links.new(node_imTexPacked.outputs['Color'], node_separatePacked.inputs[0])
+            for channel, t in enumerate(packed[:3]):
+                if t != None:
+                    texOutputs[t] = node_separatePacked.outputs[channel]
+            if packed[3] != None:
+                texOutputs[packed[3]] = node_imTexPacked.outputs['Alpha']
             imported_tex_nodes += 1
-            
-        if roughnessTexture != None and tool.import_rough != False:
-            node_imTexRoughness = shaderSetup.createNode(mat, "ShaderNodeTexImage", "node_imTexRoughness", (-800,300-(300*imported_tex_nodes)))
-            node_imTexRoughness.image = roughnessTexture
-            if tool.add_extranodes:
-                node_imTexRoughnessColourRamp = shaderSetup.createNode(mat, "ShaderNodeValToRGB", "node_imTexRoughnessColourRamp", (-550,300-(300*imported_tex_nodes)))
-                links.new(node_imTexRoughness.outputs['Color'], node_imTexRoughnessColourRamp.inputs['Fac'])
+        
+        # Create and link texture nodes
+        for t in texTypes:
+            if t in types and t not in texOutputs:
+                node = shaderSetup.createTexNode(mat, texNodeNames[t], node_mapping, (-800,300-(300*imported_tex_nodes)))
+                texOutputs[t] = node.outputs['Color']
+                imported_tex_nodes += 1
+        
+        if "diff" in texOutputs:
+            links.new(texOutputs["diff"], node_principled.inputs['Base Color'])
+        
+        if "sss" in texOutputs:
+            links.new(texOutputs["sss"], node_principled.inputs['Subsurface'])
+        
+        if "met" in texOutputs:
+            links.new(texOutputs["met"], node_principled.inputs['Metallic'])
+        
+        if "spec" in texOutputs:
+            links.new(texOutputs["spec"], node_principled.inputs['Specular'])
+        
+        if "rough" in texOutputs:
+            if node_controls != None and tool.add_extranodes:
+                links.new(texOutputs["rough"], node_controls.inputs['Roughness'])
+                links.new(node_controls.outputs['Roughness'], node_principled.inputs['Roughness'])
+            elif tool.add_extranodes:
+                location = nodes[texNodeNames["rough"]].location if texNodeNames["rough"] in nodes else nodes["node_separatePacked"].location
+                node_imTexRoughnessColourRamp = shaderSetup.createNode(mat, "ShaderNodeValToRGB", "node_imTexRoughnessColourRamp", (-550,location[1]))
+                links.new(texOutputs["rough"], node_imTexRoughnessColourRamp.inputs['Fac'])
                 links.new(node_imTexRoughnessColourRamp.outputs['Color'], node_principled.inputs['Roughness'])
             else:
-                links.new(node_imTexRoughness.outputs['Color'], node_principled.inputs['Roughness'])
-            links.new(node_mapping.outputs['Vector'], node_imTexRoughness.inputs['Vector'])
-            shaderSetup.setMapping(node_imTexRoughness)
-            imported_tex_nodes += 1
-            
-        if emissionTexture != None and tool.import_emission != False:
-            node_imTexEmission = shaderSetup.createNode(mat, "ShaderNodeTexImage", "node_imTexEmission", (-800,300-(300*imported_tex_nodes)))
-            node_imTexEmission.image = emissionTexture
-            links.new(node_imTexEmission.outputs['Color'], node_principled.inputs['Emission'])
-            links.new(node_mapping.outputs['Vector'], node_imTexEmission.inputs['Vector'])
-            shaderSetup.setMapping(node_imTexEmission)
-            imported_tex_nodes += 1
-            
-        if alphaTexture != None and tool.import_alpha != False:
-            node_imTexAlpha = shaderSetup.createNode(mat, "ShaderNodeTexImage", "node_imTexAlpha", (-800,300-(300*imported_tex_nodes)))
-            node_imTexAlpha.image = alphaTexture
-            links.new(node_imTexAlpha.outputs['Color'], node_principled.inputs['Alpha'])
-            links.new(node_mapping.outputs['Vector'], node_imTexAlpha.inputs['Vector'])
-            shaderSetup.setMapping(node_imTexAlpha)
-            imported_tex_nodes += 1
-            
-        if normalTexture != None and tool.import_norm != False:
-            node_imTexNormal = shaderSetup.createNode(mat, "ShaderNodeTexImage", "node_imTexNormal", (-800,300-(300*imported_tex_nodes)))
-            node_imTexNormal.image = normalTexture
-            node_normalMap = shaderSetup.createNode(mat, "ShaderNodeNormalMap", "node_normalMap", (-500,300-(300*imported_tex_nodes)))
-            links.new(node_imTexNormal.outputs['Color'], node_normalMap.inputs['Color'])
+                links.new(texOutputs["rough"], node_principled.inputs['Roughness'])
+        
+        if "emission" in texOutputs:
+            links.new(texOutputs["emission"], node_principled.inputs['Emission'])
+        
+        if "alpha" in texOutputs:
+            links.new(texOutputs["alpha"], node_principled.inputs['Alpha'])
+        
+        if "norm" in texOutputs:
+            location = nodes[texNodeNames["norm"]].location
+            node_normalMap = shaderSetup.createNode(mat, "ShaderNodeNormalMap", "node_normalMap", (-500,location[1]))
+            links.new(texOutputs["norm"], node_normalMap.inputs['Color'])
             links.new(node_normalMap.outputs['Normal'], node_principled.inputs['Normal'])
-            links.new(node_mapping.outputs['Vector'], node_imTexNormal.inputs['Vector'])
-            shaderSetup.setMapping(node_imTexNormal)
-            imported_tex_nodes += 1
-            
-        if displacementTexture != None and tool.import_disp != False:
-            node_imTexDisplacement = shaderSetup.createNode(mat, "ShaderNodeTexImage", "node_imTexDisplacement", (-800,300-(300*imported_tex_nodes)))
-            node_imTexDisplacement.image = displacementTexture
-            node_imTexDisplacement.interpolation = 'Smart'
+        
+        if "disp" in texOutputs:
+            nodes[texNodeNames["disp"]].interpolation = 'Smart'
             node_displacement = shaderSetup.createNode(mat, "ShaderNodeDisplacement", "node_displacement", (-200,-600))
-            links.new(node_imTexDisplacement.outputs['Color'], node_displacement.inputs['Height'])
+            links.new(texOutputs["disp"], node_displacement.inputs['Height'])
             links.new(node_displacement.outputs['Displacement'], node_output.inputs['Displacement'])
-            links.new(node_mapping.outputs['Vector'], node_imTexDisplacement.inputs['Vector'])
-            shaderSetup.setMapping(node_imTexDisplacement)
-            imported_tex_nodes += 1
-        
+            if node_controls != None:
+                links.new(node_controls.outputs['Displacement Scale'], node_displacement.inputs['Scale'])
+    
+    # Create a material from a set of classified texture files ({texType: textureFile})
+    # With a materialTemplates cache the node layout is only built once per texture combination and copied for every further material
+    # packed is the channel layout of files["packed"] (see texturePipeline.files)
+    def simplePrincipledSetup(name, files, images=None, templates=None, packed=None):
+        if images == None:
+            images = imageCache()
+        textures = shaderSetup.loadTextures(files, images)
+        types = set(textures.keys())
+        if packed != None:
+            types.update(t for t in packed if t != None)
+        if templates != None:
+            mat = templates.new(name, types, packed)
+        else:
+            mat = bpy.data.materials.new(name)
+            shaderSetup.buildPrincipledNodes(mat, types, packed)
+        shaderSetup.assignImages(mat, textures)
+        mat[altImportedProp] = True
+        return mat
+
+
+# Template materials for one import session, one per "signature" (texture types present + options that change the node layout)
+# Building a layout takes 10-20 nodes.new/links.new calls, copying a template is a single Material.copy()
+class materialTemplates():
+    
+    def __init__(self):
+        self.templates = {}
+        self.built = 0
+        self.copied = 0
+    
+    def signature(types, packed=None):
+        tool = bpy.context.scene.assetlibrarytools
+        return (tuple(t for t in texTypes if t in types), packed, tool.add_extranodes, tool.texture_mapping, tool.use_shared_controls)
+    
+    # Create a new material called name with the node layout for the given texture types
+    def new(self, name, types, packed=None):
+        sig = materialTemplates.signature(types, packed)
+        template = self.templates.get(sig)
+        if template == None:
+            template = bpy.data.materials.new(".ALT_template") # Names starting with "." are hidden in the UI
+            shaderSetup.buildPrincipledNodes(template, sig[0], packed)
+            self.templates[sig] = template
+            self.built += 1
+        mat = template.copy()
+        mat.name = name
+        self.copied += 1
         return mat
+    
+    # Delete the template materials, call this once the import session is over
+    def clear(self):
+        for template in self.templates.values():
+            bpy.data.materials.remove(template)
+        self.templates = {}
+
+
+# An empty scene to import model files into. Importers do work for every object in the scene they import into (deselecting, depsgraph updates),
+# so importing into a large scene gets slower with every file, and finding the objects a file created meant comparing the whole scene before and after.
+# In the staging scene objects() is just the new objects, release() then moves them into a collection of the real scene (O(new objects))
+class stagingScene():
+    
+    def __init__(self, context):
+        self.scene = bpy.data.scenes.new(".ALT_staging")
+        self.targetCollection = context.view_layer.active_layer_collection.collection
+    
+    # Call an operator as if the staging scene was the active one, context holds further context members to override
+    def call(self, op, context={}, **kwargs):
+        members = dict(scene=self.scene, view_layer=self.scene.view_layers[0], **context)
+        if hasattr(bpy.context, "temp_override"):
+            with bpy.context.temp_override(**members):
+                return op(**kwargs)
+        override = bpy.context.copy() # Blender < 3.2
+        override.update(members)
+        return op(override, **kwargs)
+    
+    def objects(self):
+        return list(self.scene.collection.all_objects)
+    
+    # Move everything imported into collection, by default the collection that was active when the staging scene was made
+    def release(self, collection=None):
+        if collection == None:
+            collection = self.targetCollection
+        master = self.scene.collection
+        for obj in list(master.objects):
+            collection.objects.link(obj)
+            master.objects.unlink(obj)
+        for child in list(master.children): # Collections made by the importer
+            collection.children.link(child)
+            master.children.unlink(child)
+    
+    def remove(self):
+        bpy.data.scenes.remove(self.scene)
+
+
+def modelCacheDir(tool):
+    if tool.model_cache_path != "":
+        return os.path.realpath(bpy.path.abspath(tool.model_cache_path))
+    return os.path.join(os.path.realpath(bpy.path.abspath(tool.model_import_path)), ".alt_cache", "models")
+
+
+# Cache of converted models: every source model is imported once and saved as a small .blend, later imports append it from there instead of parsing the source again
+# Entries are keyed by the hash of the source contents, the importer and the blender version, so a changed source (or importer) is a miss and gets converted again.
+# index.json records for each entry its size and when it was last used, the least recently used entries are deleted once the cache is larger than max_mb.
+# It also remembers the hash of each source by path, size and mtime, so unchanged sources arent read again to hash them
+class modelCache():
+    indexName = "index.json"
+    collectionName = "ALT_cached_model"
+    
+    def __init__(self, tool):
+        self.dir = modelCacheDir(tool)
+        self.maxBytes = tool.model_cache_max_mb * 1000000
+        self.indexPath = os.path.join(self.dir, modelCache.indexName)
+        self.entries, self.sources = modelCache.readIndex(self.indexPath)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.failed = 0 # Conversions which couldnt be saved, the models were imported all the same
+        self.error = None # Set if the cache dir cant be created (read only import directory), the importer then doesnt use the cache
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+        except OSError as e:
+            self.error = e
+            print("Model cache: cant create {0} ({1}), models are imported without the cache".format(self.dir, e))
+    
+    def readIndex(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            return index.get("entries", {}), index.get("sources", {})
+        except (OSError, ValueError):
+            return {}, {}
+    
+    def key(self, item, importFn):
+        stat = [item.size, os.stat(item.path).st_mtime_ns]
+        source = self.sources.get(item.path)
+        if source == None or source[:2] != stat:
+            source = stat + [hashFile(item.path, *stat)]
+            self.sources[item.path] = source
+        return hashlib.sha1("{0}|{1}|{2}".format(source[2], importFn.idname_py(), bpy.app.version_string).encode("utf-8")).hexdigest()
+    
+    # Append the cached conversion of item into the staging scene, returns False on a miss
+    def load(self, item, importFn, staging):
+        key = self.key(item, importFn)
+        entry = self.entries.get(key)
+        path = os.path.join(self.dir, key + ".blend")
+        if entry == None or not os.path.exists(path):
+            self.misses += 1
+            return False
+        with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
+            data_to.collections = [modelCache.collectionName]
+        wrapper = data_to.collections[0]
+        master = staging.scene.collection
+        for obj in wrapper.objects:
+            master.objects.link(obj)
+        for child in wrapper.children:
+            master.children.link(child)
+        bpy.data.collections.remove(wrapper)
+        entry["used"] = time.time()
+        self.hits += 1
+        return True
+    
+    # Save what was just imported into the staging scene as the cache entry of item
+    def store(self, item, importFn, staging):
+        key = self.key(item, importFn)
+        path = os.path.join(self.dir, key + ".blend")
+        master = staging.scene.collection
+        wrapper = bpy.data.collections.new(modelCache.collectionName) # Holds everything the import made, so the .blend has a single thing to append
+        for obj in master.objects:
+            wrapper.objects.link(obj)
+        for child in master.children:
+            wrapper.children.link(child)
+        try:
+            bpy.data.libraries.write(path, {wrapper})
+            size = os.path.getsize(path)
+        except (OSError, RuntimeError) as e: # Cache dir read only or full
+            print("Model cache: cant write {0} ({1})".format(path, e))
+            self.failed += 1
+            return
+        finally:
+            bpy.data.collections.remove(wrapper)
+        for oldKey in [k for k, e in self.entries.items() if e["source"] == item.path]: # Earlier conversions of the same file are outdated
+            self.remove(oldKey)
+        self.entries[key] = {"source": item.path, "size": size, "used": time.time()}
+        self.evict()
+    
+    def remove(self, key):
+        self.entries.pop(key, None)
+        try:
+            os.remove(os.path.join(self.dir, key + ".blend"))
+        except OSError:
+            pass
+    
+    # Delete the least recently used entries until the cache fits into its size limit
+    def evict(self):
+        total = sum(e["size"] for e in self.entries.values())
+        for key, entry in sorted(self.entries.items(), key=lambda e: e[1]["used"]):
+            if total <= self.maxBytes:
+                break
+            total -= entry["size"]
+            self.remove(key)
+            self.evicted += 1
+    
+    # Write the index, merged with the one on disk in case another process (see ALT_BatchCLI.py) added entries meanwhile
+    def save(self):
+        entries, sources = modelCache.readIndex(self.indexPath)
+        entries = {k: e for k, e in entries.items() if os.path.exists(os.path.join(self.dir, k + ".blend"))}
+        entries.update(self.entries)
+        sources.update(self.sources)
+        tmpPath = self.indexPath + ".tmp"
+        try:
+            with open(tmpPath, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "entries": entries, "sources": sources}, f)
+            os.replace(tmpPath, self.indexPath)
+        except OSError as e:
+            print("Failed to save model cache index {0}: {1}".format(self.indexPath, e))
+    
+    def summary(self):
+        msg = "Model cache: {0} hits, {1} misses, {2} evicted".format(self.hits, self.misses, self.evicted)
+        if self.failed > 0:
+            msg += ", {0} failed to save".format(self.failed)
+        return msg
+
+
+# Attributes joinMeshObjects handles itself, all others (colors, sharp edges, anything an importer added) are concatenated by domain
+joinHandledAttributes = {"position", "material_index", "sharp_face", "custom_normal"}
+
+
+# Join with bpy.ops.object.join, for objects with data joinMeshObjects cant carry over. The objects must all be in one scene
+def joinMeshObjectsOperator(objects):
+    scene = objects[0].users_scene[0]
+    members = dict(scene=scene, view_layer=scene.view_layers[0], active_object=objects[0], object=objects[0], selected_objects=objects, selected_editable_objects=objects)
+    if hasattr(bpy.context, "temp_override"):
+        with bpy.context.temp_override(**members):
+            bpy.ops.object.join()
+    else: # Blender < 3.2
+        override = bpy.context.copy()
+        override.update(members)
+        bpy.ops.object.join(override)
+    return objects[0]
+
+
+# Join mesh objects into the first one at the data level, without bpy.ops.object.join (so without selection, an active object or view layer updates)
+# Vertices, edges, faces, UV layers (by name), smooth shading, custom normals, other attributes (by name) and materials (merged into one list of slots)
+# are concatenated as NumPy arrays with foreach_get/foreach_set, the vertices and normals moved into the space of the first object with one matrix multiply.
+# The other objects (and meshes no longer used) are removed. Vertex groups and shape keys cant be read in bulk, objects with those (or with
+# attributes of a type that cant be, strings) are joined with bpy.ops.object.join instead. Returns the joined object
+def joinMeshObjects(objects):
+    objects = [obj for obj in objects if obj.type == 'MESH' and obj.library == None and obj.data.library == None] # Linked data cant be changed
+    if len(objects) < 2:
+        return objects[0] if len(objects) > 0 else None
+    target = objects[0]
+    meshes = [obj.data for obj in objects]
+    
+    # Generic attributes by name, the first mesh with one decides its domain and type
+    attributes = {}
+    for me in meshes:
+        uvNames = set(layer.name for layer in me.uv_layers)
+        for attr in me.attributes:
+            if attr.name.startswith(".") or attr.name in joinHandledAttributes or attr.name in uvNames or attr.name in attributes:
+                continue
+            if attr.data_type not in attributeBuffers:
+                return joinMeshObjectsOperator(objects)
+            attributes[attr.name] = (attr.domain, attr.data_type)
+    if any(len(obj.vertex_groups) > 0 or obj.data.shape_keys != None for obj in objects):
+        return joinMeshObjectsOperator(objects)
+    
+    for scene in set(scene for obj in objects for scene in obj.users_scene): # matrix_world is only up to date once the scene was updated (cheap if nothing changed)
+        scene.view_layers[0].update()
+    nVerts = np.array([len(me.vertices) for me in meshes])
+    nEdges = np.array([len(me.edges) for me in meshes])
+    nLoops = np.array([len(me.loops) for me in meshes])
+    nPolys = np.array([len(me.polygons) for me in meshes])
+    vertOffsets = np.concatenate(([0], np.cumsum(nVerts)[:-1]))
+    
+    def gather(collections, attr, dtype, width=1):
+        parts = []
+        for c in collections:
+            a = np.empty(len(c) * width, dtype=dtype)
+            c.foreach_get(attr, a)
+            parts.append(a.reshape(-1, width) if width > 1 else a)
+        return np.concatenate(parts)
+    
+    # Buffers match the RNA types (float32, int32) so foreach_get copies them in one go instead of item by item
+    # Vertices, moved into target space: one (3x4) matrix per vertex, picked by the index of the object it came from
+    co = gather([me.vertices for me in meshes], "co", np.float32, 3).astype(np.float64)
+    invTarget = np.array(target.matrix_world.inverted())
+    matrices = np.array([invTarget @ np.array(obj.matrix_world) for obj in objects])
+    vertObject = np.repeat(np.arange(len(objects)), nVerts)
+    co = np.einsum("nij,nj->ni", matrices[vertObject, :3, :3], co) + matrices[vertObject, :3, 3]
+    
+    edges = gather([me.edges for me in meshes], "vertices", np.int32, 2) + np.repeat(vertOffsets, nEdges)[:, None]
+    loopVerts = gather([me.loops for me in meshes], "vertex_index", np.int32) + np.repeat(vertOffsets, nLoops)
+    loopEdges = gather([me.loops for me in meshes], "edge_index", np.int32) + np.repeat(np.concatenate(([0], np.cumsum(nEdges)[:-1])), nLoops)
+    loopStart = gather([me.polygons for me in meshes], "loop_start", np.int32) + np.repeat(np.concatenate(([0], np.cumsum(nLoops)[:-1])), nPolys)
+    loopTotal = gather([me.polygons for me in meshes], "loop_total", np.int32)
+    smooth = gather([me.polygons for me in meshes], "use_smooth", bool)
+    
+    # Objects with a negative scale are mirrored, reverse their faces so the normals dont flip (first corner stays first, like join does)
+    order = np.arange(len(loopVerts))
+    edgeOrder = np.arange(len(loopVerts))
+    mirrored = np.array([obj.matrix_world.determinant() * target.matrix_world.determinant() < 0 for obj in objects])
+    if mirrored.any():
+        polyLoops = np.repeat(np.arange(len(loopStart)), loopTotal)
+        loopMirrored = np.repeat(mirrored[np.repeat(np.arange(len(objects)), nPolys)], loopTotal)
+        start = loopStart[polyLoops]
+        total = loopTotal[polyLoops]
+        k = order - start
+        order = np.where(loopMirrored, start + (total - k) % total, order)
+        edgeOrder = np.where(loopMirrored, start + (total - k - 1) % total, edgeOrder)
+    
+    # Materials: one list of slots for all objects, material indices remapped into it
+    materials = []
+    materialIndex = []
+    for obj, me in zip(objects, meshes):
+        slots = [slot.material for slot in obj.material_slots] or [None]
+        remap = []
+        for mat in slots:
+            if mat not in materials:
+                materials.append(mat)
+            remap.append(materials.index(mat))
+        local = np.empty(len(me.polygons), dtype=np.int32)
+        me.polygons.foreach_get("material_index", local)
+        materialIndex.append(np.array(remap)[np.clip(local, 0, len(remap) - 1)])
+    materialIndex = np.concatenate(materialIndex)
+    
+    # UV layers by name, meshes without a layer get (0, 0)
+    uvNames = []
+    for me in meshes:
+        for layer in me.uv_layers:
+            if layer.name not in uvNames:
+                uvNames.append(layer.name)
+    uvs = {}
+    for name in uvNames:
+        parts = []
+        for me in meshes:
+            a = np.zeros(len(me.loops) * 2, dtype=np.float32)
+            if name in me.uv_layers:
+                me.uv_layers[name].data.foreach_get("uv", a)
+            parts.append(a.reshape(-1, 2))
+        uvs[name] = np.concatenate(parts)[order]
+    
+    # Other attributes, meshes without one (or with one of another domain or type) get zeros. Corners follow the reversed faces
+    sizes = {'POINT': nVerts, 'EDGE': nEdges, 'FACE': nPolys, 'CORNER': nLoops}
+    attributeValues = {}
+    for name, (domain, dataType) in attributes.items():
+        prop, dtype, width = attributeBuffers[dataType]
+        parts = []
+        for me, n in zip(meshes, sizes[domain]):
+            a = np.zeros(n * width, dtype=dtype)
+            attr = me.attributes.get(name)
+            if attr != None and attr.domain == domain and attr.data_type == dataType:
+                attr.data.foreach_get(prop, a)
+            parts.append(a.reshape(-1, width))
+        values = np.concatenate(parts)
+        attributeValues[name] = values[order] if domain == 'CORNER' else values
+    
+    # Custom normals: the corner normals of every mesh (custom or not, so the others look as before too), rotated like the vertices
+    normals = None
+    if any(me.has_custom_normals for me in meshes):
+        parts = []
+        for me in meshes:
+            a = np.empty(len(me.loops) * 3, dtype=np.float32)
+            if hasattr(me, "corner_normals"):
+                me.corner_normals.foreach_get("vector", a)
+            else: # Before blender 4.1
+                me.calc_normals_split()
+                me.loops.foreach_get("normal", a)
+            parts.append(a.reshape(-1, 3))
+        normalMatrices = np.linalg.inv(matrices[:, :3, :3]).transpose(0, 2, 1)
+        normals = np.einsum("nij,nj->ni", normalMatrices[np.repeat(np.arange(len(objects)), nLoops)], np.concatenate(parts).astype(np.float64))
+        normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+        normals = normals[order]
+    
+    mesh = bpy.data.meshes.new(target.data.name)
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set("co", co.astype(np.float32).ravel())
+    mesh.edges.add(len(edges))
+    mesh.edges.foreach_set("vertices", edges.astype(np.int32).ravel())
+    mesh.loops.add(len(loopVerts))
+    mesh.loops.foreach_set("vertex_index", loopVerts[order].astype(np.int32))
+    mesh.loops.foreach_set("edge_index", loopEdges[edgeOrder].astype(np.int32))
+    mesh.polygons.add(len(loopStart))
+    mesh.polygons.foreach_set("loop_start", loopStart.astype(np.int32))
+    if not bpy.types.MeshPolygon.bl_rna.properties["loop_total"].is_readonly: # Older versions of blender need both
+        mesh.polygons.foreach_set("loop_total", loopTotal.astype(np.int32))
+    mesh.polygons.foreach_set("material_index", materialIndex.astype(np.int32))
+    mesh.polygons.foreach_set("use_smooth", smooth)
+    for name, uv in uvs.items():
+        mesh.uv_layers.new(name=name).data.foreach_set("uv", uv.ravel())
+    for name, (domain, dataType) in attributes.items():
+        mesh.attributes.new(name, dataType, domain).data.foreach_set(attributeBuffers[dataType][0], attributeValues[name].ravel())
+    for mat in materials:
+        mesh.materials.append(mat)
+    mesh.update()
+    if normals is not None: # A NumPy array, != compares every element
+        if hasattr(mesh, "use_auto_smooth"): # Before blender 4.1 custom normals need auto smooth
+            mesh.use_auto_smooth = True
+        mesh.normals_split_custom_set(normals.astype(np.float32))
+    
+    # Remove the other objects and the meshes only they (or the target) used, in one batch_remove as each call scans the whole file
+    removedUsers = collections.Counter(obj.data for obj in objects[1:])
+    target.data = mesh
+    bpy.data.batch_remove(objects[1:] + [me for me in set(meshes) if me.users == removedUsers[me]])
+    return target
+
+
+# Core mesh data compared by meshGeometryHash: (attribute, property, dtype, values per element, collection and property to read instead in older versions of blender)
+# where they arent attributes yet. Reading the attributes directly is several times faster than going through the vertices/edges/loops/polygons collections
+meshGeometryAttributes = [
+    ("position", "vector", np.float32, 3, ("vertices", "co")),
+    (".edge_verts", "value", np.int32, 2, ("edges", "vertices")),
+    (".corner_vert", "value", np.int32, 1, ("loops", "vertex_index")),
+    ("material_index", "value", np.int32, 1, ("polygons", "material_index")),
+    ("sharp_face", "value", bool, 1, ("polygons", "use_smooth")),
+    ]
+
+# foreach_get property, dtype and values per element of each attribute data type, meshes with attributes of other types (strings) arent hashed
+attributeBuffers = {'FLOAT': ("value", np.float32, 1), 'INT': ("value", np.int32, 1), 'INT8': ("value", np.int32, 1), 'BOOLEAN': ("value", bool, 1),
+                    'FLOAT_VECTOR': ("vector", np.float32, 3), 'FLOAT2': ("vector", np.float32, 2), 'FLOAT_COLOR': ("color", np.float32, 4),
+                    'BYTE_COLOR': ("color", np.float32, 4), 'QUATERNION': ("value", np.float32, 4), 'INT32_2D': ("value", np.int32, 2),
+                    'INT16_2D': ("value", np.int32, 2), 'FLOAT4X4': ("value", np.float32, 16)}
+
+
+# Hash of the geometry of a mesh (vertices, edges, faces, every attribute such as UVs, colors and custom normals, materials), every buffer read
+# with a single foreach_get. Returns the hex digest and the number of bytes hashed, which is about what the mesh takes in memory.
+# The digest is None for meshes with data that cant be compared this way (string attributes)
+def meshGeometryHash(me):
+    h = hashlib.sha1(np.array([len(me.vertices), len(me.edges), len(me.loops), len(me.polygons)], dtype=np.int64))
+    size = 0
+    buffers = [(me.polygons, "loop_start", np.int32, 1)]
+    if ".corner_vert" not in me.attributes: # Older versions, where the core data, UVs and custom normals arent attributes yet
+        for name, prop, dtype, width, legacy in meshGeometryAttributes:
+            if name not in me.attributes:
+                buffers.append((getattr(me, legacy[0]), legacy[1], dtype, width))
+        for layer in me.uv_layers:
+            if layer.name not in me.attributes:
+                h.update(layer.name.encode("utf-8"))
+                buffers.append((layer.data, "uv", np.float32, 2))
+        if me.has_custom_normals and "custom_normal" not in me.attributes:
+            if hasattr(me, "corner_normals"):
+                buffers.append((me.corner_normals, "vector", np.float32, 3))
+            else:
+                me.calc_normals_split()
+                buffers.append((me.loops, "normal", np.float32, 3))
+    for attr in sorted(me.attributes, key=lambda attr: attr.name):
+        if attr.name.startswith(".select_"): # Selection state, not data
+            continue
+        layout = attributeBuffers.get(attr.data_type)
+        if layout == None:
+            return None, 0
+        h.update("{0}|{1}|{2}".format(attr.name, attr.domain, attr.data_type).encode("utf-8"))
+        buffers.append((attr.data,) + layout)
+    for data, prop, dtype, width in buffers:
+        a = np.empty(len(data) * width, dtype=dtype)
+        data.foreach_get(prop, a)
+        h.update(a)
+        size += a.nbytes
+    h.update("|".join(mat.name_full if mat != None else "" for mat in me.materials).encode("utf-8"))
+    return h.hexdigest(), size
+
+
+# Makes objects with identical geometry share one mesh: meshes are bucketed by meshGeometryHash, the objects of a duplicate are switched to the
+# mesh kept for its bucket and the duplicates removed with one batch_remove. The buckets are kept between calls, so an import job can add every
+# file as it goes and meshes are shared across files. Kept meshes are looked up by name, so buckets whose mesh was removed meanwhile (written to a shard) start over
+# Linked meshes, meshes with shape keys or vertex weights (objects with vertex groups) and meshes marked as assets are left alone
+class meshDeduplicator():
+    
+    def __init__(self):
+        self.known = {} # Geometry hash -> the mesh kept for it
+        self.removed = 0 # Number of duplicate meshes removed
+        self.reclaimed = 0 # Bytes of mesh data removed
+    
+    def add(self, objects):
+        users = collections.defaultdict(list)
+        weighted = set() # Vertex weights arent attributes and cant be read in bulk, so their meshes arent compared
+        for obj in objects:
+            if obj.type == 'MESH' and obj.library == None:
+                me = obj.data
+                if len(obj.vertex_groups) > 0:
+                    weighted.add(me)
+                elif me.library == None and me.shape_keys == None and me.asset_data == None:
+                    users[me].append(obj)
+        duplicates = []
+        for me, objs in users.items():
+            if me in weighted:
+                continue
+            digest, size = meshGeometryHash(me)
+            if digest == None:
+                continue
+            kept = self.known.get(digest)
+            if kept != None:
+                try:
+                    kept.name # Raises ReferenceError if the mesh was removed (e.g. written to a library shard) since it was kept, its name may belong to another mesh now
+                except ReferenceError:
+                    kept = None
+            if kept == None:
+                self.known[digest] = me
+            elif kept != me:
+                for obj in objs:
+                    obj.data = kept
+                duplicates.append((me, kept))
+                self.reclaimed += size
+        for me, kept in duplicates:
+            if me.users > (1 if me.use_fake_user else 0): # Used by something other than the objects given
+                me.user_remap(kept)
+        bpy.data.batch_remove([me for me, kept in duplicates])
+        self.removed += len(duplicates)
+    
+    def summary(self):
+        return "{0} duplicate meshes removed, {1:.1f} MB of mesh data reclaimed".format(self.removed, self.reclaimed / 1000000)
+
+
+# Parse a comma separated list of LOD ratios ("0.5, 0.25, 0.1"), values outside (0, 1) and anything not a number are ignored
+def parseLodRatios(text):
+    ratios = set()
+    for part in text.split(","):
+        try:
+            ratio = float(part)
+        except ValueError:
+            continue
+        if 0 < ratio < 1:
+            ratios.add(ratio)
+    return sorted(ratios, reverse=True)
+
+
+# The LOD meshes of a full resolution mesh, full resolution first. Only the full resolution mesh points at the levels (custom properties alt_lod_1,
+# alt_lod_2 ...), the levels just record their number in alt_lod_level. Nothing points back or at itself, so unused chains can be freed.
+# A mesh without LODs is its own only level
+def meshLods(me):
+    lods = [me]
+    while "alt_lod_{0}".format(len(lods)) in me:
+        lods.append(me["alt_lod_{0}".format(len(lods))])
+    return lods
+
+
+# The LOD meshes of an object, objects with LODs point at their full resolution mesh with alt_lod_base (and keep it from being freed)
+# whatever level they show
+def objectLods(obj):
+    base = obj.get("alt_lod_base")
+    return meshLods(base) if base != None else [obj.data]
+
+
+# Generates LOD meshes for imported objects with a Decimate modifier, one level per ratio (of the full resolution face count).
+# Levels stop once a mesh is below min_faces faces, smaller meshes get no LODs at all. All meshes of a call are decimated together,
+# with one depsgraph update of the view layer per level. Objects sharing a mesh share its LODs.
+# With use_lightest the objects show their lightest LOD (so do asset previews made from them), OT_SwitchLods switches between the levels
+class lodGenerator():
+    
+    def __init__(self, tool):
+        self.ratios = parseLodRatios(tool.lod_ratios)
+        self.minFaces = tool.lod_min_faces
+        self.useLightest = tool.lod_use_lightest
+        self.objects = 0 # Number of objects with LODs
+        self.facesBefore = 0 # Faces of those objects at full resolution
+        self.facesAfter = 0 # and at the level they are shown at
+    
+    # Generate LODs for the mesh objects in objects, which are all in viewLayer. label names them in the log
+    def add(self, objects, viewLayer, label):
+        users = collections.defaultdict(list)
+        for obj in objects:
+            if obj.type == 'MESH' and obj.library == None and obj.data.library == None:
+                users[obj.data].append(obj)
+        new = {me: objs[0] for me, objs in users.items() if "alt_lod_1" not in me and "alt_lod_level" not in me and len(me.polygons) >= self.minFaces}
+        chains = {me: [me] for me in new}
+        if len(new) > 0 and len(self.ratios) > 0:
+            modifiers = {me: obj.modifiers.new("ALT_LOD", 'DECIMATE') for me, obj in new.items()}
+            try:
+                for ratio in self.ratios:
+                    active = [me for me in new if len(chains[me][-1].polygons) >= self.minFaces]
+                    if len(active) == 0:
+                        break
+                    for me, mod in modifiers.items():
+                        mod.ratio = ratio
+                        mod.show_viewport = me in active # Dont decimate meshes which already are light enough
+                    viewLayer.update()
+                    depsgraph = viewLayer.depsgraph
+                    for me in active:
+                        lod = bpy.data.meshes.new_from_object(new[me].evaluated_get(depsgraph), depsgraph=depsgraph)
+                        lod.name = "{0}_LOD{1}".format(me.name, len(chains[me]))
+                        chains[me].append(lod)
+            finally:
+                for me, mod in modifiers.items():
+                    new[me].modifiers.remove(mod)
+            for me, chain in chains.items():
+                for i, lod in enumerate(chain[1:], 1):
+                    me["alt_lod_{0}".format(i)] = lod
+                    lod["alt_lod_level"] = i
+        for me, objs in users.items():
+            if "alt_lod_1" in me:
+                for obj in objs:
+                    obj["alt_lod_base"] = me
+        # Face counts of every object at full resolution and at the level it ends up showing
+        withLods = [(obj, objectLods(obj)) for objs in users.values() for obj in objs if obj.get("alt_lod_base") != None]
+        if len(withLods) == 0:
+            return
+        if self.useLightest:
+            for obj, lods in withLods:
+                obj.data = lods[-1]
+        faces = np.array([[len(lods[0].polygons), len(obj.data.polygons)] for obj, lods in withLods], dtype=np.int64)
+        loops = np.array([[len(lods[0].loops), len(obj.data.loops)] for obj, lods in withLods], dtype=np.int64)
+        before, after = faces.sum(axis=0)
+        trisBefore, trisAfter = (loops - 2 * faces).sum(axis=0)
+        print("{0}: LODs for {1} objects, {2} faces ({3} triangles) -> {4} faces ({5} triangles) shown".format(label, len(withLods), before, trisBefore, after, trisAfter))
+        self.objects += len(withLods)
+        self.facesBefore += int(before)
+        self.facesAfter += int(after)
+    
+    def summary(self):
+        return "LODs for {0} objects, {1} faces -> {2} shown".format(self.objects, self.facesBefore, self.facesAfter)
+
+
+# Hash of the file each file backed image was loaded from, hashed in a thread pool (hashFile reads in chunks and remembers unchanged files)
+# Returns {image: sha1}, packed, generated and missing images are left out
+def imageFileHashes(images, workers=None):
+    files = {}
+    for img in images:
+        if img.source in ('FILE', 'SEQUENCE', 'MOVIE', 'TILED') and img.packed_file == None:
+            path = os.path.realpath(bpy.path.abspath(img.filepath, library=img.library))
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[img] = (path, stat.st_size, stat.st_mtime_ns)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4)) as pool: # Hashing is IO and hashlib releases the GIL
+        hashes = pool.map(lambda f: hashFile(*f), files.values())
+        return dict(zip(files.keys(), hashes))
+
+
+# Canonical fingerprint of what a material looks like, so copies with other names (Material.001, the same material appended from two files ...)
+# get the same one: its settings, and for every node (in an order that doesnt depend on node names) the type, settings and unconnected input values,
+# images by the hash of their file and node groups by the fingerprint of their tree, plus the links between the nodes
+class materialFingerprinter():
+    nodeBaseProperties = None # Properties every node has (name, location, select ...), left out of the fingerprint
+    materialProperties = ["diffuse_color", "metallic", "roughness", "specular_intensity", "blend_method", "use_backface_culling", "pass_index"]
+    
+    def __init__(self, materials):
+        if materialFingerprinter.nodeBaseProperties == None:
+            materialFingerprinter.nodeBaseProperties = set(p.identifier for p in bpy.types.Node.bl_rna.properties) - {"mute"}
+        images = set()
+        for mat in materials:
+            if mat.node_tree != None:
+                for node in mat.node_tree.nodes:
+                    if getattr(node, "image", None) != None:
+                        images.add(node.image)
+        self.imageHashes = imageFileHashes(images)
+        self.treeKeys = {} # Fingerprints of node groups
+        self.nodeProperties = {} # bl_idname -> properties of that node type which go into the fingerprint
+    
+    def valueKey(self, value):
+        if isinstance(value, (str, int, float, bool)) or value == None:
+            return value
+        if isinstance(value, bpy.types.Image):
+            return ("image", self.imageHashes.get(value) or value.name_full, value.colorspace_settings.name, value.alpha_mode)
+        if isinstance(value, bpy.types.NodeTree):
+            return ("tree", self.treeKey(value))
+        if isinstance(value, bpy.types.ID):
+            return ("id", value.name_full)
+        if isinstance(value, bpy.types.ColorRamp):
+            return ("ramp", value.interpolation, value.color_mode, tuple((e.position, tuple(e.color)) for e in value.elements))
+        if isinstance(value, bpy.types.CurveMapping):
+            return ("curves", value.use_clip, value.clip_min_x, value.clip_min_y, value.clip_max_x, value.clip_max_y, getattr(value, "extend", None),
+                    getattr(value, "tone", None), tuple(value.black_level), tuple(value.white_level),
+                    tuple(tuple((tuple(p.location), p.handle_type) for p in curve.points) for curve in value.curves))
+        if isinstance(value, (bpy.types.TexMapping, bpy.types.ColorMapping, bpy.types.ImageUser)): # Plain settings (and a color ramp), compared property by property
+            return (value.bl_rna.identifier,) + tuple(self.valueKey(getattr(value, p.identifier)) for p in value.bl_rna.properties if p.identifier != "rna_type")
+        if isinstance(value, bpy.types.bpy_struct):
+            return ("struct", value.as_pointer()) # Other structs cant be compared, a key of their own keeps the material from being merged with any other
+        try:
+            return tuple(value) # Vectors, colors, arrays
+        except TypeError:
+            return None
+    
+    def treeKey(self, tree):
+        if tree in self.treeKeys:
+            return self.treeKeys[tree]
+        self.treeKeys[tree] = None # Guards against a group containing itself
+        nodes = sorted(tree.nodes, key=lambda n: (n.bl_idname, n.location.x, n.location.y, n.label, n.name))
+        index = {node.name: i for i, node in enumerate(nodes)}
+        parts = []
+        for node in nodes:
+            props = self.nodeProperties.get(node.bl_idname)
+            if props == None:
+                props = [p.identifier for p in node.bl_rna.properties if p.identifier not in materialFingerprinter.nodeBaseProperties and (not p.is_readonly or p.type == 'POINTER')]
+                self.nodeProperties[node.bl_idname] = props
+            parts.append((node.bl_idname, tuple(self.valueKey(getattr(node, p, None)) for p in props)))
+            for i, socket in enumerate(node.inputs):
+                if not socket.is_linked and hasattr(socket, "default_value"):
+                    parts.append((i, self.valueKey(socket.default_value)))
+            for i, socket in enumerate(node.outputs): # Value and RGB nodes keep their value on the output, linked or not
+                if hasattr(socket, "default_value"):
+                    parts.append(("out", i, self.valueKey(socket.default_value)))
+        parts.append(sorted((index[l.from_node.name], l.from_socket.identifier, index[l.to_node.name], l.to_socket.identifier) for l in tree.links))
+        key = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+        self.treeKeys[tree] = key
+        return key
+    
+    def fingerprint(self, mat):
+        parts = [self.valueKey(getattr(mat, p, None)) for p in materialFingerprinter.materialProperties]
+        if hasattr(mat, "cycles"):
+            parts.append(getattr(mat.cycles, "displacement_method", None))
+        if mat.use_nodes and mat.node_tree != None:
+            parts.append(self.treeKey(mat.node_tree))
+        return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+# Index of the nodes of all materials: node type (bl_idname) or node name -> {material: set of node names}, so bulk edits only visit the nodes they change
+# instead of every node of every material. Built on first use and kept valid by nodeIndexDepsgraphHandler (reindexes materials that changed)
+# and nodeIndexResetHandler (undo, redo and loading a file drop it). Materials are stored rather than nodes, a node removed from its tree
+# would leave a dangling reference, its name is looked up again when used
+class nodeIndex():
+    index = None
+    materialKeys = {} # material -> (signature of its nodes, keys it was indexed under)
+    treeMaterials = {} # node tree -> its material, the depsgraph reports changed nodes as updates of the node tree
+    materialCount = 0
+    
+    def reset():
+        nodeIndex.index = None
+        nodeIndex.materialKeys = {}
+        nodeIndex.treeMaterials = {}
+    
+    def build():
+        nodeIndex.index = collections.defaultdict(dict)
+        nodeIndex.materialKeys = {}
+        nodeIndex.treeMaterials = {}
+        for mat in bpy.data.materials:
+            nodeIndex.add(mat)
+        nodeIndex.materialCount = len(bpy.data.materials)
+    
+    def add(mat):
+        if mat.node_tree == None:
+            return
+        keys = set()
+        for node in mat.node_tree.nodes:
+            for key in (node.bl_idname, node.name):
+                nodeIndex.index[key].setdefault(mat, set()).add(node.name)
+                keys.add(key)
+        nodeIndex.materialKeys[mat] = (nodeIndex.signature(mat), keys)
+        nodeIndex.treeMaterials[mat.node_tree] = mat
+    
+    def remove(mat):
+        for key in nodeIndex.materialKeys.pop(mat, (0, ()))[1]:
+            nodeIndex.index[key].pop(mat, None)
+    
+    # The types and names of the nodes of a material, which is all the index depends on
+    def signature(mat):
+        return tuple(sorted((node.bl_idname, node.name) for node in mat.node_tree.nodes)) if mat.node_tree != None else ()
+    
+    # Index the nodes of a material again if nodes were added, removed or renamed. Changing the value of a node (as the bulk edits themselves do)
+    # leaves the signature as it was and doesnt touch the index
+    def update(mat):
+        if nodeIndex.index == None:
+            return
+        if mat in nodeIndex.materialKeys and nodeIndex.materialKeys[mat][0] == nodeIndex.signature(mat):
+            return
+        nodeIndex.remove(mat)
+        nodeIndex.add(mat)
+    
+    # [(material, node)] of all nodes of the type or name key, in materials whose name matches the regular expression pattern (None for all)
+    # and, if altImportedOnly, only those created by the PBR importer. Raises re.error for an invalid pattern
+    def find(key, pattern=None, altImportedOnly=False):
+        pattern = re.compile(pattern) if pattern != None and pattern != "" else None
+        if nodeIndex.index == None or nodeIndex.materialCount != len(bpy.data.materials): # Materials were added or removed
+            nodeIndex.build()
+        try:
+            return nodeIndex.match(key, pattern, altImportedOnly)
+        except ReferenceError: # A material was removed and another added since the index was built
+            nodeIndex.build()
+            return nodeIndex.match(key, pattern, altImportedOnly)
+    
+    def match(key, pattern, altImportedOnly):
+        found = []
+        for mat, names in list(nodeIndex.index.get(key, {}).items()):
+            if pattern != None and pattern.search(mat.name) == None:
+                continue
+            if altImportedOnly and not mat.get(altImportedProp):
+                continue
+            nodes = nodeIndex.lookup(mat, key, names)
+            if nodes == None: # Changed where the depsgraph doesnt see it (a material no scene uses), index it again
+                nodeIndex.update(mat)
+                nodes = nodeIndex.lookup(mat, key, nodeIndex.index[key].get(mat, ())) or []
+            found += [(mat, node) for node in nodes]
+        return found
+    
+    # The nodes called names in mat, None if one of them is gone or isnt of the type or name key anymore
+    def lookup(mat, key, names):
+        nodes = []
+        for name in names:
+            node = mat.node_tree.nodes.get(name) if mat.node_tree != None else None
+            if node == None or key not in (node.bl_idname, node.name):
+                return None
+            nodes.append(node)
+        return nodes
+
+
+@bpy.app.handlers.persistent
+def nodeIndexDepsgraphHandler(scene, depsgraph):
+    if nodeIndex.index == None:
+        return
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Material):
+            nodeIndex.update(update.id.original)
+        elif isinstance(update.id, bpy.types.ShaderNodeTree) and update.id.original in nodeIndex.treeMaterials:
+            nodeIndex.update(nodeIndex.treeMaterials[update.id.original])
+
+
+@bpy.app.handlers.persistent
+def nodeIndexResetHandler(*args):
+    nodeIndex.reset()
+
+
+nodeIndexHandlers = (("depsgraph_update_post", nodeIndexDepsgraphHandler), ("undo_post", nodeIndexResetHandler),
+                     ("redo_post", nodeIndexResetHandler), ("load_post", nodeIndexResetHandler))
+
+
+# Set an input of a node (by identifier or name) to value, vectors get value in every component and colors in red, green and blue.
+# Node settings which arent inputs (interpolation of image textures, operation of math nodes) are set from text when it isnt empty
+def setNodeInput(node, name, value, text=""):
+    socket = node.inputs.get(name)
+    if socket == None:
+        for s in node.inputs:
+            if s.identifier == name:
+                socket = s
+                break
+    if socket != None:
+        if not hasattr(socket, "default_value"):
+            return False
+        if isinstance(socket.default_value, (int, float, bool)):
+            socket.default_value = type(socket.default_value)(value)
+        else:
+            n = 3 if socket.type == 'RGBA' else len(socket.default_value)
+            socket.default_value[:n] = [value] * n
+        return True
+    if name in node.bl_rna.properties and not node.bl_rna.properties[name].is_readonly:
+        setattr(node, name, text if text != "" else type(getattr(node, name))(value))
+        return True
+    return False
+
+
+# Replace duplicates (a dict of duplicate -> the ID to use instead) everywhere and remove them, in a single user_map and batch_remove pass
+# Material slots, data material lists and images of nodes and textures are switched directly, anything else still using a duplicate after that goes
+# through ID.user_remap (which scans the whole file on every call)
+def remapDuplicates(duplicates):
+    if len(duplicates) == 0:
+        return
+    for dup, users in bpy.data.user_map(subset=list(duplicates)).items():
+        replacement = duplicates[dup]
+        for user in users:
+            if isinstance(dup, bpy.types.Material):
+                if isinstance(user, bpy.types.Object):
+                    for slot in user.material_slots:
+                        if slot.link == 'OBJECT' and slot.material == dup:
+                            slot.material = replacement
+                elif hasattr(user, "materials"):
+                    for i, mat in enumerate(user.materials):
+                        if mat == dup:
+                            user.materials[i] = replacement
+            elif isinstance(dup, bpy.types.Image):
+                tree = user if isinstance(user, bpy.types.NodeTree) else getattr(user, "node_tree", None)
+                if tree != None:
+                    for node in tree.nodes:
+                        if getattr(node, "image", None) == dup:
+                            node.image = replacement
+                if getattr(user, "image", None) == dup: # Image textures
+                    user.image = replacement
+        if dup.users > (1 if dup.use_fake_user else 0):
+            dup.user_remap(replacement)
+    bpy.data.batch_remove(list(duplicates))
+
+
+# Group materials by materialFingerprinter and keep one of each group, returns the number of duplicates removed
+# The one kept is the one with the shortest name (Material rather than Material.001). Linked materials, assets and grease pencil materials
+# (their stroke and fill settings arent fingerprinted) are left alone
+def dedupMaterials(materials):
+    materials = [mat for mat in materials if mat.library == None and mat.asset_data == None and not mat.is_grease_pencil]
+    fingerprinter = materialFingerprinter(materials)
+    groups = collections.defaultdict(list)
+    for mat in materials:
+        groups[fingerprinter.fingerprint(mat)].append(mat)
+    duplicates = {}
+    for group in groups.values():
+        group.sort(key=lambda mat: (len(mat.name), mat.name))
+        for dup in group[1:]:
+            duplicates[dup] = group[0]
+    remapDuplicates(duplicates)
+    return len(duplicates)
+
+
+# Content key of an image: the hash of its file (see imageFileHashes) or, for packed and generated images, of its pixels read with one foreach_get.
+# Images showing the same pixels the same way (colorspace, alpha) get the same key. None for images without pixels (missing files)
+def imagePixelHash(img):
+    w, h = img.size
+    if w == 0 or h == 0:
+        return None
+    from . import ALT_TextureWorker
+    return hashlib.sha1(ALT_TextureWorker.readPixels(img)).hexdigest()
+
+
+# Group images by content (imageFileHashes, imagePixelHash) and keep one of each group, returns the number of duplicates removed
+# and the bytes of pixel (loaded images) and packed file memory reclaimed. The one kept is the one with the shortest name, linked images and assets are left alone
+def dedupImages(images):
+    images = [img for img in images if img.library == None and img.asset_data == None and img.type not in ('RENDER_RESULT', 'COMPOSITING')]
+    fileHashes = imageFileHashes(images)
+    groups = collections.defaultdict(list)
+    for img in images:
+        if img in fileHashes:
+            content = ("file", fileHashes[img])
+        elif img.packed_file != None or img.source == 'GENERATED':
+            content = ("pixels", imagePixelHash(img))
+        else:
+            continue
+        if content[1] != None:
+            # size is part of the key, generated images of one color hash the same pixels at 2x2 and 4x1
+            groups[(content, tuple(img.size), img.source, img.colorspace_settings.name, img.alpha_mode)].append(img)
+    duplicates = {}
+    pixelBytes = 0
+    packedBytes = 0
+    from . import ALT_TextureWorker
+    for group in groups.values():
+        group.sort(key=lambda img: (len(img.name), img.name))
+        for dup in group[1:]:
+            duplicates[dup] = group[0]
+            if dup.has_data:
+                pixelBytes += ALT_TextureWorker.imageMemory(dup.size[0], dup.size[1], dup.is_float)
+            if dup.packed_file != None:
+                packedBytes += dup.packed_file.size
+    remapDuplicates(duplicates)
+    return len(duplicates), pixelBytes, packedBytes
+
+
+# About how many bytes the bulk data of an ID takes in memory: pixels of loaded images (and their packed file), mesh geometry.
+# Other types are counted as 0, their size is small next to these and not worth estimating
+def idMemoryEstimate(id):
+    if isinstance(id, bpy.types.Image):
+        size = id.packed_file.size if id.packed_file != None else 0
+        if id.has_data:
+            from . import ALT_TextureWorker
+            size += ALT_TextureWorker.imageMemory(id.size[0], id.size[1], id.is_float)
+        return size
+    if isinstance(id, bpy.types.Mesh):
+        # Positions (12 bytes), edges (8), corner vertex and edge (8), face offsets and material index (8), UVs (8 per corner and layer)
+        return 12 * len(id.vertices) + 8 * len(id.edges) + 8 * len(id.loops) * (1 + len(id.uv_layers)) + 8 * len(id.polygons)
+    return 0
+
+
+# Types always kept by the purge, Blender needs them (window managers, screens, workspaces) or they hold the data of the file (scenes, libraries, texts)
+purgeRootTypes = (bpy.types.Scene, bpy.types.WindowManager, bpy.types.Screen, bpy.types.WorkSpace, bpy.types.Library, bpy.types.Text)
+
+
+def isPurgeRoot(id, ignoreFakeUsers):
+    if isinstance(id, purgeRootTypes) or id.asset_data != None:
+        return True
+    if isinstance(id, bpy.types.Image) and id.type in ('RENDER_RESULT', 'COMPOSITING'): # Blender owns these
+        return True
+    return id.use_fake_user and not ignoreFakeUsers
+
+
+# Every datablock that cant be reached from the scenes, found with a single bpy.data.user_map() pass and one walk over the reference graph.
+# IDs with a fake user (unless ignoreFakeUsers) and assets count as used, and so does everything they use. Data only used by other unused
+# data (the images and node groups of an unused material) is included too, so nothing is left behind for a second run
+def unreachableIds(ignoreFakeUsers=False):
+    userMap = bpy.data.user_map()
+    uses = collections.defaultdict(list) # user_map goes from an ID to its users, the walk needs the other direction
+    for id, users in userMap.items():
+        for user in users:
+            uses[user].append(id)
+    stack = [id for id in userMap if isPurgeRoot(id, ignoreFakeUsers)]
+    reachable = set(stack)
+    while len(stack) > 0:
+        for id in uses[stack.pop()]:
+            if id not in reachable:
+                reachable.add(id)
+                stack.append(id)
+    return [id for id in userMap if id not in reachable]
+
+
+# The datablocks of tool.deleteType matching the delete filters (name regex, unused, library, imported by AssetLibraryTools)
+# Raises re.error for an invalid name filter
+def batchDeleteTargets(tool):
+    pattern = re.compile(tool.delete_name_filter) if tool.delete_name_filter != "" else None
+    targets = []
+    for id in getattr(bpy.data, tool.deleteType):
+        if pattern != None and pattern.search(id.name) == None:
+            continue
+        if tool.delete_orphans_only and id.users > 0:
+            continue
+        if tool.delete_library == 'LOCAL' and id.library != None:
+            continue
+        if tool.delete_library not in ('ANY', 'LOCAL') and (id.library == None or id.library.name != tool.delete_library):
+            continue
+        if tool.delete_alt_imported_only and not id.get(altImportedProp):
+            continue
+        targets.append(id)
+    return targets
+
+
+# Data an ID uses directly (an object's mesh and materials, a material's images and node groups, ...)
+def idDependencies(id):
+    deps = []
+    if isinstance(id, bpy.types.Object):
+        deps.append(id.data)
+        deps.append(id.get("alt_lod_base"))
+        deps += [slot.material for slot in id.material_slots]
+    elif isinstance(id, bpy.types.Collection):
+        deps += list(id.objects) + list(id.children)
+    elif isinstance(id, (bpy.types.Material, bpy.types.NodeTree)):
+        tree = id.node_tree if isinstance(id, bpy.types.Material) else id
+        if tree != None:
+            for node in tree.nodes:
+                if node.type == 'TEX_IMAGE':
+                    deps.append(node.image)
+                elif node.type == 'GROUP':
+                    deps.append(node.node_tree)
+    elif hasattr(id, "materials"): # Meshes, curves ...
+        deps += list(id.materials)
+        if isinstance(id, bpy.types.Mesh):
+            deps += [lod for lod in meshLods(id) if lod != id]
+    return [d for d in deps if d != None]
+
+
+# Remove ids from the session along with the data only they used, in as few batch_remove calls as the dependency depth needs
+def removeWithDependencies(ids):
+    pending = list(ids)
+    removed = set(id.as_pointer() for id in ids)
+    candidates = {}
+    while len(pending) > 0: # Collect everything the ids use, before anything is removed
+        id = pending.pop()
+        for dep in idDependencies(id):
+            if dep.as_pointer() not in removed and dep.as_pointer() not in candidates and dep.library == None:
+                candidates[dep.as_pointer()] = dep
+                pending.append(dep)
+    bpy.data.batch_remove(ids)
+    while True: # Removing a layer of users orphans the next one (objects -> meshes -> materials -> images)
+        orphans = [dep for dep in candidates.values() if dep.users == 0]
+        if len(orphans) == 0:
+            break
+        for dep in orphans:
+            del candidates[dep.as_pointer()]
+        bpy.data.batch_remove(orphans)
+
+
+# Streams imported assets into library .blend files of a bounded size instead of keeping them in the open file
+# A shard ends after a source whose name hashes to a boundary (about every max_assets / 2 sources) or once it holds max_assets assets or max_mb
+# of source data. It is then written with bpy.data.libraries.write and its assets are removed from the session, so memory stays flat however large
+# the import is. As the boundaries depend on the names and not on positions, adding or removing a source only changes the shard it falls into.
+# Shards are named <prefix>_<hash of the name of their first source>.blend, and <prefix>.shards.json records a key of what went into each one:
+# a shard whose assets, sources and settings are unchanged isnt rewritten, so the asset browser only re-indexes the shards that changed.
+class librarySharder():
+    # Settings which change what the importers make, a change rewrites every shard. UI state and the settings of other tools are left out
+    settingProperties = {
+        "materials": ["tex_ignore_filter", "convert_textures", "pack_grayscale_maps", "use_proxy_textures", "proxy_resolution", "use_fake_user", "use_real_displacement",
+                      "add_extranodes", "use_shared_controls", "texture_mapping"] + list(texImportProps.values()),
+        "models": ["hide_after_import", "move_to_new_collection_after_import", "join_new_objects", "generate_lods", "lod_ratios", "lod_min_faces",
+                   "lod_use_lightest", "dedup_meshes"],
+        }
+    
+    def __init__(self, tool, prefix):
+        self.dir = os.path.realpath(bpy.path.abspath(tool.shard_path))
+        self.prefix = prefix
+        self.maxAssets = tool.shard_max_assets
+        self.maxBytes = tool.shard_max_mb * 1000000
+        self.indexPath = os.path.join(self.dir, prefix + ".shards.json")
+        self.settings = repr([(p, str(getattr(tool, p))) for p in librarySharder.settingProperties[prefix]]) # Settings change the imported data too
+        self.boundary = max(1, self.maxAssets // 2)
+        self.recorded = {}
+        try:
+            with open(self.indexPath, "r", encoding="utf-8") as f:
+                self.recorded = json.load(f).get("shards", {})
+        except (OSError, ValueError):
+            pass
+        self.shards = {} # Shards written (or found unchanged) this session
+        self.pending = []
+        self.pendingKeys = []
+        self.pendingName = None # Name of the first source in the pending shard
+        self.pendingBytes = 0
+        self.written = 0
+        self.unchanged = 0
+        os.makedirs(self.dir, exist_ok=True)
+    
+    # Add imported assets, name identifies their source (a texture set name, a model path) and decides the shard they go into,
+    # key is a fingerprint of the source contents (e.g. a texture set fingerprint), size is the number of source bytes
+    def add(self, assets, name, key, size):
+        for asset in assets:
+            asset.asset_mark()
+            self.pending.append(asset)
+        if self.pendingName == None:
+            self.pendingName = name
+        self.pendingKeys.append(key)
+        self.pendingBytes += size
+        nameHash = int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:8], 16)
+        if nameHash % self.boundary == 0 or len(self.pending) >= self.maxAssets or self.pendingBytes >= self.maxBytes:
+            self.flush()
+    
+    def flush(self):
+        if len(self.pending) == 0:
+            return
+        name = "{0}_{1}.blend".format(self.prefix, hashlib.sha1(self.pendingName.encode("utf-8")).hexdigest()[:12])
+        path = os.path.join(self.dir, name)
+        h = hashlib.sha1(self.settings.encode("utf-8"))
+        for key in self.pendingKeys:
+            h.update(key.encode("utf-8"))
+        key = h.hexdigest()
+        record = self.recorded.get(name)
+        if record != None and record["key"] == key and os.path.exists(path):
+            self.unchanged += 1
+        else:
+            bpy.data.libraries.write(path, set(self.pending), fake_user=True)
+            self.written += 1
+        self.shards[name] = {"key": key, "assets": sorted(a.name for a in self.pending)}
+        removeWithDependencies(self.pending)
+        self.pending = []
+        self.pendingKeys = []
+        self.pendingName = None
+        self.pendingBytes = 0
+    
+    # Write the last shard and the index, shards left over from an earlier, larger import are deleted (unless the import was cancelled)
+    def finish(self, cancelled):
+        self.flush()
+        if cancelled:
+            shards = dict(self.recorded, **self.shards)
+        else:
+            shards = self.shards
+            for name in self.recorded:
+                if name not in shards and os.path.exists(os.path.join(self.dir, name)):
+                    os.remove(os.path.join(self.dir, name))
+        tmpPath = self.indexPath + ".tmp"
+        with open(tmpPath, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "shards": shards}, f, indent=1, sort_keys=True)
+        os.replace(tmpPath, self.indexPath)
+    
+    def summary(self):
+        return "{0} library shards written, {1} unchanged".format(self.written, self.unchanged)
 
 
 # This code is bad!!!!
@@ -256,6 +1995,20 @@ def listDownloadAttribs(scene, context):
     return items
 
 
+libraryItems = [] # Blender doesnt keep the strings of dynamic enum items alive, so the last list is kept here
+
+# Blender stores the number of the chosen item, so every library gets a number from its name: adding or removing
+# libraries doesnt move the choice to another library (a removed library matches nothing)
+def listLibraries(scene, context):
+    libraryItems.clear()
+    libraryItems.append(('ANY', "Any", "Local and linked data", "", 0))
+    libraryItems.append(('LOCAL', "This file", "Only data stored in this file", "", 1))
+    for lib in bpy.data.libraries:
+        number = 2 + int(hashlib.sha1(lib.name.encode("utf-8")).hexdigest()[:7], 16)
+        libraryItems.append((lib.name, lib.name, "Only data linked from {0}".format(lib.filepath), "", number))
+    return libraryItems
+
+
 # ------------------------------------------------------------------------
 #    Properties
 # ------------------------------------------------------------------------ 
@@ -275,12 +2028,79 @@ class properties(PropertyGroup):
         description = "Dont import materials if a material with the same name already exists",
         default = True
         )
+    incremental_import : BoolProperty(
+        name = "Incremental import",
+        description = "Remember what was imported in a manifest file (.alt_import_manifest.json) in the import directory.\nOn the next import only new sets are imported and sets whose textures changed are rebuilt, everything else is skipped",
+        default = False
+        )
     tex_ignore_filter : StringProperty(
         name = "Tex name filter",
-        description = "Filter unwanted textures by a common string in the name (such as DX, which denotes a directX normal map)",
+        description = "Filter unwanted textures by a common string in the name (such as a resolution or variant you dont want).\nDirectX normal maps and gloss maps dont need filtering, they are converted on import.\nSeparate multiple strings with commas",
         default = "",
         maxlen = 1024,
         )
+    reuse_loaded_images : BoolProperty(
+        name = "Reuse loaded images",
+        description = "Use images which are already in the file instead of loading the same texture file again",
+        default = True
+        )
+    convert_textures : BoolProperty(
+        name = "Convert gloss/DirectX maps",
+        description = "Invert gloss maps into roughness maps and flip the green channel of DirectX normal maps (Normal_DX etc.) to OpenGL on import.\nConverted maps are cached on disk by the hash of the source file, so they are only converted once",
+        default = True
+        )
+    pack_grayscale_maps : BoolProperty(
+        name = "Pack grayscale maps",
+        description = "Pack up to four grayscale maps of a set (roughness, metallic, specular, SSS, alpha) into the channels of one image in the texture cache.\nSaves memory and texture samplers, the packed image is reused by later imports",
+        default = False
+        )
+    use_proxy_textures : BoolProperty(
+        name = "Use proxy textures",
+        description = "Make downscaled copies of the textures in the texture cache and use them in the materials, to save memory in the viewport.\nUse \"Full resolution\" in the utilities before a final render",
+        default = False
+        )
+    proxy_resolution : EnumProperty(
+        name = "Proxy resolution",
+        description = "Maximum size of the longest side of proxy textures",
+        default = '1024',
+        items=[('512', "512", ""),
+               ('1024', "1K", ""),
+               ('2048', "2K", ""),
+               ]
+        )
+    texture_cache_path : StringProperty(
+        name = "Texture cache",
+        description = "Directory to store converted maps, packed images and proxy textures in.\nLeave empty to use a hidden .alt_cache folder in the import directory",
+        default = "",
+        maxlen = 1024,
+        subtype = 'DIR_PATH'
+        )
+    library_output : EnumProperty(
+        name="Import into",
+        description="Where imported materials and models go",
+        items=[ ('FILE', "Current file", ""),
+                ('SHARDS', "Library shards", "Write imported assets (marked as assets) into library .blend files of a limited size and remove them from the open file, keeps memory flat for very large imports"),
+               ]
+        )
+    shard_path : StringProperty(
+        name = "Library directory",
+        description = "Directory to write the library shards to",
+        default = "",
+        maxlen = 1024,
+        subtype = 'DIR_PATH'
+        )
+    shard_max_assets : IntProperty(
+        name = "Max assets per shard",
+        description = "Start a new library shard once this many assets are in the current one",
+        default = 500,
+        min = 1
+        )
+    shard_max_mb : IntProperty(
+        name = "Max MB per shard",
+        description = "Start a new library shard once the source files of the assets in the current one add up to this many MB",
+        default = 2048,
+        min = 1
+        )
     use_fake_user : BoolProperty(
         name = "Use fake user",
         description = "Use fake user on imported materials",
@@ -296,6 +2116,11 @@ class properties(PropertyGroup):
         description = "Adds nodes to the imported materials for easy control",
         default = False
         )
+    use_shared_controls : BoolProperty(
+        name = "Shared controls",
+        description = "Texture scale, displacement scale and the roughness ramp (with utility nodes) of all imported materials come from one shared node group (" + controlsGroupName + "), so changing them for the whole library is a single edit",
+        default = False
+        )
     texture_mapping : EnumProperty(
         name='Mapping',
         default='UV',
@@ -371,26 +2196,58 @@ class properties(PropertyGroup):
         description = "",
         default = False
         )
-    import_fbx : BoolProperty(
-        name = "Import FBX files",
-        description = "",
-        default = True
+    generate_lods : BoolProperty(
+        name = "Generate LODs",
+        description = "Make decimated copies of the meshes of every imported model, switch between them under Utilities",
+        default = False
         )
-    import_gltf : BoolProperty(
-        name = "Import GLTF files",
-        description = "",
-        default = True
+    lod_ratios : StringProperty(
+        name = "LOD ratios",
+        description = "Comma separated face count ratios of the LOD levels, relative to the full resolution mesh",
+        default = "0.5, 0.25, 0.1",
+        maxlen = 1024
         )
-    import_obj : BoolProperty(
-        name = "Import OBJ files",
-        description = "",
-        default = True
+    lod_min_faces : IntProperty(
+        name = "Min faces",
+        description = "Meshes with fewer faces get no LODs, and no further levels are made once a level has fewer faces than this",
+        default = 1000,
+        min = 1
         )
-    import_x3d : BoolProperty(
-        name = "Import X3D files",
-        description = "",
+    lod_use_lightest : BoolProperty(
+        name = "Show lightest LOD",
+        description = "Imported objects show their lightest LOD in the viewport (and in asset previews). Switch to full resolution before rendering",
         default = True
         )
+    lod_level : IntProperty(
+        name = "LOD level",
+        description = "Level to switch to, 0 is full resolution. Objects with fewer levels switch to their lightest",
+        default = 1,
+        min = 0
+        )
+    dedup_meshes : BoolProperty(
+        name = "Share identical meshes",
+        description = "Objects whose mesh has the same geometry as an earlier imported one use that mesh instead of their own copy",
+        default = False
+        )
+    # Model cache options. The file type toggles (import_fbx, import_gltf, ...) are made from modelFileTypes below the class
+    use_model_cache : BoolProperty(
+        name = "Cache converted models",
+        description = "Save every imported model as a .blend in the model cache and append it from there the next time the same file is imported, instead of parsing the source again",
+        default = False
+        )
+    model_cache_path : StringProperty(
+        name = "Model cache",
+        description = "Directory to store converted models in.\nLeave empty to use a hidden .alt_cache folder in the import directory",
+        default = "",
+        maxlen = 1024,
+        subtype = 'DIR_PATH'
+        )
+    model_cache_max_mb : IntProperty(
+        name = "Max cache size (MB)",
+        description = "The least recently used models are deleted from the cache once it is larger than this",
+        default = 4096,
+        min = 1
+        )
         
         
     # Batch append properties
@@ -406,6 +2263,24 @@ class properties(PropertyGroup):
         description = "",
         default = False
         )
+    append_use_index : BoolProperty(
+        name = "Use .blend index",
+        description = "Read which objects and materials each .blend holds from its file headers (kept in an index, only changed files are read again), so only the wanted ones are appended and files with nothing to append arent loaded",
+        default = True
+        )
+    blend_index_path : StringProperty(
+        name = "Index file",
+        description = "SQLite file to keep the .blend index in.\nLeave empty to use a hidden .alt_cache folder in the append directory",
+        default = "",
+        maxlen = 1024,
+        subtype = 'FILE_PATH'
+        )
+    blend_search : StringProperty(
+        name = "Find",
+        description = "Part of the name of the objects or materials to look for in the .blend files of the append directory",
+        default = "",
+        maxlen = 1024
+        )
     append_move_to_new_collection_after_import : BoolProperty(
         name = "Move objects to new collection after import",
         description = "",
@@ -416,13 +2291,29 @@ class properties(PropertyGroup):
         description = "",
         default = False
         )
+    append_dedup_meshes : BoolProperty(
+        name = "Share identical meshes",
+        description = "Objects whose mesh has the same geometry as an earlier appended one use that mesh instead of their own copy",
+        default = False
+        )
     appendType : EnumProperty(
         name="Append",
         description="Choose type to append",
         items=[ ('objects', "Objects", ""),
                 ('materials', "Materials", ""),
+                ('collections', "Collections", ""),
                 ]
         )
+    append_link : BoolProperty(
+        name = "Link instead of append",
+        description = "Keep the data in the source .blend files and only reference it, instead of copying everything into this file. Saved files stay small, but the linked data cant be edited",
+        default = False
+        )
+    append_link_overrides : BoolProperty(
+        name = "Make library overrides",
+        description = "Make library overrides of the linked objects and collections, so they can be moved and their overridable properties edited",
+        default = False
+        )
     deleteLights : BoolProperty(
         name = "Dont append lights",
         description = "",
@@ -474,14 +2365,81 @@ class properties(PropertyGroup):
                 ('images', "Images", ""),
                 ('textures', "Textures", ""),
                 ('meshes', "Meshes", ""),
+                ('collections', "Collections", ""),
+                ('node_groups', "Node groups", ""),
                ]
         )
+    delete_name_filter : StringProperty(
+        name = "Name filter",
+        description = "Only delete datablocks whose name matches this regular expression (e.g. ^Cube|\\.0\\d\\d$). Leave empty to delete all",
+        default = "",
+        maxlen = 1024
+        )
+    delete_orphans_only : BoolProperty(
+        name = "Only unused",
+        description = "Only delete datablocks nothing uses (orphan data)",
+        default = False
+        )
+    delete_library : EnumProperty(
+        name="Library",
+        description="Only delete data stored in this file, or linked from one library",
+        items=listLibraries
+        )
+    delete_alt_imported_only : BoolProperty(
+        name = "Only imported by AssetLibraryTools",
+        description = "Only delete materials, images, objects and meshes created by the AssetLibraryTools importers",
+        default = False
+        )
+    delete_dry_run : BoolProperty(
+        name = "Dry run",
+        description = "Only report how many datablocks would be deleted and about how much memory they take, dont delete anything",
+        default = False
+        )
+    purge_ignore_fake_users : BoolProperty(
+        name = "Purge ignores fake users",
+        description = "Also purge data that is only kept by its fake user (assets are always kept)",
+        default = False
+        )
     dispNewScale: FloatProperty(
         name = "New Displacement Scale",
         description = "A float property",
         default = 0.1,
         min = 0.0001
         )
+    bulk_node : StringProperty(
+        name = "Node",
+        description = "Type (e.g. ShaderNodeMapping, ShaderNodeNormalMap) or name (e.g. node_scaleValue) of the nodes to change",
+        default = "ShaderNodeNormalMap",
+        maxlen = 1024
+        )
+    bulk_input : StringProperty(
+        name = "Input",
+        description = "Name of the input to set (e.g. Strength, Scale), or of a node setting such as interpolation",
+        default = "Strength",
+        maxlen = 1024
+        )
+    bulk_value : FloatProperty(
+        name = "Value",
+        description = "Value to set the input to, vector inputs get it in every component",
+        default = 1
+        )
+    bulk_value_text : StringProperty(
+        name = "Setting",
+        description = "Value for node settings which arent numbers (e.g. Cubic for interpolation), used instead of Value when not empty",
+        default = "",
+        maxlen = 1024
+        )
+    bulk_material_filter : StringProperty(
+        name = "Material filter",
+        description = "Only change materials whose name matches this regular expression. Leave empty to change all",
+        default = "",
+        maxlen = 1024
+        )
+    bulk_alt_imported_only : BoolProperty(
+        name = "Only imported by AssetLibraryTools",
+        description = "Only change materials created by the PBR importer",
+        default = False
+        )
     
     
     # Asset snapshot panel properties
@@ -616,222 +2574,580 @@ class properties(PropertyGroup):
         default = False
         )
 
+# The model file type toggles (import_fbx, import_gltf, ...), one for each entry of modelFileTypes
+for fileType, (prop, operators, exts, description) in modelFileTypes.items():
+    properties.__annotations__[prop] = BoolProperty(
+        name = "Import {0} files".format(fileType),
+        description = description,
+        default = True
+        )
+
 # ------------------------------------------------------------------------
 #    Operators
 # ------------------------------------------------------------------------
 
-class OT_BatchImportPBR(Operator):
+# Progress of the batch job which is currently running (a batchJobStatus), drawn by the panel. None while no job is running
+activeJob = None
+
+
+class batchJobStatus():
+    
+    def __init__(self, label, total):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.startTime = time.perf_counter()
+    
+    def rate(self):
+        elapsed = time.perf_counter() - self.startTime
+        return self.done / elapsed if elapsed > 0 else 0
+    
+    # Estimated seconds left, None until the first item is done
+    def eta(self):
+        rate = self.rate()
+        if rate <= 0:
+            return None
+        return (self.total - self.done) / rate
+
+
+# Format a number of seconds as e.g. 1h 02m 05s
+def formatDuration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return "{0}h {1:02d}m {2:02d}s".format(seconds // 3600, (seconds % 3600) // 60, seconds % 60)
+    if seconds >= 60:
+        return "{0}m {1:02d}s".format(seconds // 60, seconds % 60)
+    return "{0}s".format(seconds)
+
+
+# Mixin for the long running batch operators (put it before Operator in the bases)
+# Subclasses implement jobStart (setup, returns the list of work items, or None after reporting an error to cancel), jobProcess (handles one item) and jobFinish (cleanup and report).
+# jobReady may tell the modal job an item is still waiting for background work, a later item which is ready is then processed first.
+# From the UI the job runs as a modal operator driven by a window manager timer, processing items in time boxed slices so Blender stays responsive,
+# with progress shown in the panel and Esc to cancel (items processed so far are kept). execute() runs the whole job at once, for scripts and background mode.
+class batchJob():
+    jobLabel = "Working"
+    jobSliceTime = 0.05 # Seconds of work per timer tick
+    jobLookahead = 256 # Items looked at for one which is ready when the next one isnt
+    
+    def jobStart(self, context):
+        return []
+    
+    def jobProcess(self, context, item):
+        pass
+    
+    def jobReady(self, item):
+        return True
+    
+    def jobFinish(self, context, cancelled):
+        pass
+    
+    def execute(self, context):
+        items = self.jobStart(context)
+        if items == None:
+            return {'CANCELLED'}
+        for item in items:
+            self.jobProcess(context, item)
+        self.jobFinish(context, False)
+        return {'FINISHED'}
+    
+    def invoke(self, context, event):
+        global activeJob
+        if bpy.app.background:
+            return self.execute(context)
+        if activeJob != None:
+            self.report({'WARNING'}, "Another AssetLibraryTools job is still running")
+            return {'CANCELLED'}
+        self.jobItems = self.jobStart(context)
+        if self.jobItems == None:
+            return {'CANCELLED'}
+        self.jobIndex = 0
+        activeJob = batchJobStatus(self.jobLabel, len(self.jobItems))
+        wm = context.window_manager
+        wm.progress_begin(0, max(1, len(self.jobItems)))
+        self.jobTimer = wm.event_timer_add(0.001, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            return self.jobEnd(context, True)
+        if event.type != 'TIMER' or event.timer != self.jobTimer:
+            return {'PASS_THROUGH'}
+        deadline = time.perf_counter() + self.jobSliceTime
+        try:
+            while self.jobIndex < len(self.jobItems):
+                item = self.jobItems[self.jobIndex]
+                if not self.jobReady(item): # Defer it behind the next ready item, or wait for the next tick instead of blocking the UI
+                    end = min(len(self.jobItems), self.jobIndex + 1 + self.jobLookahead)
+                    ready = next((i for i in range(self.jobIndex + 1, end) if self.jobReady(self.jobItems[i])), None)
+                    if ready == None:
+                        break
+                    self.jobItems[self.jobIndex], self.jobItems[ready] = self.jobItems[ready], item
+                self.jobProcess(context, self.jobItems[self.jobIndex])
+                self.jobIndex += 1
+                if time.perf_counter() >= deadline:
+                    break
+        except Exception:
+            self.jobEnd(context, True) # Dont leave the timer and progress indicator behind
+            raise
+        activeJob.done = self.jobIndex
+        context.window_manager.progress_update(self.jobIndex)
+        batchJob.redrawPanels(context)
+        if self.jobIndex >= len(self.jobItems):
+            return self.jobEnd(context, False)
+        return {'RUNNING_MODAL'}
+    
+    def jobEnd(self, context, cancelled):
+        global activeJob
+        wm = context.window_manager
+        wm.event_timer_remove(self.jobTimer)
+        wm.progress_end()
+        activeJob = None
+        self.jobFinish(context, cancelled)
+        batchJob.redrawPanels(context)
+        return {'FINISHED'} # Also when cancelled, the items processed so far are kept
+    
+    def redrawPanels(context):
+        if context.screen != None:
+            for area in context.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+
+
+class OT_BatchImportPBR(batchJob, Operator):
     bl_label = "Import PBR textures"
     bl_idname = "alt.batchimportpbr"
-    def execute(self, context):
-        scene = context.scene
-        tool = scene.assetlibrarytools
-        n_imp = 0 # Number of materials imported
-        n_del = 0 # Number of materials deleted (due to no textures after import)
-        n_skp = 0 # Number of materials skipped due to them already existing
-        existing_mat_names = []
-        subdirectories = [x for x in pathlib.Path(tool.mat_import_path).iterdir() if x.is_dir()] # Get subdirs in directory selected in UI
-        for sd in subdirectories:
-            filePaths = [x for x in pathlib.Path(sd).iterdir() if x.is_file()] # Get filepaths of textures
-            if tool.tex_ignore_filter != "": # Remove filepaths of textures which contain a filtered string, if a filter is chosen.
-                for fp in filePaths:
-                    if tool.tex_ignore_filter in fp.name:
-                        filePaths.pop(filePaths.index(fp))
-            # Get existing material names if skipping existing materials is turned on
-            if tool.skip_existing == True:
-                existing_mat_names = []
-                for mat in bpy.data.materials:
-                    existing_mat_names.append(mat.name)
-            # check if the material thats about to be imported exists or not, or if we dont care about skipping existing materials.
-            if (sd.name not in existing_mat_names) or (tool.skip_existing != True):
-                mat = shaderSetup.simplePrincipledSetup(sd.name, filePaths) # Create shader using filepaths of textures
-                if tool.use_fake_user == True: # Enable fake user (if desired)
-                    mat.use_fake_user = True
-                if tool.use_real_displacement == True: # Enable real displacement (if desired)
-                    mat.cycles.displacement_method = 'BOTH'
-                # Delete the material if it contains no textures
-                hasTex = False
-                for n in mat.node_tree.nodes: 
-                    if n.type == 'TEX_IMAGE': # Check if shader contains textures, if yes, then its worth keeping
-                        hasTex = True
-                if hasTex == False:
-                    bpy.data.materials.remove(mat) # Delete material if it contains no textures
-                    n_del += 1
-                else:
-                    n_imp += 1
-            else:
-                n_skp += 1
+    jobLabel = "Importing PBR materials"
+    
+    # JSON file with the texture sets to import (see textureSetsToJson) instead of scanning mat_import_path, set by ALT_BatchCLI.py
+    manifest_path : StringProperty(options={'HIDDEN', 'SKIP_SAVE'})
+    # File to write the sets this import recorded to instead of the import manifest, merged into it by ALT_BatchCLI.py once all shards are done
+    manifest_fragment_path : StringProperty(options={'HIDDEN', 'SKIP_SAVE'})
+    
+    def jobStart(self, context):
+        tool = context.scene.assetlibrarytools
+        self.n_imp = 0 # Number of materials imported
+        self.n_del = 0 # Number of materials deleted (due to no textures after import)
+        self.n_skp = 0 # Number of materials skipped due to them already existing
+        self.n_upd = 0 # Number of materials rebuilt because their textures changed (incremental import)
+        if tool.library_output == 'SHARDS' and tool.shard_path == "":
+            self.report({'ERROR'}, "Choose a library directory to write the shards to")
+            return None
+        self.existing_mat_names = set(bpy.data.materials.keys()) # Built once, kept up to date as materials are imported
+        self.images = imageCache(tool.reuse_loaded_images)
+        self.templates = materialTemplates()
+        self.manifest = importManifest(os.path.realpath(tool.mat_import_path), self.manifest_fragment_path or None) if tool.incremental_import else None
+        if self.manifest_path != "":
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                texSets = textureSetsFromJson(json.load(f)["textureSets"])
+        else:
+            texSets = scanTextureSets(tool.mat_import_path, CompileIgnoreFilter(tool.tex_ignore_filter)) # Scan the directory selected in UI and classify the textures in each subdir
+        self.sharder = librarySharder(tool, "materials") if tool.library_output == 'SHARDS' else None
+        # Skipped sets are left out before planning, so their maps arent hashed or converted and unchanged sets cost nothing
+        count = len(texSets)
+        texSets = [texSet for texSet in texSets if not self.skipSet(tool, texSet)]
+        self.n_skp = count - len(texSets)
+        self.pipeline = texturePipeline(tool)
+        self.pipeline.plan(texSets) # Starts converting, packing and making proxies in the background, materials are built while the worker processes run
+        return texSets
+    
+    # Incremental import skips sets recorded in the manifest whose textures are unchanged (changed ones are rebuilt in place),
+    # otherwise skip_existing skips sets whose material already exists
+    def skipSet(self, tool, texSet):
+        if self.manifest != None:
+            entry = self.manifest.get(texSet.name)
+            if entry != None and entry["material"] in self.existing_mat_names:
+                return entry["fingerprint"] == textureSetFingerprint(texSet)
+        return texSet.name in self.existing_mat_names and tool.skip_existing == True
+    
+    def jobReady(self, texSet):
+        return self.pipeline.ready(texSet)
+    
+    def jobProcess(self, context, texSet):
+        tool = context.scene.assetlibrarytools
+        images = self.images
+        manifest = self.manifest
+        if self.skipSet(tool, texSet): # Another set of the same name was imported earlier in this job
+            self.n_skp += 1
+            return
+        fingerprint = textureSetFingerprint(texSet) if manifest != None or self.sharder != None else None
+        # Incremental import: sets recorded in the manifest whose textures changed are rebuilt in place
+        if manifest != None:
+            entry = manifest.get(texSet.name)
+            if entry != None and entry["material"] in self.existing_mat_names:
+                mat = bpy.data.materials[entry["material"]]
+                files, packed = self.pipeline.files(texSet)
+                textures = shaderSetup.loadTextures(files, images)
+                for img in textures.values():
+                    if images.isPreexisting(img): # Make sure images reused from the file show the changed textures
+                        img.reload()
+                types = set(textures.keys()).union(packed or [])
+                shaderSetup.buildPrincipledNodes(mat, types, packed) # Rebuilding the nodes of the existing material keeps its name, users and asset data
+                shaderSetup.assignImages(mat, textures)
+                manifest.record(texSet.name, fingerprint, mat.name)
+                self.n_upd += 1
+                return
+        # New material
+        files, packed = self.pipeline.files(texSet)
+        mat = shaderSetup.simplePrincipledSetup(texSet.name, files, images, self.templates, packed) # Create shader using the classified textures
+        if tool.use_fake_user == True: # Enable fake user (if desired)
+            mat.use_fake_user = True
+        if tool.use_real_displacement == True: # Enable real displacement (if desired)
+            mat.cycles.displacement_method = 'BOTH'
+        # Delete the material if it contains no textures
+        hasTex = False
+        for n in mat.node_tree.nodes: 
+            if n.type == 'TEX_IMAGE': # Check if shader contains textures, if yes, then its worth keeping
+                hasTex = True
+        if hasTex == False:
+            bpy.data.materials.remove(mat) # Delete material if it contains no textures
+            self.n_del += 1
+        else:
+            self.existing_mat_names.add(mat.name)
+            if manifest != None:
+                manifest.record(texSet.name, fingerprint, mat.name)
+            self.n_imp += 1
+            if self.sharder != None: # Written to the library and removed from the file once the shard is full
+                self.sharder.add([mat], texSet.name, fingerprint, sum(f.size for f in texSet.files.values()))
+    
+    def jobFinish(self, context, cancelled):
+        n_imp, n_del, n_skp = self.n_imp, self.n_del, self.n_skp
+        if self.manifest != None:
+            self.manifest.save() # Also saved when cancelled, so the sets imported so far are skipped next time
+        self.templates.clear()
+        self.pipeline.shutdown()
+        if self.sharder != None:
+            self.sharder.finish(cancelled)
+        outcome = "Cancelled" if cancelled else "Complete"
         if (n_del > 0) and (n_skp > 0):
-            DisplayMessageBox("Complete, {0} materials imported, {1} were deleted after import because they contained no textures (No recognised textures were found in the folder), {2} skipped because they already exist".format(n_imp,n_del,n_skp))
+            msg = "{3}, {0} materials imported, {1} were deleted after import because they contained no textures (No recognised textures were found in the folder), {2} skipped because they already exist".format(n_imp,n_del,n_skp,outcome)
         elif n_skp > 0:
-            DisplayMessageBox("Complete, {0} materials imported. {1} skipped because they already exist".format(n_imp, n_skp))
+            msg = "{2}, {0} materials imported. {1} skipped because they already exist".format(n_imp, n_skp, outcome)
         elif n_del > 0:
-            DisplayMessageBox("Complete, {0} materials imported, {1} were deleted after import because they contained no textures (No recognised textures were found in the folder)".format(n_imp,n_del))
+            msg = "{2}, {0} materials imported, {1} were deleted after import because they contained no textures (No recognised textures were found in the folder)".format(n_imp,n_del,outcome)
         else:
-            DisplayMessageBox("Complete, {0} materials imported".format(n_imp))
-        return{'FINISHED'}
+            msg = "{1}, {0} materials imported".format(n_imp, outcome)
+        if self.n_upd > 0:
+            msg += ", {0} rebuilt because their textures changed".format(self.n_upd)
+        # Report how many texture loads the image cache saved
+        msg += ". Image cache: {0} hits, {1} misses".format(self.images.hits, self.images.misses)
+        if self.pipeline.generated > 0:
+            msg += ". Texture cache: {0} sets processed, {1} failures".format(self.pipeline.generated, self.pipeline.failed)
+        if self.pipeline.cacheError != None:
+            msg += ". Texture cache unavailable ({0}), source maps were used".format(self.pipeline.cacheError)
+        if self.pipeline.memorySaved > 0:
+            msg += ". Channel packing saved {0:.1f} MB".format(self.pipeline.memorySaved / 1e6)
+        if self.sharder != None:
+            msg += ". " + self.sharder.summary()
+        print(msg)
+        DisplayMessageBox(msg)
 
 
-class OT_ImportModels(Operator):
+class OT_ImportModels(batchJob, Operator):
     bl_label = "Import models"
     bl_idname = "alt.importmodels"
+    jobLabel = "Importing models"
     
-    # Hide new objects works by comparing a list of objects before (x) happened with the current list via bpy.context.scene.objects to get the list of new objects, then hides those new objects
-    def hideNewObjects(old_objects):
+    # JSON file with the models to import ("models": [[file type, path, size], ...]) instead of searching model_import_path, set by ALT_BatchCLI.py
+    manifest_path : StringProperty(options={'HIDDEN', 'SKIP_SAVE'})
+    
+    def hideNewObjects(imported_objects):
         scene = bpy.context.scene
         tool = scene.assetlibrarytools
         if tool.hide_after_import == True:
-            imported_objects = set(bpy.context.scene.objects) - old_objects
             for object in imported_objects:
                 object.hide_set(True)
     
-    def moveNewObjectsToNewCollection(old_objects, collName):
+    # Moves the objects imported into the staging scene to a new collection called collName, or to the active collection if the option is off
+    # Returns the new collection (None if the option is off)
+    def moveNewObjectsToNewCollection(staging, collName):
         scene = bpy.context.scene
         tool = scene.assetlibrarytools
         if tool.move_to_new_collection_after_import == True: 
-            imported_objects = set(bpy.context.scene.objects) - old_objects
             newCollection = bpy.data.collections.new(collName)
             bpy.context.scene.collection.children.link(newCollection)
-            for obj in imported_objects:
-                for uc in obj.users_collection:
-                    uc.objects.unlink(obj)
-                newCollection.objects.link(obj)
+            staging.release(newCollection)
+            return newCollection
+        staging.release()
+        return None
     
-    def joinAllNewObjects(old_objects):
+    # Joins the imported mesh objects (see joinMeshObjects), returns the objects left after joining
+    def joinAllNewObjects(imported_objects):
         scene = bpy.context.scene
         tool = scene.assetlibrarytools
-        if tool.join_new_objects == True:
-            imported_objects = set(bpy.context.scene.objects) - old_objects
-            bpy.ops.object.select_all(action='DESELECT')
-            for obj in imported_objects:
-                bpy.context.view_layer.objects.active = obj
-                obj.select_set(True)
-            bpy.ops.object.join()
+        meshes = [obj for obj in imported_objects if obj.type == 'MESH']
+        if tool.join_new_objects == True and len(meshes) > 1:
+            others = [obj for obj in imported_objects if obj.type != 'MESH']
+            return [joinMeshObjects(meshes)] + others
+        return imported_objects
     
-    def execute(self, context):
-        scene = context.scene
-        tool = scene.assetlibrarytools
-        p = pathlib.Path(str(tool.model_import_path))
-        imported = 0 # Number of imported objects
-        errors = 0 # Number of import errors
-        # Import FBX files
-        if tool.import_fbx == True:
-            fbxFilePaths = [x for x in p.glob('**/*.fbx') if x.is_file()] # Get filepaths of files with the extension .fbx in the selected directory (and subdirs, recursively)
-            for filePath in fbxFilePaths:
-                old_objects = set(context.scene.objects)
-                try:
-                    bpy.ops.import_scene.fbx(filepath=str(filePath))
-                    imported += 1
-                except:
-                    print("FBX import error")
-                    errors += 1
-                OT_ImportModels.hideNewObjects(old_objects)
-                OT_ImportModels.moveNewObjectsToNewCollection(old_objects, filePath.name)
-                OT_ImportModels.joinAllNewObjects(old_objects)
-        # Import GLTF files
-        if tool.import_gltf == True:
-            gltfFilePaths = [x for x in p.glob('**/*.gltf') if x.is_file()] # Get filepaths of files with the extension .gltf in the selected directory (and subdirs, recursively)
-            for filePath in gltfFilePaths:
-                old_objects = set(context.scene.objects)
-                try:
-                    bpy.ops.import_scene.gltf(filepath=str(filePath))
-                    imported += 1
-                except:
-                    print("GLTF import error")
-                    errors += 1
-                OT_ImportModels.hideNewObjects(old_objects)
-                OT_ImportModels.moveNewObjectsToNewCollection(old_objects, filePath.name)
-                OT_ImportModels.joinAllNewObjects(old_objects)
-        # Import OBJ files
-        if tool.import_obj == True:
-            objFilePaths = [x for x in p.glob('**/*.obj') if x.is_file()] # Get filepaths of files with the extension .obj in the selected directory (and subdirs, recursively)
-            for filePath in objFilePaths:
-                old_objects = set(context.scene.objects)
-                try:
-                    bpy.ops.import_scene.obj(filepath=str(filePath))
-                    imported += 1
-                except:
-                    print("OBJ import error")
-                    errors += 1
-                OT_ImportModels.hideNewObjects(old_objects)
-                OT_ImportModels.moveNewObjectsToNewCollection(old_objects, filePath.name)
-                OT_ImportModels.joinAllNewObjects(old_objects)
-        # Import X3D files
-        if tool.import_x3d == True:
-            x3dFilePaths = [x for x in p.glob('**/*.x3d') if x.is_file()] # Get filepaths of files with the extension .x3d in the selected directory (and subdirs, recursively)
-            for filePath in x3dFilePaths:
-                old_objects = set(context.scene.objects)
-                try:
-                    bpy.ops.import_scene.x3d(filepath=str(filePath))
-                    imported += 1
-                except:
-                    print("X3D import error")
-                    errors += 1
-                OT_ImportModels.hideNewObjects(old_objects)
-                OT_ImportModels.moveNewObjectsToNewCollection(old_objects, filePath.name)
-                OT_ImportModels.joinAllNewObjects(old_objects)
-        if errors == 0:
-            DisplayMessageBox("Complete, {0} models imported".format(imported))
+    # Find the model files of the enabled file types in model_import_path (one walk of the directory tree), returns a list of modelFile grouped by file type
+    def findModels(tool):
+        extensions = {ext: fileType for ext, fileType in modelExtensions.items() if getattr(tool, modelFileTypes[fileType][0])}
+        found = scanModelFiles(os.path.realpath(bpy.path.abspath(tool.model_import_path)), extensions)
+        return [f for fileType in modelFileTypes for f in found.get(fileType, [])]
+    
+    def jobStart(self, context):
+        tool = context.scene.assetlibrarytools
+        self.imported = 0 # Number of imported objects
+        self.errors = 0 # Number of import errors
+        if tool.library_output == 'SHARDS' and tool.shard_path == "":
+            self.report({'ERROR'}, "Choose a library directory to write the shards to")
+            return None
+        self.sharder = librarySharder(tool, "models") if tool.library_output == 'SHARDS' else None
+        if self.manifest_path != "":
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                files = [modelFile(*m) for m in json.load(f)["models"]]
+        else:
+            files = OT_ImportModels.findModels(tool)
+        self.importers = {}
+        for fileType in set(f.fileType for f in files):
+            self.importers[fileType] = findOperator(modelFileTypes[fileType][1])
+            if self.importers[fileType] == None:
+                self.report({'WARNING'}, "No {0} importer available in this version of Blender, {0} files are skipped".format(fileType))
+        files = [f for f in files if self.importers[f.fileType] != None]
+        self.report({'INFO'}, "Importing " + modelFilesSummary(files))
+        self.staging = stagingScene(context) # Every file is imported into this scene first
+        self.cache = modelCache(tool) if tool.use_model_cache else None
+        self.cacheError = None
+        if self.cache != None and self.cache.error != None: # Models are imported without the cache
+            self.cacheError, self.cache = self.cache.error, None
+        self.dedup = meshDeduplicator() if tool.dedup_meshes else None
+        self.lods = lodGenerator(tool) if tool.generate_lods else None
+        return files
+    
+    def jobProcess(self, context, item):
+        fileType, importFn, filePath = item.fileType, self.importers[item.fileType], pathlib.Path(item.path)
+        staging = self.staging
+        cached = False
+        try:
+            cached = self.cache != None and self.cache.load(item, importFn, staging)
+            if not cached:
+                staging.call(importFn, filepath=str(filePath))
+            self.imported += 1
+        except:
+            print("{0} import error".format(fileType))
+            self.errors += 1
         else:
-            DisplayMessageBox("Complete, {0} models imported. {1} import errors".format(imported, errors))
-        return{'FINISHED'}
+            if self.cache != None and not cached: # A cache write failure isnt an import error, store reports it
+                self.cache.store(item, importFn, staging)
+        imported_objects = OT_ImportModels.joinAllNewObjects(staging.objects())
+        for obj in imported_objects:
+            obj[altImportedProp] = True
+            if obj.data != None and obj.data.library == None:
+                obj.data[altImportedProp] = True
+        if self.dedup != None:
+            self.dedup.add(imported_objects)
+        if self.lods != None:
+            self.lods.add(imported_objects, staging.scene.view_layers[0], filePath.name)
+        newCollection = OT_ImportModels.moveNewObjectsToNewCollection(staging, filePath.name)
+        OT_ImportModels.hideNewObjects(imported_objects) # Hiding is per view layer, so it happens once the objects are in the real scene
+        if self.sharder != None:
+            if len(imported_objects) > 0:
+                stat = filePath.stat()
+                key = "{0}|{1}|{2}".format(filePath, stat.st_size, stat.st_mtime_ns)
+                self.sharder.add([newCollection] if newCollection != None else imported_objects, str(filePath), key, stat.st_size)
+    
+    def jobFinish(self, context, cancelled):
+        outcome = "Cancelled" if cancelled else "Complete"
+        if self.errors == 0:
+            msg = "{1}, {0} models imported".format(self.imported, outcome)
+        else:
+            msg = "{2}, {0} models imported. {1} import errors".format(self.imported, self.errors, outcome)
+        self.staging.remove()
+        if self.cache != None:
+            self.cache.save()
+            msg += ". " + self.cache.summary()
+        if self.cacheError != None:
+            msg += ". Model cache unavailable ({0}), models were imported without it".format(self.cacheError)
+        if self.dedup != None:
+            msg += ". " + self.dedup.summary()
+        if self.lods != None:
+            msg += ". " + self.lods.summary()
+        if self.sharder != None:
+            self.sharder.finish(cancelled)
+            msg += ". " + self.sharder.summary()
+        DisplayMessageBox(msg)
+
+
+def blendIndexPath(tool):
+    if tool.blend_index_path != "":
+        return os.path.realpath(bpy.path.abspath(tool.blend_index_path))
+    return os.path.join(os.path.realpath(bpy.path.abspath(tool.append_path)), ".alt_cache", "blend_index.sqlite")
 
 
-class OT_BatchAppend(Operator):
+# Open the .blend index (see ALT_BlendIndex.py) and bring it up to date for paths
+# None if it cant be opened or written (e.g. the index is in a read only library), callers then do without it
+def openBlendIndex(tool, paths):
+    import sqlite3
+    from . import ALT_BlendIndex
+    index = None
+    try:
+        index = ALT_BlendIndex.blendIndex(blendIndexPath(tool))
+        index.update(paths)
+    except (OSError, sqlite3.Error) as e:
+        print("Cant use the .blend index {0}: {1}".format(blendIndexPath(tool), e))
+        if index != None:
+            index.close()
+        return None
+    for path, error in index.errors():
+        print("Couldnt index {0}: {1}".format(path, error))
+    return index
+
+
+class OT_BatchAppend(batchJob, Operator):
     bl_label = "Append"
     bl_idname = "alt.batchappend"
-    def execute(self, context):
-        scene = context.scene
-        tool = scene.assetlibrarytools
+    jobLabel = "Appending from .blend files"
+    
+    def jobStart(self, context):
+        tool = context.scene.assetlibrarytools
         p = pathlib.Path(str(tool.append_path))
-        link = False # append, set to true to keep the link to the original file
+        self.link = tool.append_link # append, set to true to keep the link to the original file
+        self.appended = 0 # Number of .blend files appended from
+        self.dedup = meshDeduplicator() if tool.append_dedup_meshes and not self.link else None # Linked meshes (and those of overrides) cant be swapped or removed
+        self.skipped = 0 # Number of .blend files with nothing to append, which werent loaded
         if tool.append_recursive_search == True:
-            blendFilePaths = [x for x in p.glob('**/*.blend') if x.is_file()] # Get filepaths of files with the extension .blend in the selected directory (and subdirs, recursively)
+            paths = [x for x in p.glob('**/*.blend') if x.is_file() and ".alt_cache" not in x.parts] # Get filepaths of files with the extension .blend in the selected directory (and subdirs, recursively)
         else:
-            blendFilePaths = [x for x in p.glob('*.blend') if x.is_file()] # Get filepaths of files with the extension .blend in the selected directory    
-        for path in blendFilePaths:
-            if tool.appendType == 'objects':
-                # link all objects
-                with bpy.data.libraries.load(str(path), link=link) as (data_from, data_to):
-                    data_to.objects = data_from.objects
-                # Create new collection
-                if tool.append_move_to_new_collection_after_import:
-                    newCollection = bpy.data.collections.new(str(path.name))
-                    bpy.context.scene.collection.children.link(newCollection)
-                #link object to collection
-                for obj in data_to.objects:
-                    removed = False
-                    if obj != None:
-                        if tool.append_move_to_new_collection_after_import:
-                            newCollection.objects.link(obj)
-                        else:
-                            bpy.context.collection.objects.link(obj)
-                    # remove cameras
-                    if removed == False and tool.deleteCameras == True: # This stops an error from occuring if obj is already deleted
-                        if obj.type == 'CAMERA':
-                            bpy.data.objects.remove(obj)
-                            removed = True      
-                    # remove lights
-                    if removed == False and tool.deleteLights == True: # This stops an error from occuring if obj is already deleted
-                        if obj.type == 'LIGHT':
-                            bpy.data.objects.remove(obj)
-                            removed = True
-                # Join objects if option turned on
-                if tool.append_join_new_objects:
-                    bpy.ops.object.select_all(action='DESELECT')
-                    for obj in data_to.objects:
-                        bpy.context.view_layer.objects.active = obj
-                        obj.select_set(True)
-                    bpy.ops.object.join()
-                    
-            if tool.appendType == 'materials':
-                with bpy.data.libraries.load(str(path), link=link) as (data_from, data_to):
-                    data_to.materials = data_from.materials
+            paths = [x for x in p.glob('*.blend') if x.is_file()] # Get filepaths of files with the extension .blend in the selected directory    
+        self.index = openBlendIndex(tool, [os.path.realpath(str(x)) for x in paths]) if tool.append_use_index else None
+        return paths
+    
+    # Names of the IDs to append from path as the index lists them (without the cameras and lights that would be deleted), None without an index
+    def indexedNames(self, tool, path):
+        if self.index == None:
+            return None
+        if tool.appendType == 'objects':
+            skipTypes = (["CAMERA"] if tool.deleteCameras else []) + (["LIGHT"] if tool.deleteLights else [])
+            return self.index.names(os.path.realpath(str(path)), "objects", skipTypes)
+        return self.index.names(os.path.realpath(str(path)), tool.appendType)
+    
+    # Make a library override of every linked object or collection in ids, in place of the linked one. Returns the overrides
+    # parent is the collection the linked collections were added to
+    def makeOverrides(context, ids, parent=None):
+        overrides = []
+        for id in ids:
+            if id.library == None:
+                overrides.append(id)
+            elif isinstance(id, bpy.types.Collection):
+                override = id.override_hierarchy_create(context.scene, context.view_layer)
+                if parent != None: # The override takes the place of the linked collection
+                    parent.children.unlink(id)
+                    if override not in parent.children.values():
+                        parent.children.link(override)
+                overrides.append(override)
+            else:
+                overrides.append(id.override_create(remap_local_usages=True)) # Also replaces the linked object in its collections
+        return overrides
+    
+    def jobProcess(self, context, path):
+        tool = context.scene.assetlibrarytools
+        link = self.link
+        names = self.indexedNames(tool, path)
+        if names != None and len(names) == 0:
+            self.skipped += 1
+            return
+        relative = link and bpy.data.filepath != "" # Links are relative to the open file once it is saved, so the library can move along with it
         if tool.appendType == 'objects':
-             DisplayMessageBox("Complete, objects appended")
+            # link all objects (or the ones the index says are wanted)
+            with bpy.data.libraries.load(str(path), link=link, relative=relative) as (data_from, data_to):
+                data_to.objects = data_from.objects if names == None else [name for name in names if name in data_from.objects]
+            # Create new collection
+            if tool.append_move_to_new_collection_after_import:
+                newCollection = bpy.data.collections.new(str(path.name))
+                bpy.context.scene.collection.children.link(newCollection)
+            #link object to collection
+            appended = [] # Objects which are kept
+            for obj in data_to.objects:
+                removed = False
+                if obj != None:
+                    target = newCollection if tool.append_move_to_new_collection_after_import else bpy.context.collection
+                    if target not in obj.users_collection: # Linking a library object again returns the one already linked in the file
+                        target.objects.link(obj)
+                # remove cameras
+                if removed == False and tool.deleteCameras == True: # This stops an error from occuring if obj is already deleted
+                    if obj.type == 'CAMERA':
+                        bpy.data.objects.remove(obj)
+                        removed = True      
+                # remove lights
+                if removed == False and tool.deleteLights == True: # This stops an error from occuring if obj is already deleted
+                    if obj.type == 'LIGHT':
+                        bpy.data.objects.remove(obj)
+                        removed = True
+                if removed == False and obj != None:
+                    appended.append(obj)
+            if link and tool.append_link_overrides:
+                appended = OT_BatchAppend.makeOverrides(context, appended)
+            # Join objects if option turned on, linked ones cant be changed
+            if tool.append_join_new_objects and not link:
+                meshes = [obj for obj in appended if obj.type == 'MESH' and obj.library == None and obj.data.library == None]
+                if len(meshes) > 1:
+                    others = [obj for obj in appended if obj not in meshes]
+                    appended = [joinMeshObjects(meshes)] + others
+            if self.dedup != None:
+                self.dedup.add(appended)
+                
         if tool.appendType == 'materials':
-            DisplayMessageBox("Complete, materials appended")
-        return{'FINISHED'}
+            with bpy.data.libraries.load(str(path), link=link, relative=relative) as (data_from, data_to):
+                data_to.materials = data_from.materials if names == None else [name for name in names if name in data_from.materials]
+        
+        if tool.appendType == 'collections':
+            with bpy.data.libraries.load(str(path), link=link, relative=relative) as (data_from, data_to):
+                data_to.collections = data_from.collections if names == None else [name for name in names if name in data_from.collections]
+            loaded = [c for c in data_to.collections if c != None]
+            nested = set(child for c in loaded for child in c.children)
+            parent = bpy.context.collection
+            if tool.append_move_to_new_collection_after_import:
+                parent = bpy.data.collections.new(str(path.name))
+                bpy.context.scene.collection.children.link(parent)
+            topLevel = [c for c in loaded if c not in nested] # Nested collections come along with their parents
+            for c in topLevel:
+                if c not in parent.children.values(): # Linking a library collection again returns the one already linked in the file
+                    parent.children.link(c)
+            if link and tool.append_link_overrides:
+                OT_BatchAppend.makeOverrides(context, topLevel, parent)
+        self.appended += 1
+    
+    def jobFinish(self, context, cancelled):
+        tool = context.scene.assetlibrarytools
+        if self.index != None:
+            self.index.close()
+        dedupMsg = ". " + self.dedup.summary() if self.dedup != None and tool.appendType == 'objects' else ""
+        if self.skipped > 0:
+            dedupMsg = ". {0} files had nothing to append".format(self.skipped) + dedupMsg
+        verb = "linked" if self.link else "appended"
+        if cancelled:
+            DisplayMessageBox("Cancelled, {0} {2} from {1} .blend files".format(tool.appendType, self.appended, verb) + dedupMsg)
+        elif tool.appendType == 'objects':
+             DisplayMessageBox("Complete, objects {0}".format(verb) + dedupMsg)
+        else:
+            DisplayMessageBox("Complete, {0} {1}".format(tool.appendType, verb) + dedupMsg)
+
+
+class OT_FindInBlends(Operator):
+    """List the .blend files in the append directory holding objects or materials (the append type) whose name contains the search text"""
+    bl_label = "Find in .blend files"
+    bl_idname = "alt.findinblends"
+    def execute(self, context):
+        tool = context.scene.assetlibrarytools
+        p = pathlib.Path(str(tool.append_path))
+        pattern = '**/*.blend' if tool.append_recursive_search else '*.blend'
+        paths = set(os.path.realpath(str(x)) for x in p.glob(pattern) if x.is_file() and ".alt_cache" not in x.parts)
+        index = openBlendIndex(tool, list(paths))
+        if index == None:
+            self.report({'ERROR'}, "Cant open the .blend index {0}, set another index file".format(blendIndexPath(tool)))
+            return {'CANCELLED'}
+        try:
+            found = [row for row in index.find(tool.blend_search, tool.appendType) if row[0] in paths]
+        finally:
+            index.close()
+        files = sorted(set(path for path, idType, name in found))
+        for path, idType, name in found:
+            print("{0}: {1}".format(path, name))
+        DisplayMessageBox("{0} {1} found in {2} files{3}".format(len(found), tool.appendType, len(files), ": " + ", ".join(os.path.basename(f) for f in files[:10]) if len(files) > 0 else ""))
+        return {'FINISHED'}
 
 
 class OT_ManageAssets(Operator):
@@ -925,28 +3241,18 @@ class OT_BatchDelete(Operator):
     def execute(self, context):
         scene = context.scene
         tool = scene.assetlibrarytools
-        i = 0 # Number of items deleted
-        if tool.deleteType == 'objects':
-            for object in bpy.data.objects:
-                bpy.data.objects.remove(object)
-                i += 1
-        if tool.deleteType == 'materials':
-            for mat in bpy.data.materials:
-                bpy.data.materials.remove(mat)
-                i += 1
-        if tool.deleteType == 'images':
-            while len(bpy.data.images) > 0: # Cant use a for loop like the other "delete all" operations for some reason
-                bpy.data.images.remove(bpy.data.images[0])
-                i += 1
-        if tool.deleteType == 'textures':
-            for tex in bpy.data.textures:
-                bpy.data.textures.remove(tex)
-                i += 1    
-        if tool.deleteType == 'meshes':
-            for mesh in bpy.data.meshes:
-                bpy.data.meshes.remove(mesh)
-                i += 1
-        DisplayMessageBox("Done, {0} {1} deleted".format(i, tool.deleteType))
+        try:
+            targets = batchDeleteTargets(tool)
+        except re.error as e:
+            self.report({'ERROR'}, "Invalid name filter: {0}".format(e))
+            return {'CANCELLED'}
+        memory = sum(idMemoryEstimate(id) for id in targets)
+        memoryMsg = ", about {0:.1f} MB".format(memory / 1000000) if memory > 0 else ""
+        if tool.delete_dry_run:
+            DisplayMessageBox("Dry run, {0} {1} would be deleted{2}".format(len(targets), tool.deleteType, memoryMsg))
+            return {'FINISHED'}
+        bpy.data.batch_remove(targets) # One call for everything, removing datablocks one by one updates the whole file every time
+        DisplayMessageBox("Done, {0} {1} deleted{2}".format(len(targets), tool.deleteType, memoryMsg))
         return {'FINISHED'}
 
 
@@ -963,6 +3269,26 @@ class OT_SimpleDelDupeMaterials(Operator):
         return {'FINISHED'}
 
 
+class OT_DedupMaterials(Operator):
+    """Find materials that are the same (same settings, nodes, values and image files) whatever their name, switch everything to one of them and remove the others"""
+    bl_label = "Clean up duplicate materials (by content)"
+    bl_idname = "alt.dedupmaterials"
+    def execute(self, context):
+        i = dedupMaterials(list(bpy.data.materials))
+        DisplayMessageBox("Done, {0} duplicate materials removed".format(i))
+        return {'FINISHED'}
+
+
+class OT_DedupImages(Operator):
+    """Find images that are the same file or hold the same pixels whatever their name, switch everything to one of them and remove the others"""
+    bl_label = "Clean up duplicate images"
+    bl_idname = "alt.dedupimages"
+    def execute(self, context):
+        i, pixelBytes, packedBytes = dedupImages(list(bpy.data.images))
+        DisplayMessageBox("Done, {0} duplicate images removed, {1:.1f} MB of pixel memory and {2:.1f} MB of packed files reclaimed".format(i, pixelBytes / 1000000, packedBytes / 1000000))
+        return {'FINISHED'}
+
+
 class OT_CleanupUnusedMaterials(Operator):
     bl_label = "Clean up unused materials"
     bl_idname = "alt.cleanupunusedmats"
@@ -976,6 +3302,60 @@ class OT_CleanupUnusedMaterials(Operator):
         return {'FINISHED'}
 
 
+class OT_PurgeUnreachable(Operator):
+    """Remove all data that isnt used by any scene, including data only used by other unused data, in one go"""
+    bl_label = "Purge unused data (recursive)"
+    bl_idname = "alt.purgeunreachable"
+    def execute(self, context):
+        tool = context.scene.assetlibrarytools
+        ids = unreachableIds(tool.purge_ignore_fake_users)
+        counts = collections.Counter()
+        memory = collections.Counter()
+        for id in ids:
+            counts[id.id_type] += 1
+            memory[id.id_type] += idMemoryEstimate(id)
+        bpy.data.batch_remove(ids)
+        types = []
+        for idType, n in sorted(counts.items()):
+            types.append("{0} {1}".format(n, idType.lower()) + (" ({0:.1f} MB)".format(memory[idType] / 1000000) if memory[idType] > 0 else ""))
+        DisplayMessageBox("Done, {0} datablocks purged".format(len(ids)) + (": " + ", ".join(types) if len(types) > 0 else ""))
+        return {'FINISHED'}
+
+
+class OT_DedupMeshes(Operator):
+    """Make all objects with identical mesh geometry share one mesh and remove the copies"""
+    bl_label = "Share identical meshes"
+    bl_idname = "alt.dedupmeshes"
+    def execute(self, context):
+        dedup = meshDeduplicator()
+        dedup.add(list(bpy.data.objects))
+        DisplayMessageBox("Done, " + dedup.summary())
+        return {'FINISHED'}
+
+
+class OT_SwitchLods(Operator):
+    """Switch all objects with LODs to a LOD level"""
+    bl_label = "Switch LODs"
+    bl_idname = "alt.switchlods"
+    level : IntProperty(
+        name="Level",
+        description="LOD level, 0 is full resolution and -1 the lightest",
+        default=0,
+        min=-1
+        )
+    def execute(self, context):
+        i = 0 # Number of objects switched
+        for obj in bpy.data.objects:
+            if obj.type == 'MESH' and obj.library == None and obj.get("alt_lod_base") != None:
+                lods = objectLods(obj)
+                lod = lods[-1] if self.level < 0 else lods[min(self.level, len(lods) - 1)]
+                if obj.data != lod:
+                    obj.data = lod
+                    i += 1
+        DisplayMessageBox("Done, {0} objects switched".format(i))
+        return {'FINISHED'}
+
+
 class OT_UseDisplacementOnAll(Operator):
     bl_label = "Use real displacement on all materials"
     bl_idname = "alt.userealdispall"
@@ -992,16 +3372,64 @@ class OT_ChangeAllDisplacementScale(Operator):
     def execute(self, context):
         tool = context.scene.assetlibrarytools
         i = 0 # number of nodes changed
-        for mat in bpy.data.materials:
-            if mat is not None and mat.use_nodes and mat.node_tree is not None:
-                for node in mat.node_tree.nodes:
-                    if node.type == 'DISPLACEMENT':
-                        node.inputs[2].default_value = tool.dispNewScale
-                        i += 1
+        for mat, node in nodeIndex.find("ShaderNodeDisplacement"):
+            node.inputs[2].default_value = tool.dispNewScale
+            i += 1
+        controls = shaderSetup.findControlsGroup()
+        if controls != None: # The displacement scale of materials using the shared controls comes from here
+            controls.nodes["node_displacementScale"].outputs['Value'].default_value = tool.dispNewScale
+            i += 1
         DisplayMessageBox("Done, {0} nodes changed".format(i))
         return {'FINISHED'}
 
 
+class OT_BulkSetNodeInput(Operator):
+    """Set an input (or setting) of every node of a type or name in all materials matching the filters"""
+    bl_label = "Set node input on all materials"
+    bl_idname = "alt.bulksetnodeinput"
+    def execute(self, context):
+        tool = context.scene.assetlibrarytools
+        try:
+            nodes = nodeIndex.find(tool.bulk_node, tool.bulk_material_filter, tool.bulk_alt_imported_only)
+        except re.error as e:
+            self.report({'ERROR'}, "Invalid material filter: {0}".format(e))
+            return {'CANCELLED'}
+        i = 0 # number of nodes changed
+        failed = []
+        for mat, node in nodes:
+            try:
+                if setNodeInput(node, tool.bulk_input, tool.bulk_value, tool.bulk_value_text):
+                    i += 1
+            except (TypeError, ValueError) as e:
+                failed.append("{0} in {1}: {2}".format(node.name, mat.name, e))
+        if len(failed) > 0: # Values that dont fit some nodes, the others are changed anyway
+            self.report({'WARNING'}, "Cant set {0} of {1} nodes, e.g. {2}".format(tool.bulk_input, len(failed), failed[0]))
+        DisplayMessageBox("Done, {0} of {1} nodes changed".format(i, len(nodes)))
+        return {'FINISHED'}
+
+
+class OT_SwapProxyTextures(Operator):
+    """Switch all images imported by AssetLibraryTools between their proxy and full resolution textures"""
+    bl_label = "Swap proxy textures"
+    bl_idname = "alt.swapproxytextures"
+    target : EnumProperty(
+        name="Target",
+        items=[ ('FULL', "Full resolution", ""),
+                ('PROXY', "Proxy", ""),
+               ]
+        )
+    def execute(self, context):
+        key = "alt_fullres_path" if self.target == 'FULL' else "alt_proxy_path"
+        i = 0 # Number of images switched
+        for img in bpy.data.images:
+            path = img.get(key)
+            if path != None and img.get(altImportedProp) and img.filepath != path:
+                img.filepath = path # Reloads the image from the new path
+                i += 1
+        DisplayMessageBox("Done, {0} images switched to {1}".format(i, "full resolution" if self.target == 'FULL' else "proxies"))
+        return {'FINISHED'}
+
+
 def snapshot(self,context,ob):
     scene = context.scene
     tool = scene.assetlibrarytools
@@ -1111,23 +3539,26 @@ class OT_AssetDownloaderOperator(Operator):
         return {'FINISHED'}
 
 
-class OT_ImportSBSAR(Operator):
+class OT_ImportSBSAR(batchJob, Operator):
     bl_label = "Import SBSAR files"
     bl_idname = "alt.importsbsar"
-    def execute(self, context):
-        scene = context.scene
-        tool = scene.assetlibrarytools
+    jobLabel = "Importing SBSAR files"
+    
+    def jobStart(self, context):
+        tool = context.scene.assetlibrarytools
         p = pathlib.Path(str(tool.sbsar_import_path))
-        i = 0 # number of files imported
-        files = [x for x in p.glob('**/*.sbsar') if x.is_file()] # Get filepaths of files with the extension .sbsar in the selected directory (and subdirs, recursively)
-        for f in files:
-            try:
-                bpy.ops.substance.load_sbsar(filepath=str(f), description_arg=True, files=[{"name":f.name, "name":f.name}], directory=str(f).replace(f.name, ""))
-                i += 1
-            except:
-                print("SBSAR import failure")
-        DisplayMessageBox("Complete, {0} sbsar files imported".format(i))
-        return{'FINISHED'}
+        self.imported = 0 # number of files imported
+        return [x for x in p.glob('**/*.sbsar') if x.is_file()] # Get filepaths of files with the extension .sbsar in the selected directory (and subdirs, recursively)
+    
+    def jobProcess(self, context, f):
+        try:
+            bpy.ops.substance.load_sbsar(filepath=str(f), description_arg=True, files=[{"name":f.name, "name":f.name}], directory=str(f).replace(f.name, ""))
+            self.imported += 1
+        except:
+            print("SBSAR import failure")
+    
+    def jobFinish(self, context, cancelled):
+        DisplayMessageBox("{1}, {0} sbsar files imported".format(self.imported, "Cancelled" if cancelled else "Complete"))
 
 
 # ------------------------------------------------------------------------
@@ -1144,6 +3575,14 @@ class OBJECT_PT_panel(Panel):
     @classmethod
     def poll(self,context):
         return context.mode
+    
+    # Output settings shared by the material and model import boxes
+    def drawLibraryOutput(box, tool):
+        box.prop(tool, "library_output")
+        if tool.library_output == 'SHARDS':
+            box.prop(tool, "shard_path")
+            box.prop(tool, "shard_max_assets")
+            box.prop(tool, "shard_max_mb")
 
     def draw(self, context):
         layout = self.layout
@@ -1152,6 +3591,15 @@ class OBJECT_PT_panel(Panel):
         obj = context.scene.assetlibrarytools
         
         
+        # Progress of the running batch job
+        if activeJob != None:
+            jobBox = layout.box()
+            jobBox.label(text="{0}: {1}/{2}".format(activeJob.label, activeJob.done, activeJob.total), icon="TIME")
+            eta = activeJob.eta()
+            jobBox.label(text="{0:.1f} items/s, ETA {1}".format(activeJob.rate(), formatDuration(eta) if eta != None else "-"))
+            jobBox.label(text="Press Esc to cancel (finished items are kept)")
+        
+        
         # Material import UI
         matImportBox = layout.box()
         matImportRow = matImportBox.row()
@@ -1174,12 +3622,23 @@ class OBJECT_PT_panel(Panel):
                 matImportOptionsRow = matImportBox.row()
                 matImportBox.label(text="Import settings:")
                 matImportBox.prop(tool, "skip_existing")
+                matImportBox.prop(tool, "incremental_import")
                 matImportBox.prop(tool, "tex_ignore_filter")
+                matImportBox.prop(tool, "reuse_loaded_images")
+                matImportBox.prop(tool, "convert_textures")
+                matImportBox.prop(tool, "pack_grayscale_maps")
+                matImportBox.prop(tool, "use_proxy_textures")
+                if tool.use_proxy_textures:
+                    matImportBox.prop(tool, "proxy_resolution")
+                if tool.use_proxy_textures or tool.pack_grayscale_maps or tool.convert_textures:
+                    matImportBox.prop(tool, "texture_cache_path")
+                OBJECT_PT_panel.drawLibraryOutput(matImportBox, tool)
                 matImportBox.separator()
                 matImportBox.label(text="Material settings:")
                 matImportBox.prop(tool, "use_fake_user")
                 matImportBox.prop(tool, "use_real_displacement")
                 matImportBox.prop(tool, "add_extranodes")
+                matImportBox.prop(tool, "use_shared_controls")
                 matImportBox.prop(tool, "texture_mapping")
                 matImportBox.separator()
                 matImportBox.label(text="Import following textures into materials (if found):")
@@ -1218,12 +3677,21 @@ class OBJECT_PT_panel(Panel):
                 modelImportBox.prop(tool, "hide_after_import")
                 modelImportBox.prop(tool, "move_to_new_collection_after_import")
                 modelImportBox.prop(tool, "join_new_objects")
+                modelImportBox.prop(tool, "dedup_meshes")
+                modelImportBox.prop(tool, "generate_lods")
+                if tool.generate_lods:
+                    modelImportBox.prop(tool, "lod_ratios")
+                    modelImportBox.prop(tool, "lod_min_faces")
+                    modelImportBox.prop(tool, "lod_use_lightest")
+                modelImportBox.prop(tool, "use_model_cache")
+                if tool.use_model_cache:
+                    modelImportBox.prop(tool, "model_cache_path")
+                    modelImportBox.prop(tool, "model_cache_max_mb")
+                OBJECT_PT_panel.drawLibraryOutput(modelImportBox, tool)
                 modelImportBox.separator()
                 modelImportBox.label(text="Search for and import the following filetypes:")
-                modelImportBox.prop(tool, "import_fbx")
-                modelImportBox.prop(tool, "import_gltf")
-                modelImportBox.prop(tool, "import_obj")
-                modelImportBox.prop(tool, "import_x3d")
+                for fileType in modelFileTypes:
+                    modelImportBox.prop(tool, modelFileTypes[fileType][0])
         
         
         # Append from other .blend UI
@@ -1239,12 +3707,23 @@ class OBJECT_PT_panel(Panel):
             appendBox.label(text='Make sure to uncheck "Relative Path"!', icon="ERROR")
             appendBox.prop(tool, "append_recursive_search")
             appendBox.prop(tool, "append_move_to_new_collection_after_import")
-            appendBox.prop(tool, "append_join_new_objects")
+            if not tool.append_link: # Linked data cant be joined or shared
+                appendBox.prop(tool, "append_join_new_objects")
+                appendBox.prop(tool, "append_dedup_meshes")
             appendBox.prop(tool, "appendType")
+            appendBox.prop(tool, "append_link")
+            if tool.append_link and tool.appendType != 'materials':
+                appendBox.prop(tool, "append_link_overrides")
             if obj.appendType == 'objects':
                 appendBox.prop(tool, "deleteLights")
                 appendBox.prop(tool, "deleteCameras")
+            appendBox.prop(tool, "append_use_index")
+            if tool.append_use_index:
+                appendBox.prop(tool, "blend_index_path")
             appendBox.operator("alt.batchappend")
+            findRow = appendBox.row()
+            findRow.prop(tool, "blend_search")
+            findRow.operator("alt.findinblends", text="", icon="VIEWZOOM")
             
             
         # Asset browser operations UI
@@ -1277,15 +3756,52 @@ class OBJECT_PT_panel(Panel):
         if obj.utilRow_expanded:
             utilRow = utilBox.row()
             utilBox.prop(tool, "deleteType")
+            utilBox.prop(tool, "delete_name_filter")
+            utilBox.prop(tool, "delete_library")
+            utilBox.prop(tool, "delete_orphans_only")
+            utilBox.prop(tool, "delete_alt_imported_only")
+            utilBox.prop(tool, "delete_dry_run")
             utilBox.operator("alt.batchdelete")
             utilBox.separator()
             utilBox.label(text='Deletes based on material name, not material contents', icon="ERROR")
             utilBox.operator("alt.simpledeldupemats")
+            utilBox.operator("alt.dedupmaterials")
             utilBox.operator("alt.cleanupunusedmats")
+            utilBox.operator("alt.purgeunreachable")
+            utilBox.prop(tool, "purge_ignore_fake_users")
+            utilBox.operator("alt.dedupimages")
+            utilBox.operator("alt.dedupmeshes")
             utilBox.separator()
             utilBox.prop(tool, "dispNewScale")
             utilBox.operator("alt.changealldispscale")
             utilBox.operator("alt.userealdispall")
+            controls = shaderSetup.findControlsGroup()
+            if controls != None:
+                utilBox.separator()
+                utilBox.label(text="Shared controls of imported materials:")
+                utilBox.prop(controls.nodes["node_scaleValue"].outputs['Value'], "default_value", text="Texture scale")
+                utilBox.prop(controls.nodes["node_displacementScale"].outputs['Value'], "default_value", text="Displacement scale")
+                utilBox.template_color_ramp(controls.nodes["node_imTexRoughnessColourRamp"], "color_ramp")
+            utilBox.separator()
+            utilBox.prop(tool, "bulk_node")
+            utilBox.prop(tool, "bulk_input")
+            utilBox.prop(tool, "bulk_value")
+            utilBox.prop(tool, "bulk_value_text")
+            utilBox.prop(tool, "bulk_material_filter")
+            utilBox.prop(tool, "bulk_alt_imported_only")
+            utilBox.operator("alt.bulksetnodeinput")
+            utilBox.separator()
+            utilBox.label(text="Imported textures:")
+            proxyRow = utilBox.row()
+            proxyRow.operator("alt.swapproxytextures", text="Full resolution").target = 'FULL'
+            proxyRow.operator("alt.swapproxytextures", text="Proxies").target = 'PROXY'
+            utilBox.label(text="Model LODs:")
+            lodRow = utilBox.row()
+            lodRow.operator("alt.switchlods", text="Full resolution").level = 0
+            lodRow.operator("alt.switchlods", text="Lightest").level = -1
+            lodRow = utilBox.row()
+            lodRow.prop(tool, "lod_level")
+            lodRow.operator("alt.switchlods", text="Switch").level = tool.lod_level
         
         
         #Asset snapshot UI
@@ -1351,13 +3867,21 @@ classes = (
     OT_BatchImportPBR,
     OT_ImportModels,
     OT_BatchAppend,
+    OT_FindInBlends,
     OT_ManageAssets,
     OT_GenerateAssetPreviews,
     OT_BatchDelete,
     OT_SimpleDelDupeMaterials,
+    OT_DedupMaterials,
+    OT_DedupImages,
+    OT_PurgeUnreachable,
     OT_CleanupUnusedMaterials,
+    OT_DedupMeshes,
     OT_UseDisplacementOnAll,
     OT_ChangeAllDisplacementScale,
+    OT_BulkSetNodeInput,
+    OT_SwapProxyTextures,
+    OT_SwitchLods,
     OT_AssetSnapshotCollection,
     OT_AssetSnapshotObject,
     OT_AssetDownloaderOperator,
@@ -1370,12 +3894,18 @@ def register():
     for cls in classes:
         register_class(cls)
     bpy.types.Scene.assetlibrarytools = PointerProperty(type=properties)
+    for handlers, fn in nodeIndexHandlers:
+        getattr(bpy.app.handlers, handlers).append(fn)
     
 def unregister():
     from bpy.utils import unregister_class
     for cls in reversed(classes):
         unregister_class(cls)
     del bpy.types.Scene.assetlibrarytools
+    for handlers, fn in nodeIndexHandlers:
+        if fn in getattr(bpy.app.handlers, handlers):
+            getattr(bpy.app.handlers, handlers).remove(fn)
+    nodeIndex.reset()
 
 if __name__ == "__main__":
     register()
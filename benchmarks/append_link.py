@@ -0,0 +1,49 @@
+# Timing and saved file size of batch appending a kit library (every object copied into the open file) against linking it
+# Usage: blender -b --factory-startup -P benchmarks/append_link.py [-- n_files]
+import os
+import shutil
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+def writeKit(directory, n):
+    bpy.ops.wm.read_homefile(use_empty=True)
+    for i in range(10):
+        bpy.ops.mesh.primitive_uv_sphere_add(segments=64, ring_count=32, location=(i * 3, 0, 0))
+    first = os.path.join(directory, "kit_0000.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=first)
+    for i in range(1, n):
+        shutil.copyfile(first, os.path.join(directory, "kit_{0:04d}.blend".format(i)))
+
+
+def run(directory, link, scenePath):
+    bpy.ops.wm.read_homefile(use_empty=True)
+    bpy.ops.wm.save_as_mainfile(filepath=scenePath) # Saved first, so links are relative
+    tool = bpy.context.scene.assetlibrarytools
+    tool.append_path = directory
+    tool.append_use_index = False
+    tool.append_link = link
+    t = benchutils.timed(bpy.ops.alt.batchappend)
+    bpy.ops.wm.save_mainfile()
+    return t, os.path.getsize(scenePath)
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if len(argv) > 0 else 200
+    benchutils.loadAddon(register=True)
+    with tempfile.TemporaryDirectory() as directory:
+        kitDir = os.path.join(directory, "kit")
+        os.mkdir(kitDir)
+        writeKit(kitDir, n)
+        print("{0} .blend files of 10 objects".format(n))
+        for link in (False, True):
+            t, size = run(kitDir, link, os.path.join(directory, "scene.blend"))
+            benchutils.report("link" if link else "append", t, n)
+            print("  saved scene: {0:.1f} MB".format(size / 1000000))
+
+
+main()
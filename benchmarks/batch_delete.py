@@ -0,0 +1,40 @@
+# Timing comparison of deleting many objects one by one with bpy.data.objects.remove (as batch delete used to) against one bpy.data.batch_remove
+# Usage: blender -b --factory-startup -P benchmarks/batch_delete.py [-- n_objects]
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+def makeObjects(prefix, n):
+    objects = []
+    for i in range(n):
+        obj = bpy.data.objects.new("{0}_{1}".format(prefix, i), None)
+        bpy.context.scene.collection.objects.link(obj)
+        objects.append(obj)
+    return objects
+
+
+def removeEach(objects):
+    for obj in objects:
+        bpy.data.objects.remove(obj)
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if argv else 5000
+    benchutils.loadAddon(register=True)
+    tool = bpy.context.scene.assetlibrarytools
+    tool.deleteType = 'objects'
+
+    t = benchutils.timed(removeEach, makeObjects("each", n))
+    benchutils.report("bpy.data.objects.remove per object", t, n)
+
+    makeObjects("batch", n)
+    tool.delete_name_filter = "^batch_"
+    t = benchutils.timed(bpy.ops.alt.batchdelete)
+    benchutils.report("alt.batchdelete (batch_remove)", t, n)
+
+
+main()
@@ -0,0 +1,31 @@
+# Shared helpers for the AssetLibraryTools benchmarks
+# The benchmarks need bpy, run them with: blender -b --factory-startup -P benchmarks/<benchmark>.py
+import importlib.util
+import os
+import sys
+import time
+
+
+addonDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Load the addon package from this checkout (whatever its folder is called) and register it
+def loadAddon(register=False):
+    spec = importlib.util.spec_from_file_location("AssetLibraryTools", os.path.join(addonDir, "__init__.py"), submodule_search_locations=[addonDir])
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules["AssetLibraryTools"] = addon
+    spec.loader.exec_module(addon)
+    if register:
+        addon.register()
+    return addon
+
+
+# Run fn once and return the elapsed wall time in seconds
+def timed(fn, *args, **kwargs):
+    t = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - t
+
+
+def report(label, seconds, n):
+    print("{0:<40} {1:9.3f} s  {2:12.0f} items/s".format(label, seconds, n / seconds if seconds > 0 else float('inf')))
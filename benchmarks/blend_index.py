@@ -0,0 +1,58 @@
+# Timing comparison of listing the objects in many .blend files by opening each with bpy.data.libraries.load, against reading them with
+# ALT_BlendIndex (file headers only, in a pool of python processes) into a fresh index, and against an index which is already up to date
+# Usage: blender -b --factory-startup -P benchmarks/blend_index.py [-- n_files [n_objects_per_file]]
+import os
+import shutil
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+def writeFiles(directory, n, nObjects):
+    bpy.ops.wm.read_homefile(use_empty=True)
+    for i in range(nObjects):
+        me = bpy.data.meshes.new("part_{0}".format(i))
+        me.from_pydata([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [], [(0, 1, 2)])
+        bpy.context.scene.collection.objects.link(bpy.data.objects.new("part_{0}".format(i), me))
+    first = os.path.join(directory, "kit_0000.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=first)
+    for i in range(1, n):
+        shutil.copyfile(first, os.path.join(directory, "kit_{0:04d}.blend".format(i)))
+    bpy.ops.wm.read_homefile(use_empty=True)
+
+
+def listWithBpy(paths):
+    names = {}
+    for path in paths:
+        with bpy.data.libraries.load(path) as (data_from, data_to):
+            names[path] = list(data_from.objects)
+    return names
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if len(argv) > 0 else 1000
+    nObjects = int(argv[1]) if len(argv) > 1 else 200
+    addon = benchutils.loadAddon()
+    from AssetLibraryTools import ALT_BlendIndex
+    with tempfile.TemporaryDirectory() as directory:
+        writeFiles(directory, n, nObjects)
+        paths = ALT_BlendIndex.findBlends(directory)
+        print("{0} .blend files of {1} objects".format(n, nObjects))
+
+        t = benchutils.timed(listWithBpy, paths)
+        benchutils.report("bpy.data.libraries.load", t, n)
+
+        index = ALT_BlendIndex.blendIndex(os.path.join(directory, "index.sqlite"))
+        t = benchutils.timed(index.update, paths)
+        benchutils.report("ALT_BlendIndex, new index", t, n)
+        t = benchutils.timed(index.update, paths)
+        benchutils.report("ALT_BlendIndex, up to date", t, n)
+        t = benchutils.timed(index.find, "part_1")
+        benchutils.report("find part_1 in all files", t, n)
+        index.close()
+
+
+main()
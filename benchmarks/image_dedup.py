@@ -0,0 +1,58 @@
+# Timing of dedupImages on a file where every texture was loaded several times (Image, Image.001 ...), plus hashing the image files one after
+# another against imageFileHashes (thread pool)
+# Usage: blender -b --factory-startup -P benchmarks/image_dedup.py [-- n_files [copies]]
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+import numpy as np
+
+
+def writeImages(directory, n, size=1024):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(n):
+        img = bpy.data.images.new("tex_{0}".format(i), size, size)
+        img.pixels.foreach_set(rng.random(size * size * 4, dtype=np.float32)) # Noise, so the files are as large as real textures
+        path = os.path.join(directory, "tex_{0}.png".format(i))
+        img.filepath_raw = path
+        img.file_format = 'PNG'
+        img.save()
+        bpy.data.images.remove(img)
+        paths.append(path)
+    return paths
+
+
+def hashSequential(addon, images):
+    return [addon.hashFile.__wrapped__(bpy.path.abspath(img.filepath)) for img in images]
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if len(argv) > 0 else 50
+    copies = int(argv[1]) if len(argv) > 1 else 4
+    addon = benchutils.loadAddon(register=True)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = writeImages(directory, n)
+        for path in paths:
+            for i in range(copies):
+                bpy.data.images.load(path, check_existing=False)
+        images = [img for img in bpy.data.images if img.filepath != ""]
+        print("{0} image files, each loaded {1} times".format(n, copies))
+
+        t = benchutils.timed(hashSequential, addon, images)
+        benchutils.report("hash files one after another", t, len(images))
+        addon.hashFile.cache_clear()
+        t = benchutils.timed(addon.imageFileHashes, images)
+        benchutils.report("imageFileHashes", t, len(images))
+        addon.hashFile.cache_clear()
+
+        result = []
+        t = benchutils.timed(lambda: result.extend(addon.dedupImages(images)))
+        benchutils.report("dedupImages", t, len(images))
+        print("{0} duplicates removed, {1} images left".format(result[0], len(bpy.data.images)))
+
+
+main()
@@ -0,0 +1,89 @@
+# Timing of finding and removing duplicate materials (copies under other names, each used by its own object) with dedupMaterials, split into
+# fingerprinting and remapping, against remapping every duplicate with ID.user_remap and removing it on its own
+# Usage: blender -b --factory-startup -P benchmarks/material_dedup.py [-- n_materials [n_distinct]]
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+def makeMaterials(n, distinct):
+    bases = []
+    for i in range(distinct):
+        mat = bpy.data.materials.new("base_{0}".format(i))
+        if mat.node_tree == None: # Always there in newer versions
+            mat.use_nodes = True
+        nodes = mat.node_tree.nodes
+        bsdf = nodes.get("Principled BSDF")
+        bsdf.inputs["Roughness"].default_value = i / distinct
+        ramp = nodes.new("ShaderNodeValToRGB")
+        ramp.color_ramp.elements[0].position = (i % 7) / 10
+        mat.node_tree.links.new(ramp.outputs["Color"], bsdf.inputs["Base Color"])
+        bases.append(mat)
+    materials = list(bases)
+    for i in range(n - distinct):
+        materials.append(bases[i % distinct].copy())
+    me = bpy.data.meshes.new("triangle")
+    me.from_pydata([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [], [(0, 1, 2)])
+    me.materials.append(None)
+    for i, mat in enumerate(materials): # Every material is used by an object of its own
+        obj = bpy.data.objects.new("obj_{0}".format(i), me)
+        obj.material_slots[0].link = 'OBJECT'
+        obj.material_slots[0].material = mat
+        bpy.context.scene.collection.objects.link(obj)
+    return materials
+
+
+def naiveRemap(duplicates):
+    for dup, replacement in duplicates.items():
+        dup.user_remap(replacement)
+        bpy.data.materials.remove(dup)
+
+
+def clear():
+    bpy.data.batch_remove(list(bpy.data.objects) + list(bpy.data.materials) + list(bpy.data.meshes))
+
+
+def duplicatesOf(addon, materials):
+    fingerprinter = addon.materialFingerprinter(materials)
+    kept = {}
+    duplicates = {}
+    for mat in materials:
+        key = fingerprinter.fingerprint(mat)
+        if key in kept:
+            duplicates[mat] = kept[key]
+        else:
+            kept[key] = mat
+    return duplicates
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if len(argv) > 0 else 10000
+    distinct = int(argv[1]) if len(argv) > 1 else 500
+    addon = benchutils.loadAddon(register=True)
+    print("{0} materials, {1} distinct".format(n, distinct))
+
+    materials = makeMaterials(n, distinct)
+    t = benchutils.timed(duplicatesOf, addon, materials)
+    benchutils.report("fingerprint", t, n)
+    duplicates = duplicatesOf(addon, materials)
+    print("{0} duplicates found".format(len(duplicates)))
+    t = benchutils.timed(naiveRemap, duplicates)
+    benchutils.report("user_remap + remove per duplicate", t, n)
+    clear()
+
+    materials = makeMaterials(n, distinct)
+    duplicates = duplicatesOf(addon, materials)
+    t = benchutils.timed(addon.remapDuplicates, duplicates)
+    benchutils.report("remapDuplicates", t, n)
+    clear()
+
+    materials = makeMaterials(n, distinct)
+    t = benchutils.timed(addon.dedupMaterials, materials)
+    benchutils.report("dedupMaterials (all of it)", t, n)
+    print("{0} materials left".format(len(bpy.data.materials)))
+
+
+main()
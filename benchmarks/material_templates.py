@@ -0,0 +1,59 @@
+# Timing comparison of building every PBR material from scratch against copying per-signature template materials
+# Usage: blender -b --factory-startup -P benchmarks/material_templates.py [-- n_sets]
+import os
+import random
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+# A few texture combinations, most libraries only contain a handful of these
+signatures = [
+    ("diff", "rough", "norm", "disp"),
+    ("diff", "rough", "norm"),
+    ("diff", "met", "rough", "norm", "disp"),
+    ("diff", "rough", "norm", "disp", "alpha"),
+]
+fileNames = {"diff": "Color", "met": "Metalness", "rough": "Roughness", "norm": "NormalGL", "disp": "Displacement", "alpha": "Opacity"}
+
+
+# Write one tiny texture per type, every synthetic set points at these so only material construction is measured
+def writeTextures(addon, directory):
+    paths = {}
+    for t, suffix in fileNames.items():
+        img = bpy.data.images.new("bench_" + t, 4, 4)
+        img.filepath_raw = os.path.join(directory, "Bench_1K_{0}.png".format(suffix))
+        img.file_format = 'PNG'
+        img.save()
+        bpy.data.images.remove(img)
+        path = os.path.join(directory, "Bench_1K_{0}.png".format(suffix))
+        stat = os.stat(path)
+        paths[t] = addon.textureFile(path, stat.st_size, stat.st_mtime_ns)
+    return paths
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if argv else 3000
+    addon = benchutils.loadAddon(register=True)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = writeTextures(addon, directory)
+        sets = [{t: paths[t] for t in rng.choice(signatures)} for i in range(n)]
+        images = addon.imageCache()
+        addon.shaderSetup.loadTextures(paths, images) # Load every texture once so neither run pays for image loading
+        
+        t = benchutils.timed(lambda: [addon.shaderSetup.simplePrincipledSetup("scratch", files, images) for files in sets])
+        benchutils.report("build every material from scratch", t, n)
+        bpy.data.batch_remove([m for m in bpy.data.materials if m.name.startswith("scratch")])
+        
+        templates = addon.materialTemplates()
+        t = benchutils.timed(lambda: [addon.shaderSetup.simplePrincipledSetup("template", files, images, templates) for files in sets])
+        benchutils.report("copy template materials", t, n)
+        print("{0} templates built, {1} materials copied".format(templates.built, templates.copied))
+        templates.clear()
+
+
+main()
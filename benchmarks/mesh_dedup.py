@@ -0,0 +1,66 @@
+# Timing comparison of sharing identical meshes by comparing every mesh against the kept ones and remapping each duplicate with user_remap,
+# against meshDeduplicator (one hash per mesh, objects switched directly and the copies removed in one batch_remove), on a kit of parts that
+# each arrive with their own copy of a few distinct meshes
+# Usage: blender -b --factory-startup -P benchmarks/mesh_dedup.py [-- n_objects [n_distinct]]
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+def makeKit(prefix, n, distinct):
+    templates = []
+    for i in range(distinct):
+        bpy.ops.mesh.primitive_uv_sphere_add(segments=16 + i, ring_count=8 + i)
+        obj = bpy.context.active_object
+        templates.append(obj.data)
+        bpy.data.objects.remove(obj)
+    objects = []
+    for i in range(n):
+        me = templates[i % distinct].copy()
+        obj = bpy.data.objects.new("{0}_{1}".format(prefix, i), me)
+        bpy.context.scene.collection.objects.link(obj)
+        objects.append(obj)
+    bpy.data.batch_remove(templates)
+    return objects
+
+
+# Compare each mesh with the meshes kept so far (Blender's own mesh comparison), remap every duplicate and remove it on its own
+def naiveDedup(objects):
+    kept = []
+    for me in set(obj.data for obj in objects):
+        for k in kept:
+            if k.unit_test_compare(mesh=me) == "Same":
+                me.user_remap(k)
+                bpy.data.meshes.remove(me)
+                break
+        else:
+            kept.append(me)
+
+
+def clear(prefix):
+    bpy.data.batch_remove([o for o in bpy.data.objects if o.name.startswith(prefix)] + [me for me in bpy.data.meshes if me.users == 0])
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if len(argv) > 0 else 3000
+    distinct = int(argv[1]) if len(argv) > 1 else 20
+    addon = benchutils.loadAddon(register=True)
+    print("{0} objects, {1} distinct meshes".format(n, distinct))
+
+    objects = makeKit("naive", n, distinct)
+    t = benchutils.timed(naiveDedup, objects)
+    benchutils.report("compare + user_remap per mesh", t, n)
+    print("{0} meshes left".format(len(set(obj.data for obj in objects))))
+    clear("naive")
+
+    objects = makeKit("hash", n, distinct)
+    dedup = addon.meshDeduplicator()
+    t = benchutils.timed(dedup.add, objects)
+    benchutils.report("meshDeduplicator", t, n)
+    print("{0} meshes left, {1}".format(len(set(obj.data for obj in objects)), dedup.summary()))
+
+
+main()
@@ -0,0 +1,55 @@
+# Timing comparison of joining many small mesh objects (like the parts of a CAD export) with bpy.ops.object.join against joinMeshObjects
+# Usage: blender -b --factory-startup -P benchmarks/mesh_join.py [-- n_parts]
+import os
+import random
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+cubeVerts = [(x, y, z) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)]
+cubeFaces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+
+
+# n cube parts with their own mesh, a UV layer, one of a few materials and a random transform
+def makeParts(prefix, n):
+    rng = random.Random(0)
+    materials = [bpy.data.materials.get("part_{0}".format(i)) or bpy.data.materials.new("part_{0}".format(i)) for i in range(4)]
+    parts = []
+    for i in range(n):
+        me = bpy.data.meshes.new("{0}_{1}".format(prefix, i))
+        me.from_pydata(cubeVerts, [], cubeFaces)
+        me.uv_layers.new(name="UVMap")
+        me.materials.append(rng.choice(materials))
+        obj = bpy.data.objects.new(me.name, me)
+        obj.location = (rng.uniform(-50, 50), rng.uniform(-50, 50), rng.uniform(-50, 50))
+        obj.rotation_euler = (rng.random(), rng.random(), rng.random())
+        obj.scale = (rng.uniform(0.1, 1), rng.uniform(0.1, 1), rng.uniform(0.1, 1))
+        bpy.context.scene.collection.objects.link(obj)
+        parts.append(obj)
+    bpy.context.view_layer.update()
+    return parts
+
+
+def opsJoin(parts):
+    with bpy.context.temp_override(active_object=parts[0], object=parts[0], selected_objects=parts, selected_editable_objects=parts):
+        bpy.ops.object.join()
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if argv else 5000
+    addon = benchutils.loadAddon(register=True)
+
+    parts = makeParts("ops", n)
+    t = benchutils.timed(opsJoin, parts)
+    benchutils.report("bpy.ops.object.join", t, n)
+    bpy.data.batch_remove([parts[0]] + [me for me in bpy.data.meshes if me.users == 0]) # Removing IDs scans the whole file, dont let the leftovers slow down the next run
+
+    parts = makeParts("numpy", n)
+    t = benchutils.timed(addon.joinMeshObjects, parts)
+    benchutils.report("joinMeshObjects", t, n)
+
+
+main()
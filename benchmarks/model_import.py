@@ -0,0 +1,69 @@
+# Timing comparison of importing every model straight into the scene and finding the new objects by diffing the whole scene (as the
+# model importer used to) against importing into an empty staging scene, with a few hundred small OBJ files imported into an already large scene
+# Usage: blender -b --factory-startup -P benchmarks/model_import.py [-- n_files [n_scene_objects]]
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+# A single triangle per file, so the importer itself costs as little as possible
+objData = "v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n"
+
+
+def writeModels(directory, n):
+    for i in range(n):
+        with open(os.path.join(directory, "model_{0:04d}.obj".format(i)), "w") as f:
+            f.write("o model_{0:04d}\n".format(i) + objData)
+
+
+# The per file work of the old importer, hide and move to new collection each diff the scene against the snapshot taken before the import
+def legacyImport(importFn, paths):
+    scene = bpy.context.scene
+    for path in paths:
+        old_objects = set(scene.objects)
+        importFn(filepath=path)
+        for obj in set(scene.objects) - old_objects:
+            obj.hide_set(True)
+        imported_objects = set(scene.objects) - old_objects
+        newCollection = bpy.data.collections.new(os.path.basename(path))
+        scene.collection.children.link(newCollection)
+        for obj in imported_objects:
+            for uc in obj.users_collection:
+                uc.objects.unlink(obj)
+            newCollection.objects.link(obj)
+
+
+def removeImported(prefix):
+    bpy.data.batch_remove([o for o in bpy.data.objects if o.name.startswith(prefix)] + [c for c in bpy.data.collections if c.name.startswith(prefix)])
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    nFiles = int(argv[0]) if len(argv) > 0 else 300
+    nScene = int(argv[1]) if len(argv) > 1 else 5000
+    addon = benchutils.loadAddon(register=True)
+    tool = bpy.context.scene.assetlibrarytools
+    tool.hide_after_import = True
+    tool.move_to_new_collection_after_import = True
+    tool.join_new_objects = False
+    importFn = addon.findOperator(addon.modelFileTypes["OBJ"][1])
+    for i in range(nScene): # The already large scene
+        bpy.context.scene.collection.objects.link(bpy.data.objects.new("scene_{0}".format(i), None))
+    print("{0} OBJ files into a scene of {1} objects".format(nFiles, len(bpy.context.scene.objects)))
+    with tempfile.TemporaryDirectory() as directory:
+        writeModels(directory, nFiles)
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+        t = benchutils.timed(legacyImport, importFn, paths)
+        benchutils.report("diff the scene per file", t, nFiles)
+        removeImported("model_")
+
+        tool.model_import_path = directory
+        t = benchutils.timed(bpy.ops.alt.importmodels)
+        benchutils.report("staging scene per file", t, nFiles)
+
+
+main()
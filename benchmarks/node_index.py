@@ -0,0 +1,52 @@
+# Timing comparison of bulk node edits walking every node of every material (as the displacement scale operator used to) against looking the
+# nodes up in nodeIndex, with many materials of which only some have the node being changed
+# Usage: blender -b --factory-startup -P benchmarks/node_index.py [-- n_materials [n_edits]]
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+# n materials with a dozen nodes each, every tenth has a normal map node
+def makeMaterials(n):
+    for i in range(n):
+        mat = bpy.data.materials.new("mat_{0}".format(i))
+        for j in range(10):
+            mat.node_tree.nodes.new("ShaderNodeTexImage")
+        if i % 10 == 0:
+            mat.node_tree.nodes.new("ShaderNodeNormalMap")
+
+
+def scanEdit(value):
+    for mat in bpy.data.materials:
+        if mat.node_tree != None:
+            for node in mat.node_tree.nodes:
+                if node.bl_idname == "ShaderNodeNormalMap":
+                    node.inputs["Strength"].default_value = value
+
+
+def indexEdit(addon, value):
+    for mat, node in addon.nodeIndex.find("ShaderNodeNormalMap"):
+        node.inputs["Strength"].default_value = value
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if len(argv) > 0 else 10000
+    edits = int(argv[1]) if len(argv) > 1 else 10
+    addon = benchutils.loadAddon(register=True)
+    makeMaterials(n)
+
+    t = benchutils.timed(lambda: [scanEdit(i) for i in range(edits)])
+    benchutils.report("scan every node per edit", t, edits)
+
+    t = benchutils.timed(addon.nodeIndex.build)
+    benchutils.report("nodeIndex.build", t, n)
+    t = benchutils.timed(lambda: [indexEdit(addon, i) for i in range(edits)])
+    benchutils.report("nodeIndex.find per edit", t, edits)
+    t = benchutils.timed(lambda: [addon.nodeIndex.find("ShaderNodeNormalMap") for i in range(edits)])
+    benchutils.report("nodeIndex.find alone (no edit)", t, edits)
+
+
+main()
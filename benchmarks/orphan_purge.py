@@ -0,0 +1,45 @@
+# Timing comparison of purging unused data by removing everything with no users again and again until nothing is left (what running the cleanup
+# tools repeatedly does) against alt.purgeunreachable (one user_map pass and one batch_remove), with unused materials that use node groups and images
+# Usage: blender -b --factory-startup -P benchmarks/orphan_purge.py [-- n_materials]
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+import bpy
+
+
+# n unused materials, each the only user of a node group which is the only user of an image
+def makeOrphans(n):
+    for i in range(n):
+        img = bpy.data.images.new("orphan_{0}".format(i), 4, 4)
+        group = bpy.data.node_groups.new("orphan_{0}".format(i), "ShaderNodeTree")
+        group.nodes.new("ShaderNodeTexImage").image = img
+        mat = bpy.data.materials.new("orphan_{0}".format(i))
+        mat.node_tree.nodes.new("ShaderNodeGroup").node_tree = group
+
+
+def purgeUntilDone():
+    collections = {'MATERIAL': bpy.data.materials, 'NODETREE': bpy.data.node_groups, 'IMAGE': bpy.data.images}
+    while True:
+        orphans = [id for coll in collections.values() for id in coll if id.users == 0]
+        if len(orphans) == 0:
+            return
+        for id in orphans:
+            collections[id.id_type].remove(id)
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    n = int(argv[0]) if argv else 2000
+    benchutils.loadAddon(register=True)
+
+    makeOrphans(n)
+    t = benchutils.timed(purgeUntilDone)
+    benchutils.report("remove users == 0 until none are left", t, 3 * n)
+
+    makeOrphans(n)
+    t = benchutils.timed(bpy.ops.alt.purgeunreachable)
+    benchutils.report("alt.purgeunreachable", t, 3 * n)
+
+
+main()
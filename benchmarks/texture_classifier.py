@@ -0,0 +1,70 @@
+# Micro-benchmark for FindPBRTextureType over a 100k synthetic file name corpus
+# Usage: blender -b --factory-startup -P benchmarks/texture_classifier.py
+import os
+import random
+import re
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import benchutils
+
+
+# The classifier as it was before the token map, kept here for comparison
+def legacyFindPBRTextureType(fname, nameLists, texTypes):
+    PBRTT = None
+    fname = ''.join(i for i in fname if not i.isdigit())
+    fname = re.sub("([a-z])([A-Z])","\\g<1> \\g<2>",fname)
+    seperators = ['_', '.', '-', '__', '--', '#']
+    for sep in seperators:
+        fname = fname.replace(sep, ' ')
+    fname = fname.lower()
+    i = 0
+    for nameList in nameLists:
+        for name in nameList:
+            if name in fname:
+                PBRTT = texTypes[i]
+        i+=1
+    return PBRTT
+
+
+def makeCorpus(addon, n=100000, seed=0):
+    rng = random.Random(seed)
+    materials = ["Bricks", "Metal", "Wood", "Collection", "Ground", "Rock", "Fabric", "Tiles", "Metadata", "Leather", "Concrete", "Bark"]
+    resolutions = ["1K", "2K", "4K", "8K", "", "4k"]
+    aliases = [name for nameList in addon.nameLists for name in nameList] + ["ao", "ambientocclusion", "preview", "mask"]
+    extensions = [".png", ".jpg", ".exr", ".tif"]
+    names = []
+    for i in range(n):
+        parts = [rng.choice(materials) + "{0:03d}".format(rng.randint(0, 300)), rng.choice(resolutions), rng.choice(aliases)]
+        style = rng.randint(0, 3)
+        if style == 0:
+            name = "_".join(p for p in parts if p)
+        elif style == 1:
+            name = "-".join(p.lower() for p in parts if p)
+        elif style == 2:
+            name = "".join(p[:1].upper() + p[1:] for p in parts if p)
+        else:
+            name = "_".join(p.upper() for p in parts if p)
+        names.append(name + rng.choice(extensions))
+    return names
+
+
+def main():
+    addon = benchutils.loadAddon()
+    names = makeCorpus(addon)
+    n = len(names)
+    print("Corpus: {0} names, {1} unique".format(n, len(set(names))))
+    t = benchutils.timed(lambda: [legacyFindPBRTextureType(x, addon.nameLists, addon.texTypes) for x in names])
+    benchutils.report("legacy substring scan", t, n)
+    addon.FindPBRTextureType.cache_clear()
+    t = benchutils.timed(lambda: [addon.FindPBRTextureType.__wrapped__(x) for x in names])
+    benchutils.report("token map (uncached)", t, n)
+    t = benchutils.timed(lambda: [addon.FindPBRTextureType(x) for x in names])
+    benchutils.report("token map (cold LRU)", t, n)
+    t = benchutils.timed(lambda: [addon.FindPBRTextureType(x) for x in names])
+    benchutils.report("token map (warm LRU)", t, n)
+    print(addon.FindPBRTextureType.cache_info())
+    differ = sum(1 for x in names if legacyFindPBRTextureType(x, addon.nameLists, addon.texTypes) != addon.FindPBRTextureType(x))
+    print("{0} names classified differently from the legacy scan".format(differ))
+
+
+main()